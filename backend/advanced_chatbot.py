@@ -3,17 +3,51 @@ import json
 import random
 import math
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple, Optional
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Tuple, Optional
 from collections import defaultdict, deque
+from itertools import islice
 import logging
+import threading
+from chatbot_answers import ChatbotAnswers
+from gazetteer import EntitySpan
+from intent_engine import IntentEngine, ScanResult
+from intent_model import IntentModel
+from user_state import Interaction, UserState, UserStateStore, create_user_state_store
+from conversation_store import WriteBehindConversationStore, create_conversation_store
+from config import settings
+
+if TYPE_CHECKING:
+    from chatbot_knowledge import KnowledgeBase
 
 logger = logging.getLogger(__name__)
 
+# Messages scored together by the intent model in batch processing
+INTENT_MODEL_BATCH_SIZE = 256
+
 class AdvancedChatbot:
-    def __init__(self):
-        self.conversation_memory = defaultdict(lambda: deque(maxlen=10))  # Store last 10 conversations per user
-        self.user_preferences = defaultdict(dict)
-        self.learning_data = defaultdict(list)
+    def __init__(self, user_states: Optional[UserStateStore] = None,
+                 conversation_store: Optional[WriteBehindConversationStore] = None,
+                 answers: Optional[ChatbotAnswers] = None,
+                 intent_model: Optional[IntentModel] = None, intent_model_threshold: float = 0.6,
+                 knowledge: Optional["KnowledgeBase"] = None):
+        # Per-user conversation memory (last 10 turns), preferences and learning history
+        if user_states is None:
+            user_states = create_user_state_store(settings)
+        self.user_states = user_states
+        # Optional durable history; users missing from memory are loaded from it
+        self.conversation_store = conversation_store
+        # Optional answers from the live database for questions naming a
+        # district, course or scholarship audience
+        self.answers = answers
+        # Optional reference answers (chatbot_knowledge) for questions that
+        # hit one of their keywords but name nothing in the database
+        self.knowledge = knowledge
+        # Optional statistical intent model; the patterns below decide when
+        # it is less than `intent_model_threshold` sure
+        self.intent_model = intent_model
+        self.intent_model_threshold = intent_model_threshold
+        self.model_decisions = 0
+        self.model_fallbacks = 0
         self.emotion_keywords = {
             'positive': ['happy', 'excited', 'great', 'wonderful', 'amazing', 'fantastic', 'love', 'like'],
             'negative': ['sad', 'worried', 'confused', 'frustrated', 'angry', 'disappointed', 'hate', 'difficult'],
@@ -102,31 +136,31 @@ class AdvancedChatbot:
             'proactive': "Based on what you've told me, I think you might also be interested in {suggestion}."
         }
 
-    def detect_emotion(self, text: str) -> str:
+        # Compile all intent patterns and emotion keywords into one matcher
+        self.intent_engine = IntentEngine(self.intent_patterns, self.emotion_keywords)
+        if intent_model is not None:
+            unknown = set(intent_model.classes) - set(self.intent_patterns)
+            if unknown:
+                raise ValueError(f"Intent model predicts unknown intents: {', '.join(sorted(unknown))}")
+
+    def detect_emotion(self, text: str, scan: Optional[ScanResult] = None) -> str:
         """Detect user's emotional state from text"""
-        text_lower = text.lower()
-        emotion_scores = {}
-        
-        for emotion, keywords in self.emotion_keywords.items():
-            score = sum(1 for keyword in keywords if keyword in text_lower)
-            emotion_scores[emotion] = score
+        if scan is None:
+            scan = self.intent_engine.scan(text)
+        emotion_scores = scan.emotion_scores
         
         if not emotion_scores or max(emotion_scores.values()) == 0:
             return 'neutral'
         
         return max(emotion_scores, key=emotion_scores.get)
 
-    def calculate_intent_confidence(self, text: str, intent: str) -> float:
+    def calculate_intent_confidence(self, text: str, intent: str, scan: Optional[ScanResult] = None) -> float:
         """Calculate confidence score for intent detection"""
-        patterns = self.intent_patterns[intent]['patterns']
-        text_lower = text.lower()
-        
-        matches = 0
-        total_patterns = len(patterns)
+        if scan is None:
+            scan = self.intent_engine.scan(text)
         
-        for pattern in patterns:
-            if re.search(pattern, text_lower, re.IGNORECASE):
-                matches += 1
+        matches = scan.intent_matches[intent]
+        total_patterns = self.intent_engine.pattern_counts[intent]
         
         base_confidence = matches / total_patterns
         weight = self.intent_patterns[intent]['weight']
@@ -137,17 +171,36 @@ class AdvancedChatbot:
         
         return min(base_confidence * weight, 1.0)
 
-    def detect_intent_advanced(self, text: str, user_id: str = "default") -> Tuple[str, float]:
-        """Advanced intent detection with context awareness"""
-        text_lower = text.lower()
+    def predict_intents(self, texts: List[str]) -> List[Optional[Tuple[str, float]]]:
+        """The intent model's (intent, probability) per message, or None per message without a model"""
+        if self.intent_model is None:
+            return [None] * len(texts)
+        return self.intent_model.predict(texts)
+
+    def detect_intent_advanced(self, text: str, user_id: str = "default", scan: Optional[ScanResult] = None,
+                               prediction: Optional[Tuple[str, float]] = None) -> Tuple[str, float]:
+        """Advanced intent detection with context awareness.
+
+        A confident intent model prediction (scored here unless passed in)
+        wins; otherwise the patterns decide.
+        """
+        if self.intent_model is not None:
+            if prediction is None:
+                prediction = self.intent_model.predict([text])[0]
+            if prediction[1] >= self.intent_model_threshold:
+                self.model_decisions += 1
+                return prediction
+            self.model_fallbacks += 1
+        if scan is None:
+            scan = self.intent_engine.scan(text)
         
         # Get conversation history for context
-        recent_messages = list(self.conversation_memory[user_id])
+        recent_messages = self._recent_messages(user_id)
         
         # Calculate confidence for each intent
         intent_scores = {}
         for intent, data in self.intent_patterns.items():
-            confidence = self.calculate_intent_confidence(text, intent)
+            confidence = self.calculate_intent_confidence(text, intent, scan)
             
             # Boost confidence based on conversation context
             if recent_messages:
@@ -169,30 +222,60 @@ class AdvancedChatbot:
         
         return best_intent, best_confidence
 
-    def _extract_intent_from_history(self, message: Dict) -> Optional[str]:
+    def _recent_messages(self, user_id: str) -> List[Interaction]:
+        """Conversation history for context, without creating state for new users"""
+        state = self._get_state(user_id)
+        return state.recent_interactions() if state is not None else []
+
+    def _get_state(self, user_id: str) -> Optional[UserState]:
+        """Resident state for the user, loading persisted history on first access"""
+        state = self.user_states.get(user_id)
+        if state is not None or self.conversation_store is None:
+            return state
+        
+        history = self.conversation_store.load_recent(user_id, settings.CHATBOT_HISTORY_PRELOAD)
+        if not history:
+            return None
+        state = self.user_states.get_or_create(user_id)
+        if not state.interactions:
+            for interaction in history:
+                state.add_interaction(interaction)
+            self.user_states.commit(user_id, state)
+        return state
+
+    def _extract_intent_from_history(self, message: Interaction) -> Optional[str]:
         """Extract intent from conversation history"""
-        if 'intent' in message:
-            return message['intent']
-        return None
+        return message.intent
 
-    def _infer_from_context(self, text: str, history: List[Dict]) -> Optional[str]:
+    def _infer_from_context(self, text: str, history: List[Interaction]) -> Optional[str]:
         """Infer intent from conversation context"""
         # Look for follow-up indicators
         follow_up_words = ['also', 'and', 'what about', 'how about', 'tell me more', 'more about']
         if any(word in text.lower() for word in follow_up_words):
             # Return the most recent intent
             for message in reversed(history):
-                if 'intent' in message:
-                    return message['intent']
+                if message.intent:
+                    return message.intent
         return None
 
-    def generate_contextual_response(self, intent: str, text: str, user_id: str = "default", emotion: str = "neutral") -> str:
+    def extract_entities(self, text: str) -> List[EntitySpan]:
+        """Districts, colleges and courses named in the message (none without a database answer source)"""
+        return self.answers.extract(text) if self.answers is not None else []
+
+    def generate_contextual_response(self, intent: str, text: str, user_id: str = "default", emotion: str = "neutral",
+                                     entities: Optional[List[EntitySpan]] = None) -> str:
         """Generate response considering context and emotion"""
-        recent_messages = list(self.conversation_memory[user_id])
+        recent_messages = self._recent_messages(user_id)
         
-        # Get base response
-        base_responses = self.intent_patterns[intent]['responses']
-        response = random.choice(base_responses)
+        # Get base response: a database answer when the message names
+        # something we have rows for, then a reference answer for one of
+        # its keywords, otherwise a template
+        response = self.answers.answer(intent, text, entities) if self.answers is not None else None
+        if response is None and self.knowledge is not None:
+            response = self.knowledge.get_matched_response(intent, text)
+        if response is None:
+            base_responses = self.intent_patterns[intent]['responses']
+            response = random.choice(base_responses)
         
         # Add emotional tone
         if emotion == 'negative':
@@ -217,7 +300,7 @@ class AdvancedChatbot:
         
         return response
 
-    def _get_proactive_suggestion(self, intent: str, history: List[Dict]) -> Optional[str]:
+    def _get_proactive_suggestion(self, intent: str, history: List[Interaction]) -> Optional[str]:
         """Get proactive suggestions based on conversation history"""
         suggestions = {
             'colleges': 'scholarship opportunities for your chosen field',
@@ -226,75 +309,176 @@ class AdvancedChatbot:
         }
         return suggestions.get(intent)
 
-    def learn_from_interaction(self, user_id: str, user_message: str, bot_response: str, intent: str, confidence: float):
+    def learn_from_interaction(self, user_id: str, user_message: str, bot_response: str, intent: str, confidence: float, emotion: str = "neutral") -> UserState:
         """Learn from user interactions to improve responses"""
-        interaction = {
-            'timestamp': datetime.now(),
-            'user_message': user_message,
-            'bot_response': bot_response,
-            'intent': intent,
-            'confidence': confidence
-        }
+        interaction = Interaction.create(user_message, bot_response, intent, emotion, confidence)
         
-        self.learning_data[user_id].append(interaction)
-        
-        # Keep only last 50 interactions per user
-        if len(self.learning_data[user_id]) > 50:
-            self.learning_data[user_id] = self.learning_data[user_id][-50:]
+        # The ring buffer keeps only the last 50 interactions per user; the
+        # last 10 of them are the conversation memory
+        state = self._get_state(user_id) or self.user_states.get_or_create(user_id)
+        state.add_interaction(interaction)
+        self.user_states.commit(user_id, state)
+        if self.conversation_store is not None:
+            self.conversation_store.record(user_id, interaction)
+        return state
 
-    def get_personalized_response(self, user_id: str, text: str) -> Dict:
+    def get_personalized_response(self, user_id: str, text: str,
+                                  prediction: Optional[Tuple[str, float]] = None) -> Dict:
         """Get personalized response based on user history and preferences"""
+        # Hold the user's lock for the whole turn so concurrent or cross-worker
+        # follow-ups see each other's context
+        with self.user_states.lock(user_id):
+            return self._personalized_response(user_id, text, prediction)
+
+    def _personalized_response(self, user_id: str, text: str, prediction: Optional[Tuple[str, float]] = None) -> Dict:
+        # Match intents and emotions in a single pass over the message
+        scan = self.intent_engine.scan(text)
+        
         # Detect emotion
-        emotion = self.detect_emotion(text)
+        emotion = self.detect_emotion(text, scan)
         
         # Detect intent with advanced processing
-        intent, confidence = self.detect_intent_advanced(text, user_id)
+        intent, confidence = self.detect_intent_advanced(text, user_id, scan, prediction)
         
-        # Generate contextual response
-        response = self.generate_contextual_response(intent, text, user_id, emotion)
+        # Find the districts, colleges and courses it names
+        entities = self.extract_entities(text)
         
-        # Store in conversation memory
-        conversation_entry = {
-            'timestamp': datetime.now(),
-            'user_message': text,
-            'intent': intent,
-            'confidence': confidence,
-            'emotion': emotion
-        }
-        self.conversation_memory[user_id].append(conversation_entry)
+        # Generate contextual response
+        response = self.generate_contextual_response(intent, text, user_id, emotion, entities)
         
-        # Learn from this interaction
-        self.learn_from_interaction(user_id, text, response, intent, confidence)
+        # Store in conversation memory and learn from this interaction
+        state = self.learn_from_interaction(user_id, text, response, intent, confidence, emotion)
         
         return {
             'response': response,
             'intent': intent,
             'confidence': confidence,
             'emotion': emotion,
-            'context_aware': len(self.conversation_memory[user_id]) > 1
+            'entities': [span._asdict() for span in entities],
+            'context_aware': state.conversation_length > 1
         }
 
+    def iter_personalized_responses(self, batch: Iterable[Tuple[str, str]]) -> Iterator[Optional[Dict]]:
+        """Process `(user_id, message)` pairs in order, yielding each result as it is produced.
+
+        Messages are handled strictly in submission order, so several turns
+        from the same user build on each other's context. A message that
+        fails yields None instead of aborting the rest of the batch. With an
+        intent model, messages are scored INTENT_MODEL_BATCH_SIZE at a time.
+        """
+        batch = iter(batch)
+        chunk_size = INTENT_MODEL_BATCH_SIZE if self.intent_model is not None else 1
+        while True:
+            chunk = list(islice(batch, chunk_size))
+            if not chunk:
+                return
+            predictions = self.predict_intents([text for _, text in chunk])
+            for (user_id, text), prediction in zip(chunk, predictions):
+                try:
+                    yield self.get_personalized_response(user_id, text, prediction)
+                except Exception as e:
+                    logger.error(f"Batch chatbot error for user {user_id}: {str(e)}")
+                    yield None
+
+    def get_personalized_responses(self, batch: Iterable[Tuple[str, str]]) -> List[Optional[Dict]]:
+        """Get personalized responses for a batch of `(user_id, message)` pairs"""
+        return list(self.iter_personalized_responses(batch))
+
     def get_user_insights(self, user_id: str) -> Dict:
         """Get insights about user's interests and preferences"""
-        if user_id not in self.learning_data:
+        state = self._get_state(user_id)
+        if state is None or not state.interactions:
             return {"message": "No data available yet"}
         
-        interactions = self.learning_data[user_id]
-        
-        # Analyze interests
-        intent_counts = defaultdict(int)
-        for interaction in interactions:
-            intent_counts[interaction['intent']] += 1
-        
-        # Get most common interests
-        top_interests = sorted(intent_counts.items(), key=lambda x: x[1], reverse=True)[:3]
-        
+        # Intent counts are kept up to date as interactions are recorded
         return {
-            'total_interactions': len(interactions),
-            'top_interests': top_interests,
-            'recent_emotions': [i['emotion'] for i in interactions[-5:]],
-            'conversation_length': len(self.conversation_memory[user_id])
+            'total_interactions': len(state.interactions),
+            'top_interests': state.top_intents(3),
+            'recent_emotions': state.recent_emotions(5),
+            'conversation_length': state.conversation_length
         }
 
-# Global instance
-advanced_chatbot = AdvancedChatbot()
+    def get_users_insights(self, user_ids: Iterable[str]) -> Dict[str, Dict]:
+        """Get insights for many users at once"""
+        return {user_id: self.get_user_insights(user_id) for user_id in user_ids}
+
+    @property
+    def blocking(self) -> bool:
+        """Whether a turn may block on database I/O rather than only use CPU"""
+        return self.user_states.blocking or self.conversation_store is not None or self.answers is not None
+
+    def stats(self) -> Dict:
+        """Operational statistics for the stores, database answers and intent model"""
+        return {
+            'user_state': self.user_states.stats(),
+            'conversation_store': self.conversation_store.stats() if self.conversation_store is not None else None,
+            'answers': self.answers.stats() if self.answers is not None else None,
+            'intent_model': dict(self.intent_model.stats(), threshold=self.intent_model_threshold,
+                                 decisions=self.model_decisions,
+                                 fallbacks=self.model_fallbacks) if self.intent_model is not None else None
+        }
+
+    def close(self) -> None:
+        """Flush persisted history before shutdown"""
+        if self.conversation_store is not None:
+            self.conversation_store.close()
+
+# Global instance; built on the first chat so startup doesn't pay for the
+# knowledge base, pattern compilation and history stores
+advanced_chatbot: Optional[AdvancedChatbot] = None
+# Chat turns run on the threadpool, so two first chats can race to build it
+_advanced_chatbot_lock = threading.Lock()
+# Database answers for the shared chatbot; main installs them because they
+# share its scholarship index and change watchers
+chatbot_answers: Optional[ChatbotAnswers] = None
+
+def set_chatbot_answers(answers: Optional[ChatbotAnswers]) -> None:
+    global chatbot_answers
+    with _advanced_chatbot_lock:
+        chatbot_answers = answers
+        if advanced_chatbot is not None:
+            advanced_chatbot.answers = answers
+
+def get_advanced_chatbot() -> AdvancedChatbot:
+    """The shared chatbot, built from settings on first use"""
+    global advanced_chatbot
+    chatbot = advanced_chatbot
+    if chatbot is None:
+        with _advanced_chatbot_lock:
+            if advanced_chatbot is None:
+                # Imported here so `import main` doesn't parse the knowledge file
+                from chatbot_knowledge import knowledge_base
+                chatbot = AdvancedChatbot(
+                    conversation_store=create_conversation_store(settings), answers=chatbot_answers,
+                    intent_model_threshold=settings.CHATBOT_INTENT_MODEL_MIN_CONFIDENCE,
+                    knowledge=knowledge_base)
+                chatbot.intent_model = load_intent_model(settings, chatbot.intent_patterns)
+                advanced_chatbot = chatbot
+            chatbot = advanced_chatbot
+    return chatbot
+
+def load_intent_model(settings, known_intents: Iterable[str]) -> Optional[IntentModel]:
+    """Memory-map the model at CHATBOT_INTENT_MODEL_PATH.
+
+    None (patterns only) if unset, unreadable, or trained on intents the
+    patterns don't know, since the chatbot could not answer those.
+    """
+    path = settings.CHATBOT_INTENT_MODEL_PATH
+    if not path:
+        return None
+    try:
+        model = IntentModel.load(path)
+    except (OSError, ValueError, KeyError) as e:
+        logger.error(f"Could not load intent model {path}, using patterns only: {str(e)}")
+        return None
+    unknown = set(model.classes) - set(known_intents)
+    if unknown:
+        logger.error(f"Intent model {path} predicts unknown intents {', '.join(sorted(unknown))}, "
+                     "using patterns only")
+        return None
+    logger.info(f"Loaded intent model {path}: {len(model.feature_ids)} features")
+    return model
+
+def close_advanced_chatbot() -> None:
+    if advanced_chatbot is not None:
+        advanced_chatbot.close()
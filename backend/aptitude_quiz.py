@@ -0,0 +1,385 @@
+import datetime
+import json
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Short keys for the aptitude areas, in the order chatbot_knowledge lists them
+LOGICAL, VERBAL, MATHEMATICAL, CREATIVE, LEADERSHIP = range(5)
+AREA_COUNT = LEADERSHIP + 1
+
+
+def aptitude_areas() -> Tuple[str, ...]:
+    """The aptitude area names from the chatbot knowledge, in the order of the keys above"""
+    # Imported here so `import main` doesn't parse the knowledge file
+    from chatbot_knowledge import knowledge_base
+    areas = tuple(knowledge_base.knowledge["career_guidance"]["aptitude_areas"])
+    if len(areas) != AREA_COUNT:
+        raise ValueError(f"Expected {AREA_COUNT} aptitude areas in the chatbot knowledge, found {len(areas)}")
+    return areas
+
+
+class QuizOption(NamedTuple):
+    id: str
+    text: str
+    weights: Dict[int, float]  # aptitude area index -> points
+
+
+class QuizQuestion(NamedTuple):
+    id: str
+    text: str
+    options: Tuple[QuizOption, ...]
+
+
+class CareerProfile(NamedTuple):
+    name: str
+    category: str
+    description: str
+    weights: Tuple[float, ...]  # one per aptitude area
+
+
+def _question(question_id, text, *options):
+    return QuizQuestion(question_id, text, tuple(
+        QuizOption(chr(ord("a") + index), option_text, weights) for index, (option_text, weights) in enumerate(options)
+    ))
+
+
+QUESTIONS = (
+    _question("q1", "How do you prefer to solve problems?",
+              ("Analyze data and find patterns", {MATHEMATICAL: 2, LOGICAL: 1}),
+              ("Collaborate with others to brainstorm solutions", {LEADERSHIP: 1, VERBAL: 1}),
+              ("Follow established procedures and methodologies", {LOGICAL: 2}),
+              ("Think creatively and try unconventional approaches", {CREATIVE: 2})),
+    _question("q2", "In a team setting, which role do you naturally take on?",
+              ("The leader who directs the team", {LEADERSHIP: 2}),
+              ("The creative who generates ideas", {CREATIVE: 2}),
+              ("The analyst who evaluates options", {LOGICAL: 1, MATHEMATICAL: 1}),
+              ("The supporter who helps others succeed", {VERBAL: 1, LEADERSHIP: 1})),
+    _question("q3", "Which work environment do you thrive in?",
+              ("Structured with clear guidelines", {LOGICAL: 1, MATHEMATICAL: 1}),
+              ("Flexible with room for creativity", {CREATIVE: 2}),
+              ("Collaborative with frequent team interaction", {LEADERSHIP: 1, VERBAL: 1}),
+              ("Independent with minimal supervision", {LOGICAL: 1, CREATIVE: 1})),
+    _question("q4", "Which school subject do you enjoy most?",
+              ("Mathematics", {MATHEMATICAL: 2}),
+              ("English or Urdu literature", {VERBAL: 2}),
+              ("Physics or Chemistry", {LOGICAL: 1, MATHEMATICAL: 1}),
+              ("Art, music or design", {CREATIVE: 2})),
+    _question("q5", "What would you most like to do on a free afternoon?",
+              ("Solve puzzles or play chess", {LOGICAL: 2}),
+              ("Read, write or debate", {VERBAL: 2}),
+              ("Draw, paint, photograph or make videos", {CREATIVE: 2}),
+              ("Organize an event with friends", {LEADERSHIP: 2})),
+    _question("q6", "A friend asks for help with a difficult decision. You...",
+              ("List the pros and cons and weigh them", {LOGICAL: 2}),
+              ("Listen and help them put their feelings into words", {VERBAL: 2}),
+              ("Suggest an option nobody had considered", {CREATIVE: 2}),
+              ("Help them make a plan and stick to it", {LEADERSHIP: 2})),
+    _question("q7", "How comfortable are you with numbers and calculations?",
+              ("Very comfortable; I enjoy them", {MATHEMATICAL: 2}),
+              ("Comfortable when they serve a purpose", {MATHEMATICAL: 1, LOGICAL: 1}),
+              ("I prefer working with words", {VERBAL: 2}),
+              ("I prefer working with images and ideas", {CREATIVE: 2})),
+    _question("q8", "Which achievement would make you proudest?",
+              ("Finding the flaw in a complicated argument", {LOGICAL: 2}),
+              ("Giving a speech that moves an audience", {VERBAL: 2}),
+              ("Creating something original that people admire", {CREATIVE: 2}),
+              ("Leading a team to win a competition", {LEADERSHIP: 2})),
+    _question("q9", "When you learn something new, you prefer to...",
+              ("Work through examples and exercises", {MATHEMATICAL: 1, LOGICAL: 1}),
+              ("Read about it and discuss it", {VERBAL: 2}),
+              ("Experiment and build something", {CREATIVE: 1, LOGICAL: 1}),
+              ("Teach it to someone else", {LEADERSHIP: 1, VERBAL: 1})),
+    _question("q10", "Which responsibility would you volunteer for?",
+              ("Managing the budget", {MATHEMATICAL: 2}),
+              ("Writing the announcements", {VERBAL: 2}),
+              ("Designing the posters", {CREATIVE: 2}),
+              ("Coordinating the volunteers", {LEADERSHIP: 2})),
+)
+
+
+def _career(name, category, description, logical, verbal, mathematical, creative, leadership):
+    return CareerProfile(name, category, description, (logical, verbal, mathematical, creative, leadership))
+
+
+CAREER_PROFILES = (
+    _career("Software Engineering", "Engineering", "Design and build software systems", 5, 2, 4, 3, 2),
+    _career("Civil Engineering", "Engineering", "Plan and build roads, bridges and buildings", 4, 2, 5, 2, 3),
+    _career("Mechanical Engineering", "Engineering", "Design machines and manufacturing systems", 4, 1, 5, 3, 2),
+    _career("Electrical Engineering", "Engineering", "Work on power systems and electronics", 5, 1, 5, 2, 2),
+    _career("Data Science", "Engineering", "Find insight in data with statistics and code", 5, 2, 5, 2, 2),
+    _career("Medicine (MBBS)", "Medicine", "Diagnose and treat patients", 5, 4, 3, 1, 3),
+    _career("Dentistry", "Medicine", "Care for patients' oral health", 4, 3, 3, 2, 2),
+    _career("Pharmacy", "Medicine", "Prepare and dispense medicines", 4, 2, 4, 1, 2),
+    _career("Nursing", "Medicine", "Provide patient care in hospitals and communities", 3, 4, 2, 1, 3),
+    _career("Business Administration (MBA)", "Management", "Run teams, products and companies", 3, 4, 3, 2, 5),
+    _career("Chartered Accountancy", "Management", "Audit, tax and financial advice", 4, 2, 5, 1, 2),
+    _career("Hotel Management and Tourism", "Management", "Run hospitality and tourism businesses", 2, 4, 2, 3, 4),
+    _career("Teaching", "Education", "Teach and mentor school students", 3, 5, 2, 3, 4),
+    _career("Research Scientist", "Education", "Investigate open questions in a field", 5, 3, 4, 3, 1),
+    _career("Educational Administration", "Education", "Lead schools and education programmes", 3, 4, 2, 2, 5),
+    _career("Civil Services (IAS/KAS)", "Government Services", "Administer districts and public policy", 4, 5, 3, 2, 5),
+    _career("Banking", "Government Services", "Manage accounts, loans and branch operations", 3, 3, 5, 1, 3),
+    _career("Defence Services", "Government Services", "Serve in the armed forces", 3, 2, 2, 1, 5),
+    _career("Law", "Government Services", "Advise clients and argue cases", 4, 5, 2, 2, 4),
+    _career("Journalism and Mass Media", "Media", "Report, write and produce news", 3, 5, 1, 4, 3),
+    _career("Graphic and UX Design", "Design", "Design visual identities and digital products", 2, 3, 1, 5, 2),
+    _career("Architecture", "Design", "Design buildings and spaces", 3, 2, 4, 5, 2),
+    _career("Fine Arts and Handicrafts", "Design", "Create art, including Kashmir's traditional crafts", 1, 2, 1, 5, 1),
+    _career("Psychology and Counselling", "Healthcare", "Help people with their mental wellbeing", 3, 5, 2, 3, 3),
+)
+
+
+class RecommendationStore(ABC):
+    """Durable copy of cached recommendations, keyed by quantized profile"""
+
+    name = "base"
+
+    @abstractmethod
+    def save_many(self, entries: List[Dict]) -> None:
+        ...
+
+
+class MongoRecommendationStore(RecommendationStore):
+    """Upserts into `database.career_recommendations_collection`.
+
+    Takes the synchronous pymongo collection (`motor_collection.delegate`);
+    writes happen on the scoring thread, before the result is returned.
+    """
+
+    name = "mongo"
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def save_many(self, entries: List[Dict]) -> None:
+        from pymongo import UpdateOne
+        self._collection.bulk_write(
+            [UpdateOne({"profile": entry["profile"], "top_k": entry["top_k"]}, {"$set": entry}, upsert=True)
+             for entry in entries],
+            ordered=False,
+        )
+
+
+class QuizEngine:
+    """Aptitude quiz scoring and career recommendations in NumPy.
+
+    Options are encoded as a (questions, options + 1, areas) weight tensor,
+    the extra option being "unanswered". A cohort's answers are an
+    (students, questions) matrix of option indices, so trait vectors for
+    everyone come from one gather and sum, and career scores from one
+    matrix product with the L2-normalised career-profile matrix (i.e. the
+    cosine similarity between traits and careers).
+
+    With a `cache`, trait vectors are quantized to `trait_levels` steps per
+    area and the ranked careers are memoized per quantized profile, so a
+    cohort only ranks the profiles not seen since the catalog last changed.
+    Newly ranked profiles are written through to `store`. `areas` names
+    the aptitude areas and defaults to the chatbot knowledge's.
+    """
+
+    def __init__(self, questions: Sequence[QuizQuestion] = QUESTIONS,
+                 careers: Sequence[CareerProfile] = CAREER_PROFILES,
+                 cache: Optional[TTLCache] = None, trait_levels: int = 10,
+                 store: Optional[RecommendationStore] = None, areas: Optional[Sequence[str]] = None):
+        self.areas = tuple(areas) if areas is not None else aptitude_areas()
+        self.questions = tuple(questions)
+        self.question_index = {question.id: index for index, question in enumerate(self.questions)}
+        self.option_index = [
+            {option.id: index for index, option in enumerate(question.options)} for question in self.questions
+        ]
+        self.unanswered = max(len(question.options) for question in self.questions)
+        weights = np.zeros((len(self.questions), self.unanswered + 1, AREA_COUNT), dtype=np.float32)
+        for q, question in enumerate(self.questions):
+            for o, option in enumerate(question.options):
+                for area, points in option.weights.items():
+                    weights[q, o, area] = points
+        self.weights = weights
+        # Best achievable points per area, used to scale traits to 0..1
+        self.max_points = np.maximum(weights.max(axis=1).sum(axis=0), 1)
+        self.questions_json = json.dumps([
+            {"id": question.id, "text": question.text,
+             "options": [{"id": option.id, "text": option.text} for option in question.options]}
+            for question in self.questions
+        ]).encode()
+        self.cache = cache
+        self.trait_levels = trait_levels
+        self.store = store
+        self._store_writes = 0
+        self._store_failures = 0
+        self._lock = threading.Lock()
+        self.catalog_version = 0
+        self.set_careers(careers)
+
+    @property
+    def blocking(self) -> bool:
+        """Whether scoring may wait on I/O (the write-through store)"""
+        return self.store is not None
+
+    def set_careers(self, careers: Sequence[CareerProfile]) -> None:
+        """Replace the career catalog and drop every cached ranking"""
+        careers = tuple(careers)
+        matrix = np.array([career.weights for career in careers], dtype=np.float32).reshape(-1, AREA_COUNT)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        with self._lock:
+            self.catalog_version += 1
+            # Swapped as one tuple so a concurrent scorer never pairs old names with a new matrix
+            self.catalog = (careers, matrix / np.where(norms == 0, 1, norms), self.catalog_version)
+            if self.cache is not None:
+                self.cache.invalidate()
+
+    @property
+    def careers(self) -> Tuple[CareerProfile, ...]:
+        return self.catalog[0]
+
+    def encode_answers(self, answers: Dict[str, str]) -> np.ndarray:
+        """Option indices per question; raises ValueError for unknown questions or options"""
+        encoded = np.full(len(self.questions), self.unanswered, dtype=np.intp)
+        for question_id, option_id in answers.items():
+            q = self.question_index.get(question_id)
+            if q is None:
+                raise ValueError(f"Unknown question: {question_id}")
+            o = self.option_index[q].get(option_id)
+            if o is None:
+                raise ValueError(f"Unknown option {option_id!r} for question {question_id}")
+            encoded[q] = o
+        return encoded
+
+    def traits(self, encoded: np.ndarray) -> np.ndarray:
+        """(students, areas) aptitude scores in 0..1 from (students, questions) option indices"""
+        points = self.weights[np.arange(len(self.questions)), encoded].sum(axis=-2)
+        return points / self.max_points
+
+    def recommend(self, traits: np.ndarray, top_k: int = 5,
+                  career_matrix: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Indices into `careers` and cosine scores of each student's top careers, best first"""
+        if career_matrix is None:
+            career_matrix = self.catalog[1]
+        norms = np.linalg.norm(traits, axis=-1, keepdims=True)
+        scores = (traits / np.where(norms == 0, 1, norms)) @ career_matrix.T
+        top_k = min(top_k, scores.shape[-1])
+        top = np.argpartition(-scores, top_k - 1, axis=-1)[..., :top_k]
+        top_scores = np.take_along_axis(scores, top, axis=-1)
+        order = np.argsort(-top_scores, axis=-1, kind="stable")
+        return np.take_along_axis(top, order, axis=-1), np.take_along_axis(top_scores, order, axis=-1)
+
+    def score(self, answers: Dict[str, str], top_k: int = 5) -> Dict:
+        return self.score_batch([answers], top_k)[0]
+
+    def _rank(self, traits: np.ndarray, top_k: int, catalog) -> List[List[Dict]]:
+        careers, career_matrix, _ = catalog
+        career_ids, career_scores = self.recommend(traits, top_k, career_matrix)
+        # Convert once per array; per-element float() calls dominate otherwise
+        return [
+            [{"career": careers[career].name, "category": careers[career].category,
+              "description": careers[career].description, "score": score}
+             for career, score in zip(ids, scores)]
+            for ids, scores in zip(career_ids.tolist(), np.round(career_scores.astype(np.float64), 4).tolist())
+        ]
+
+    def _cached_rank(self, traits: np.ndarray, top_k: int, catalog) -> List[List[Dict]]:
+        version = catalog[2]
+        levels = np.rint(traits * self.trait_levels).astype(np.int8)
+        profiles = [row.tobytes() for row in levels]
+        ranked: Dict[bytes, Optional[List[Dict]]] = {}
+        missing = []
+        for index, profile in enumerate(profiles):
+            if profile not in ranked:
+                ranked[profile] = self.cache.get((version, top_k, profile))
+                if ranked[profile] is None:
+                    missing.append(index)
+        if missing:
+            fresh = self._rank(levels[missing] / self.trait_levels, top_k, catalog)
+            for index, recommendations in zip(missing, fresh):
+                ranked[profiles[index]] = recommendations
+                self.cache.set((version, top_k, profiles[index]), recommendations)
+            if self.store is not None:
+                self._write_through(levels[missing], fresh, top_k, version)
+        return [ranked[profile] for profile in profiles]
+
+    def _write_through(self, profiles: np.ndarray, ranked: List[List[Dict]], top_k: int, version: int) -> None:
+        now = datetime.datetime.utcnow()
+        entries = [
+            {"profile": profile, "top_k": top_k, "catalog_version": version,
+             "recommendations": recommendations, "updated_at": now}
+            for profile, recommendations in zip(profiles.tolist(), ranked)
+        ]
+        try:
+            self.store.save_many(entries)
+            self._store_writes += len(entries)
+        except Exception as e:
+            self._store_failures += 1
+            logger.error(f"Career recommendation write-through failed: {str(e)}")
+
+    def score_batch(self, cohort: Sequence[Dict[str, str]], top_k: int = 5) -> List[Dict]:
+        """Score every student's answers in one vectorized pass"""
+        encoded = np.array([self.encode_answers(answers) for answers in cohort], dtype=np.intp)
+        traits = self.traits(encoded.reshape(-1, len(self.questions)))
+        catalog = self.catalog
+        if self.cache is not None:
+            recommendations = self._cached_rank(traits, top_k, catalog)
+        else:
+            recommendations = self._rank(traits, top_k, catalog)
+        top_areas = np.argsort(-traits, axis=1, kind="stable")[:, :2]
+        return [
+            {
+                "traits": dict(zip(self.areas, student_traits)),
+                "top_areas": [self.areas[area] for area in areas],
+                "recommendations": student_recommendations,
+            }
+            for student_traits, areas, student_recommendations in zip(
+                np.round(traits.astype(np.float64), 4).tolist(), top_areas.tolist(), recommendations)
+        ]
+
+    def stats(self) -> Dict:
+        return {
+            "catalog_version": self.catalog_version,
+            "careers": len(self.careers),
+            "trait_levels": self.trait_levels if self.cache is not None else None,
+            "cache": self.cache.stats() if self.cache is not None else None,
+            "store": {
+                "backend": self.store.name,
+                "writes": self._store_writes,
+                "failures": self._store_failures,
+            } if self.store is not None else None,
+        }
+
+
+def create_quiz_engine(settings) -> QuizEngine:
+    """Build the engine configured by the CAREER_* settings"""
+    cache = None
+    if settings.CAREER_CACHE_SIZE > 0:
+        cache = TTLCache(maxsize=settings.CAREER_CACHE_SIZE, ttl=settings.CAREER_CACHE_TTL_SECONDS)
+    store = None
+    if settings.CAREER_RECOMMENDATIONS_BACKEND == "mongo":
+        import database
+        if database.mongo_db is None:
+            raise RuntimeError("CAREER_RECOMMENDATIONS_BACKEND=mongo requires motor to be installed")
+        store = MongoRecommendationStore(database.career_recommendations_collection.delegate)
+    elif settings.CAREER_RECOMMENDATIONS_BACKEND != "none":
+        raise ValueError(f"Unknown career recommendations backend: {settings.CAREER_RECOMMENDATIONS_BACKEND}")
+    return QuizEngine(cache=cache, trait_levels=settings.CAREER_TRAIT_LEVELS, store=store, areas=aptitude_areas())
+
+
+quiz_engine: Optional[QuizEngine] = None
+_quiz_engine_lock = threading.Lock()
+
+
+def get_quiz_engine() -> QuizEngine:
+    """The shared engine, built from settings on first use"""
+    global quiz_engine
+    engine = quiz_engine
+    if engine is None:
+        with _quiz_engine_lock:
+            if quiz_engine is None:
+                from config import settings
+                quiz_engine = create_quiz_engine(settings)
+            engine = quiz_engine
+    return engine
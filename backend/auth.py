@@ -1,21 +1,47 @@
-from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import List, Optional
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, make_transient_to_detached
 import database as db
+from cache import TTLCache
 from config import settings
+from password_hashing import HasherBusy, PasswordHasher
+import hashlib
+import time
 
 # Security configurations
 SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = settings.ALGORITHM
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+password_hasher = PasswordHasher(
+    rounds=settings.PASSWORD_HASH_ROUNDS,
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+)
+# For scripts and seeding; request handlers go through password_hasher
+pwd_context = password_hasher.context
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/token")
 
+# Verified tokens (sha256 of the token -> username), each kept until its exp
+token_cache = TTLCache(maxsize=settings.TOKEN_CACHE_SIZE)
+# User column values by username; the TTL bounds staleness across workers,
+# writes in this process evict immediately
+user_cache = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
+USER_COLUMNS = tuple(column.key for column in db.User.__table__.columns)
+
+def _evict_users(changes: List[db.ChangeEvent]):
+    for change in changes:
+        if "username" in change.values:
+            user_cache.pop(change.values["username"])
+        else:
+            user_cache.invalidate()
+
+db.watch_changes([db.User], _evict_users)
+
 # Password and token utilities
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -34,12 +60,62 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 # User authentication functions
-def authenticate_user(db_session: Session, username: str, password: str):
-    user = db_session.query(db.User).filter(db.User.username == username).first()
+async def authenticate_user(db_session: Session, username: str, password: str):
+    """The user if the password matches, else False; may raise HasherBusy.
+
+    A stored hash made with other parameters than PASSWORD_HASH_ROUNDS is
+    replaced with a fresh one while the plain password is at hand.
+    """
+    def lookup():
+        user = db_session.query(db.User).filter(db.User.username == username).first()
+        # Hand the connection back to the pool for the duration of the hash;
+        # the user stays loaded, detached
+        db_session.close()
+        return user
+
+    def save_hash(new_hash):
+        db_session.add(user)
+        user.hashed_password = new_hash
+        db_session.commit()
+
+    user = await run_in_threadpool(lookup)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    verified, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+    if not verified:
         return False
+    if new_hash is not None:
+        await run_in_threadpool(save_hash, new_hash)
+    return user
+
+def verify_token(token: str) -> Optional[str]:
+    """The token's subject if it is valid and unexpired, else None"""
+    key = hashlib.sha256(token.encode()).digest()
+    username = token_cache.get(key)
+    if username is not None:
+        return username
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    username = payload.get("sub")
+    expires = payload.get("exp")
+    if username is not None and expires is not None:
+        token_cache.set(key, username, ttl=expires - time.time())
+    return username
+
+def load_user(db_session: Session, username: str) -> Optional[db.User]:
+    """The user attached to `db_session`, from the user cache when possible"""
+    values = user_cache.get(username)
+    if values is None:
+        user = db_session.query(db.User).filter(db.User.username == username).first()
+        if user is not None:
+            user_cache.set(username, {column: getattr(user, column) for column in USER_COLUMNS})
+        return user
+    user = db.User(**values)
+    # Attach as an already-persistent row, without a SELECT
+    make_transient_to_detached(user)
+    db_session.add(user)
     return user
 
 def get_current_user(db_session: Session = Depends(db.get_db), token: str = Depends(oauth2_scheme)):
@@ -48,14 +124,20 @@ def get_current_user(db_session: Session = Depends(db.get_db), token: str = Depe
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except JWTError:
+    username = verify_token(token)
+    if username is None:
         raise credentials_exception
-    user = db_session.query(db.User).filter(db.User.username == username).first()
+    user = load_user(db_session, username)
     if user is None:
         raise credentials_exception
+    if not user.is_active:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Inactive user")
     return user
+
+def get_current_admin(current_user: db.User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required",
+        )
+    return current_user
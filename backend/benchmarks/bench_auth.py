@@ -0,0 +1,116 @@
+"""Authenticated requests per second with and without the auth caches.
+
+Serves /api/users/me in-process (httpx over ASGI) against a temporary SQLite
+database holding a few hundred users, next to the pre-cache version of the
+route mounted under /bench/legacy: it decodes the JWT on every request and
+loads the user through a second session of its own. Each round sends the
+same number of requests from a fixed pool of concurrent clients, each
+client using one user's token as a logged-in browser would.
+
+Run from the backend directory:
+    python benchmarks/bench_auth.py [requests] [concurrency]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+from fastapi import Depends, HTTPException  # noqa: E402
+from jose import JWTError, jwt  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import Session, sessionmaker  # noqa: E402
+
+import auth  # noqa: E402
+import database as db  # noqa: E402
+import main  # noqa: E402
+
+USERS = 500
+
+
+def setup_database(path):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    db.Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with SessionLocal() as session:
+        session.add_all(
+            db.User(username=f"user{n}", email=f"user{n}@example.com", hashed_password="x",
+                    full_name=f"User {n}", district="Srinagar", education_level="12th")
+            for n in range(USERS)
+        )
+        session.commit()
+
+    def get_db():
+        session = SessionLocal()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    def get_legacy_db():
+        yield from get_db()
+
+    def legacy_current_user(db_session: Session = Depends(get_legacy_db),
+                            token: str = Depends(auth.oauth2_scheme)):
+        try:
+            username = jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM]).get("sub")
+        except JWTError:
+            raise HTTPException(status_code=401)
+        user = db_session.query(db.User).filter(db.User.username == username).first()
+        if user is None:
+            raise HTTPException(status_code=401)
+        return user
+
+    @main.app.get("/bench/legacy/me", response_model=main.UserResponse)
+    def legacy_me(current_user: db.User = Depends(legacy_current_user), db_session: Session = Depends(get_db)):
+        return current_user
+
+    main.app.dependency_overrides[db.get_db] = get_db
+    return engine
+
+
+async def drive(client, path, tokens, requests, concurrency):
+    per_client = requests // concurrency
+
+    async def worker(n):
+        headers = {"Authorization": f"Bearer {tokens[n % len(tokens)]}"}
+        for _ in range(per_client):
+            response = await client.get(path, headers=headers)
+            assert response.status_code == 200, response.text
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    return per_client * concurrency / (time.perf_counter() - started)
+
+
+async def run(requests, concurrency):
+    tokens = [auth.create_access_token({"sub": f"user{n}"}) for n in range(USERS)]
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        results = {}
+        for label, path in (("legacy (decode + query, 2 sessions)", "/bench/legacy/me"),
+                            ("cached (token + user cache)", "/api/users/me")):
+            await drive(client, path, tokens, concurrency * 2, concurrency)  # warm up
+            results[label] = await drive(client, path, tokens, requests, concurrency)
+    return results
+
+
+def benchmark(requests=5000, concurrency=32):
+    with tempfile.TemporaryDirectory() as directory:
+        engine = setup_database(os.path.join(directory, "bench.db"))
+        results = asyncio.run(run(requests, concurrency))
+        engine.dispose()
+    print(f"{requests:,} GET /users/me requests, {concurrency} concurrent clients, {USERS} users")
+    baseline = None
+    for label, rps in results.items():
+        baseline = baseline or rps
+        print(f"{label:36}: {rps:8.0f} req/s  ({rps / baseline:.2f}x)")
+    print(f"token cache: {auth.token_cache.stats()}")
+    print(f"user cache : {auth.user_cache.stats()}")
+
+
+if __name__ == "__main__":
+    benchmark(*(int(arg) for arg in sys.argv[1:3]))
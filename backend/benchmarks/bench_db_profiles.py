@@ -0,0 +1,145 @@
+"""Mixed read/write throughput on SQLite under each engine profile.
+
+For each DB_ENGINE_PROFILE, builds a fresh database file with the app's
+models (colleges with courses, scholarships, timeline events, users) and
+runs worker threads for a fixed time, each doing a random mix of the
+app's reads (college page with courses, scholarship list, user lookup)
+and writes (new timeline event, course insert, user profile update),
+one session and transaction per operation. Reports operations per
+second, read and write p50/p99 latency and operations that failed with
+"database is locked".
+
+Run from the backend directory:
+    python benchmarks/bench_db_profiles.py [--threads 8] [--seconds 5] [--write-ratio 0.2]
+"""
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.orm import selectinload, sessionmaker  # noqa: E402
+
+import database as db  # noqa: E402
+from engine_profiles import PROFILES, make_engine  # noqa: E402
+
+COLLEGES = 500
+USERS = 2000
+
+
+def seed(SessionLocal):
+    rng = random.Random(1)
+    with SessionLocal() as session:
+        for n in range(COLLEGES):
+            college = db.College(name=f"College {n}", district=f"District {n % 20}", description="x" * 200)
+            college.courses = [db.Course(name=f"Course {n}-{k}", duration="3 years", eligibility="12th pass")
+                               for k in range(5)]
+            session.add(college)
+        session.add_all(db.Scholarship(name=f"Scholarship {n}", eligibility="Students from J&K", amount=n * 100,
+                                       deadline=datetime.datetime(2030, 1, 1)) for n in range(300))
+        session.add_all(db.User(username=f"user{n}", email=f"user{n}@example.com", hashed_password="x",
+                                full_name=f"User {n}") for n in range(USERS))
+        session.commit()
+
+
+def read_college(session, rng):
+    start = rng.randrange(COLLEGES)
+    session.query(db.College).options(selectinload(db.College.courses)).filter(
+        db.College.id > start).order_by(db.College.id).limit(20).all()
+
+
+def read_scholarships(session, rng):
+    session.query(db.Scholarship).order_by(db.Scholarship.deadline).limit(50).all()
+
+
+def read_user(session, rng):
+    session.query(db.User).filter(db.User.username == f"user{rng.randrange(USERS)}").first()
+
+
+def write_timeline(session, rng):
+    session.add(db.Timeline(title="Event", event_type="exam", start_date=datetime.datetime.utcnow()))
+    session.commit()
+
+
+def write_course(session, rng):
+    session.add(db.Course(name="New course", college_id=rng.randrange(1, COLLEGES + 1), duration="1 year"))
+    session.commit()
+
+
+def write_user(session, rng):
+    user = session.query(db.User).filter(db.User.username == f"user{rng.randrange(USERS)}").first()
+    user.full_name = f"Renamed {rng.random()}"
+    session.commit()
+
+
+READS = (read_college, read_scholarships, read_user)
+WRITES = (write_timeline, write_course, write_user)
+
+
+def run_profile(profile, threads, seconds, write_ratio):
+    with tempfile.TemporaryDirectory() as directory:
+        engine, metrics = make_engine(f"sqlite:///{directory}/bench.db", profile=profile)
+        db.Base.metadata.create_all(bind=engine)
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        seed(SessionLocal)
+        latencies = {"read": [], "write": []}
+        locked = [0]
+        deadline = time.perf_counter() + seconds
+
+        def worker(seed_value):
+            rng = random.Random(seed_value)
+            while time.perf_counter() < deadline:
+                kind = "write" if rng.random() < write_ratio else "read"
+                operation = rng.choice(WRITES if kind == "write" else READS)
+                started = time.perf_counter()
+                with SessionLocal() as session:
+                    try:
+                        operation(session, rng)
+                    except OperationalError:
+                        locked[0] += 1
+                        continue
+                latencies[kind].append(time.perf_counter() - started)
+
+        pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        stats = metrics.stats()
+        engine.dispose()
+
+    def quantiles(values):
+        if len(values) < 2:
+            return float("nan"), float("nan")
+        cuts = statistics.quantiles(values, n=100)
+        return cuts[49] * 1000, cuts[98] * 1000
+
+    done = len(latencies["read"]) + len(latencies["write"])
+    read_p50, read_p99 = quantiles(latencies["read"])
+    write_p50, write_p99 = quantiles(latencies["write"])
+    print(f"{profile:8} {done / seconds:8.0f} {read_p50:8.2f} {read_p99:8.2f} {write_p50:8.2f} {write_p99:9.2f} "
+          f"{locked[0]:7d} {stats['connects']:9d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+    print(f"{args.threads} threads, {args.write_ratio:.0%} writes, {args.seconds:g}s per profile")
+    print(f"{'profile':8} {'ops/s':>8} {'read p50':>8} {'read p99':>8} {'write p50':>8} {'write p99':>9} "
+          f"{'locked':>7} {'connects':>9}")
+    for profile in reversed(PROFILES):
+        run_profile(profile, args.threads, args.seconds, args.write_ratio)
+
+
+if __name__ == "__main__":
+    main()
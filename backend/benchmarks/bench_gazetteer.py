@@ -0,0 +1,109 @@
+"""Messages per second: gazetteer trie vs per-name substring and regex matching.
+
+Builds vocabularies of the 20 J&K districts, N synthetic college names and
+N/2 course names, then extracts entities from a fixed mix of chat messages
+with (a) the previous approach, a whole-word `str.find` per known name, (b)
+one precompiled `\\b(name)\\b` regex per name and (c) the Gazetteer. Also
+times adding one college to a built gazetteer against rebuilding it.
+
+Run from the backend directory:  python benchmarks/bench_gazetteer.py [rounds]
+"""
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gazetteer import COLLEGE, COURSE, DISTRICT, Gazetteer  # noqa: E402
+from scholarship_matching import JK_DISTRICTS  # noqa: E402
+
+MESSAGES = [
+    "Which colleges in Srinagar offer B.Tech?",
+    "Tell me about Government Degree College Baramulla 17",
+    "I want to study MBA Finance 3 near Anantnag, what are my options?",
+    "hello, I am confused about my career and need some help",
+    "Compare Institute of Technology Kathua 42 and Government Degree College Jammu 8 for b.sc physics 5",
+    "scholarships for students from Kupwara",
+]
+PREFIXES = ("Government Degree College", "Institute of Technology", "Women's College", "Institute of Management")
+DEGREES = ("B.Tech", "B.Sc Physics", "MBA Finance", "BA English", "B.Com", "MCA")
+
+
+def vocabulary(colleges):
+    rng = random.Random(7)
+    names = [(district, DISTRICT) for district in JK_DISTRICTS]
+    names += [(f"{rng.choice(PREFIXES)} {rng.choice(JK_DISTRICTS)} {n}", COLLEGE) for n in range(colleges)]
+    names += [(f"{DEGREES[n % len(DEGREES)]} {n}", COURSE) for n in range(colleges // 2)]
+    return names
+
+
+def substring_extractor(names):
+    """The previous approach: a whole-word str.find per known name"""
+    terms = [(name.lower(), kind, name) for name, kind in names]
+
+    def extract(text):
+        text = text.lower()
+        found = []
+        for term, kind, name in terms:
+            start = text.find(term)
+            while start != -1:
+                end = start + len(term)
+                if (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum()):
+                    found.append((start, end, kind, name))
+                    break
+                start = text.find(term, start + 1)
+        return found
+    return extract
+
+
+def regex_extractor(names):
+    patterns = [(re.compile(r"\b%s\b" % re.escape(name), re.IGNORECASE), kind, name) for name, kind in names]
+
+    def extract(text):
+        found = []
+        for pattern, kind, name in patterns:
+            match = pattern.search(text)
+            if match:
+                found.append((match.start(), match.end(), kind, name))
+        return found
+    return extract
+
+
+def build_gazetteer(names):
+    gazetteer = Gazetteer()
+    for name, kind in names:
+        gazetteer.add(name, kind)
+    return gazetteer
+
+
+def throughput(extract, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for message in MESSAGES:
+            extract(message)
+    return rounds * len(MESSAGES) / (time.perf_counter() - start)
+
+
+def main(rounds=200):
+    print(f"{'colleges':>8} {'substring':>12} {'regex':>12} {'gazetteer':>12} {'speedup':>8} {'rebuild ms':>11} {'add us':>7}")
+    for colleges in (100, 1000, 10000):
+        names = vocabulary(colleges)
+        started = time.perf_counter()
+        gazetteer = build_gazetteer(names)
+        rebuild = time.perf_counter() - started
+        started = time.perf_counter()
+        gazetteer.add("Government Degree College Reasi New", COLLEGE)
+        add = time.perf_counter() - started
+
+        scale = max(1, 1000 // colleges)
+        substring = throughput(substring_extractor(names), rounds * scale // 10 or 1)
+        regex = throughput(regex_extractor(names), rounds * scale // 10 or 1)
+        trie = throughput(gazetteer.extract, rounds * 10)
+        print(f"{colleges:8d} {substring:12,.0f} {regex:12,.0f} {trie:12,.0f} {trie / substring:7.0f}x "
+              f"{rebuild * 1000:11.1f} {add * 1e6:7.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
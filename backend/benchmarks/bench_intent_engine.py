@@ -0,0 +1,59 @@
+"""Messages per second: single-pass IntentEngine vs the per-pattern regex scan.
+
+Run from the backend directory:  python benchmarks/bench_intent_engine.py
+"""
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from advanced_chatbot import AdvancedChatbot  # noqa: E402
+
+MESSAGES = [
+    "Hello, how are you?",
+    "I want to know about engineering colleges in Srinagar",
+    "What scholarships are available for merit students? The fee is expensive",
+    "I'm stressed and confused about my career, please help me decide",
+    "tell me more",
+    "What about the admission process for a bachelor degree at the university of Jammu district?",
+]
+
+
+def regex_scan(chatbot, text):
+    """The original implementation: one re.search per pattern, per intent"""
+    scores = {}
+    for intent, data in chatbot.intent_patterns.items():
+        text_lower = text.lower()
+        matches = sum(1 for pattern in data['patterns'] if re.search(pattern, text_lower, re.IGNORECASE))
+        scores[intent] = matches
+    text_lower = text.lower()
+    emotions = {emotion: sum(1 for keyword in keywords if keyword in text_lower)
+                for emotion, keywords in chatbot.emotion_keywords.items()}
+    return scores, emotions
+
+
+def engine_scan(chatbot, text):
+    return chatbot.intent_engine.scan(text)
+
+
+def run(fn, chatbot, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for message in MESSAGES:
+            fn(chatbot, message)
+    elapsed = time.perf_counter() - start
+    return rounds * len(MESSAGES) / elapsed
+
+
+def main(rounds=5000):
+    chatbot = AdvancedChatbot()
+    baseline = run(regex_scan, chatbot, rounds)
+    engine = run(engine_scan, chatbot, rounds)
+    print(f"regex per pattern : {baseline:12,.0f} msg/s")
+    print(f"intent engine     : {engine:12,.0f} msg/s  ({engine / baseline:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,79 @@
+"""Intent accuracy and throughput: pattern engine vs hashed TF-IDF model vs hybrid.
+
+Accuracy is 5-fold cross-validated on intent_examples.jsonl: each fold's
+model is trained on the other four. "hybrid" is what the chatbot does with
+a model configured: the model's intent when its probability reaches the
+threshold, the patterns' otherwise. Throughput compares detect_intent_advanced
+on the patterns alone with the model scoring one message per call and
+batches of INTENT_MODEL_BATCH_SIZE.
+
+Run from the backend directory:  python benchmarks/bench_intent_model.py [--threshold 0.6]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from advanced_chatbot import INTENT_MODEL_BATCH_SIZE, AdvancedChatbot  # noqa: E402
+from intent_model import read_examples, train  # noqa: E402
+from user_state import InMemoryUserStateStore  # noqa: E402
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "intent_examples.jsonl")
+FOLDS = 5
+
+
+def cross_validate(examples, threshold):
+    chatbot = AdvancedChatbot(user_states=InMemoryUserStateStore())
+    correct = {"patterns": 0, "model": 0, "hybrid": 0}
+    for fold in range(FOLDS):
+        test = examples[fold::FOLDS]
+        training = [example for index, example in enumerate(examples) if index % FOLDS != fold]
+        model = train([message for message, _ in training], [intent for _, intent in training])
+        predictions = model.predict([message for message, _ in test])
+        for (message, intent), (predicted, probability) in zip(test, predictions):
+            by_patterns = chatbot.detect_intent_advanced(message, "bench")[0]
+            correct["patterns"] += by_patterns == intent
+            correct["model"] += predicted == intent
+            correct["hybrid"] += (predicted if probability >= threshold else by_patterns) == intent
+    return {name: count / len(examples) for name, count in correct.items()}
+
+
+def throughput(function, messages, per_call, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for offset in range(0, len(messages), per_call):
+            function(messages[offset:offset + per_call])
+    return rounds * len(messages) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threshold", type=float, default=0.6)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    examples = list(read_examples(EXAMPLES))
+    random.Random(0).shuffle(examples)
+    accuracy = cross_validate(examples, args.threshold)
+    print(f"{len(examples)} labeled messages, {FOLDS}-fold cross-validated accuracy:")
+    for name, value in accuracy.items():
+        print(f"  {name:9} {value:6.1%}")
+
+    messages = [message for message, _ in examples] * 10
+    model = train(*zip(*examples))
+    chatbot = AdvancedChatbot(user_states=InMemoryUserStateStore())
+    patterns = throughput(lambda chunk: [chatbot.detect_intent_advanced(m, "bench") for m in chunk],
+                          messages, 1, args.rounds)
+    single = throughput(model.predict, messages, 1, args.rounds)
+    batched = throughput(model.predict, messages, INTENT_MODEL_BATCH_SIZE, args.rounds)
+    print("messages per second:")
+    print(f"  patterns             {patterns:10,.0f}")
+    print(f"  model, 1 per call    {single:10,.0f}  ({single / patterns:.2f}x)")
+    print(f"  model, {INTENT_MODEL_BATCH_SIZE} per call  {batched:10,.0f}  ({batched / patterns:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Responses per second: the prebuilt knowledge index vs rendering answers per call.
+
+Run from the backend directory:  python benchmarks/bench_knowledge.py [rounds]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatbot_knowledge import COMPREHENSIVE_KNOWLEDGE, knowledge_base  # noqa: E402
+
+QUERIES = [
+    ("colleges", "Which are the best colleges in Jammu?"),
+    ("colleges", "What is the admission process for engineering?"),
+    ("colleges", "Tell me about medical colleges"),
+    ("scholarships", "Are there any government scholarships for girls?"),
+    ("scholarships", "How do I apply for a scholarship?"),
+    ("career_guidance", "What are the popular career options after 12th?"),
+    ("career_guidance", "Help me plan my future"),
+    ("career_guidance", "I am not sure what to do"),
+]
+
+
+def render_per_call(intent, query):
+    """The original implementation: a substring if/elif chain, joining the lists on every call"""
+    query_lower = query.lower()
+    colleges = COMPREHENSIVE_KNOWLEDGE["colleges_detailed"]
+    scholarships = COMPREHENSIVE_KNOWLEDGE["scholarships_detailed"]
+    careers = COMPREHENSIVE_KNOWLEDGE["career_guidance"]
+    if intent == "colleges":
+        if "jammu" in query_lower:
+            return "Here are some top colleges in Jammu:\n\n" + "\n".join([f"• {c}" for c in colleges["jammu_colleges"]])
+        elif "srinagar" in query_lower:
+            return "Here are some top colleges in Srinagar:\n\n" + "\n".join([f"• {c}" for c in colleges["srinagar_colleges"]])
+        elif "admission" in query_lower:
+            return "Here's the general admission process:\n\n" + "\n".join(
+                [f"{i+1}. {step}" for i, step in enumerate(colleges["admission_process"])])
+        return "I can provide detailed information about colleges in Jammu, Srinagar, and other districts. What specific information are you looking for?"
+    elif intent == "scholarships":
+        if "government" in query_lower:
+            return "Government scholarships available:\n\n" + "\n".join([f"• {s}" for s in scholarships["government_scholarships"]])
+        elif "private" in query_lower:
+            return "Private scholarships available:\n\n" + "\n".join([f"• {s}" for s in scholarships["private_scholarships"]])
+        elif "apply" in query_lower or "application" in query_lower:
+            return "Scholarship application tips:\n\n" + "\n".join([f"• {t}" for t in scholarships["application_tips"]])
+        return "I can help you with government scholarships, private funding, and application guidance. What type of scholarship information do you need?"
+    elif intent == "career_guidance":
+        if "career" in query_lower and ("popular" in query_lower or "options" in query_lower):
+            return "Popular career options for J&K students:\n\n" + "\n".join([f"• {c}" for c in careers["popular_careers"]])
+        elif "aptitude" in query_lower:
+            return "Key aptitude areas assessed:\n\n" + "\n".join([f"• {a}" for a in careers["aptitude_areas"]])
+        elif "plan" in query_lower:
+            return "Career planning steps:\n\n" + "\n".join(
+                [f"{i+1}. {step}" for i, step in enumerate(careers["career_planning_steps"])])
+        return "I can help with career options, aptitude assessment, and planning guidance. What aspect of career guidance interests you?"
+    return None
+
+
+def run(fn, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for intent, query in QUERIES:
+            fn(intent, query)
+    elapsed = time.perf_counter() - start
+    return rounds * len(QUERIES) / elapsed
+
+
+def main(rounds=20000):
+    for intent, query in QUERIES:
+        assert render_per_call(intent, query) == knowledge_base.get_detailed_response(intent, query), query
+    baseline = run(render_per_call, rounds)
+    indexed = run(knowledge_base.get_detailed_response, rounds)
+    print(f"render per call   : {baseline:12,.0f} responses/s")
+    print(f"prebuilt index    : {indexed:12,.0f} responses/s  ({indexed / baseline:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
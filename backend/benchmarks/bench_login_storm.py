@@ -0,0 +1,153 @@
+"""College browsing latency during a login storm, bcrypt inline vs in the hashing pool.
+
+Starts the API in a uvicorn subprocess on a temporary SQLite database with
+a few hundred users, and mounts the pre-pool login handler under
+/bench/legacy/token (sync `def`, bcrypt in the request threadpool). For
+each login route it measures /api/colleges/ latency while idle and while
+a crowd of clients logs in as fast as it can, then reports p50/p99
+browsing latency, logins per second, how many logins got 503 and how many
+failed outright (the legacy route runs out of pooled connections).
+
+Run from the backend directory:
+    python benchmarks/bench_login_storm.py [--storm 100] [--seconds 8] [--workers 2]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+USERS = 200
+PASSWORD = "storm-password"
+
+
+def serve(port: int) -> None:
+    import logging
+
+    import uvicorn
+    from fastapi import Depends, HTTPException
+    from fastapi.security import OAuth2PasswordRequestForm
+    from sqlalchemy.orm import Session
+
+    import auth
+    import database as db
+    import main
+
+    logging.getLogger("main").setLevel(logging.WARNING)
+    db.Base.metadata.create_all(bind=db.engine)
+    with db.SessionLocal() as session:
+        if not session.query(db.User).count():
+            hashed = auth.pwd_context.hash(PASSWORD)
+            session.add_all(db.User(username=f"user{n}", email=f"user{n}@example.com", full_name=f"User {n}",
+                                    hashed_password=hashed) for n in range(USERS))
+            session.commit()
+
+    @main.app.post("/bench/legacy/token", response_model=main.Token)
+    def legacy_login(form_data: OAuth2PasswordRequestForm = Depends(), db_session: Session = Depends(main.get_db)):
+        user = db_session.query(db.User).filter(db.User.username == form_data.username).first()
+        if not user or not auth.pwd_context.verify(form_data.password, user.hashed_password):
+            raise HTTPException(status_code=401)
+        return {"access_token": auth.create_access_token({"sub": user.username}), "token_type": "bearer"}
+
+    uvicorn.run(main.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+async def browse(client, seconds, concurrency=4):
+    latencies = []
+    deadline = time.perf_counter() + seconds
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = await client.get("/api/colleges/?limit=20")
+            latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    quantiles = statistics.quantiles(latencies, n=100)
+    return quantiles[49] * 1000, quantiles[98] * 1000
+
+
+async def storm(client, path, concurrency, stop):
+    counts = {"ok": 0, "busy": 0, "failed": 0}
+
+    async def worker(n):
+        form = {"username": f"user{n % USERS}", "password": PASSWORD}
+        while not stop.is_set():
+            response = await client.post(path, data=form)
+            if response.status_code == 503:
+                counts["busy"] += 1
+                await asyncio.sleep(float(response.headers["Retry-After"]))
+            elif response.status_code == 200:
+                counts["ok"] += 1
+            else:
+                counts["failed"] += 1
+
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    return counts
+
+
+async def run(base_url, storm_size, seconds):
+    import httpx
+
+    limits = httpx.Limits(max_connections=storm_size + 16, max_keepalive_connections=storm_size + 16)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        for _ in range(100):
+            try:
+                await client.get("/")
+                break
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+        await browse(client, 1)  # warm up
+
+        p50, p99 = await browse(client, seconds)
+        print(f"{'scenario':36} {'p50 ms':>8} {'p99 ms':>8} {'logins/s':>9} {'503s':>6} {'failed':>6}")
+        print(f"{'idle':36} {p50:8.2f} {p99:8.2f}")
+        for label, path in (("storm, bcrypt in threadpool (legacy)", "/bench/legacy/token"),
+                            ("storm, bcrypt in hashing pool", "/api/token")):
+            stop = asyncio.Event()
+            logins = asyncio.create_task(storm(client, path, storm_size, stop))
+            await asyncio.sleep(1)  # let the storm build up
+            started = time.perf_counter()
+            p50, p99 = await browse(client, seconds)
+            stop.set()
+            counts = await logins
+            rate = counts["ok"] / (time.perf_counter() - started + 1)
+            print(f"{label:36} {p50:8.2f} {p99:8.2f} {rate:9.1f} {counts['busy']:6d} {counts['failed']:6d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--storm", type=int, default=100, help="concurrent login clients")
+    parser.add_argument("--seconds", type=float, default=8, help="measurement window per scenario")
+    parser.add_argument("--workers", type=int, default=2, help="PASSWORD_HASH_WORKERS for the server")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{directory}/storm.db",
+                   PASSWORD_HASH_WORKERS=str(args.workers))
+        server = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--serve", "--port", str(args.port)], cwd=BACKEND_DIR, env=env
+        )
+        try:
+            print(f"{os.cpu_count()} CPUs, {args.storm} login clients, {args.workers} hashing workers")
+            asyncio.run(run(f"http://127.0.0.1:{args.port}", args.storm, args.seconds))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Scholarship matching throughput: eligibility index vs scanning every row.
+
+Indexes N synthetic scholarships (50k by default) with generated
+eligibility text, then answers M match queries (1M by default) for random
+student profiles. The baseline re-parses and checks every row per query,
+as a straightforward implementation would; it is timed on a sample and
+extrapolated.
+
+Run from the backend directory:
+    python benchmarks/bench_scholarship_match.py [scholarships] [queries]
+"""
+import datetime
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scholarship_matching import (  # noqa: E402
+    EDUCATION_LEVELS, JK_DISTRICTS, STREAMS, ScholarshipIndex, parse_eligibility,
+)
+
+NOW = datetime.datetime(2026, 1, 1)
+LEVEL_PHRASES = ["", "post-matric", "undergraduate", "postgraduate", "class 12", "10th", "graduates"]
+STREAM_PHRASES = ["", "science", "commerce", "arts", "engineering"]
+
+
+def scholarships(count, rng):
+    for scholarship_id in range(1, count + 1):
+        parts = [rng.choice(LEVEL_PHRASES), rng.choice(STREAM_PHRASES), "students"]
+        if rng.random() < 0.4:
+            parts.append("from " + " or ".join(rng.sample(JK_DISTRICTS, rng.randint(1, 3))))
+        if rng.random() < 0.5:
+            parts.append(f"with family income below {rng.choice([1, 2.5, 4, 6, 8])} lakh")
+        yield {
+            "id": scholarship_id, "name": f"Scholarship {scholarship_id}", "eligibility": " ".join(parts),
+            "amount": rng.randrange(5000, 200000, 5000),
+            "deadline": NOW + datetime.timedelta(days=rng.randint(-180, 365)),
+        }
+
+
+def profiles(count, rng):
+    for _ in range(count):
+        yield (rng.choice(EDUCATION_LEVELS), rng.choice(JK_DISTRICTS), rng.choice(STREAMS),
+               rng.randrange(50000, 1200000, 10000))
+
+
+def scan(rows, level, district, stream, income, limit=20):
+    """Per-request baseline: parse and check every scholarship"""
+    eligible = []
+    for row in rows:
+        if row["deadline"] < NOW:
+            continue
+        criteria = parse_eligibility(row["eligibility"])
+        if ((not criteria.education_levels or level in criteria.education_levels)
+                and (not criteria.districts or district in criteria.districts)
+                and (not criteria.streams or stream in criteria.streams)
+                and (criteria.max_income is None or income <= criteria.max_income)):
+            eligible.append(row)
+    eligible.sort(key=lambda row: (-row["amount"], row["deadline"]))
+    return eligible[:limit]
+
+
+def main(count=50000, queries=1000000):
+    rng = random.Random(12)
+    rows = list(scholarships(count, rng))
+    index = ScholarshipIndex()
+    started = time.perf_counter()
+    for row in rows:
+        index.index_row(row)
+    print(f"indexed {count:,} scholarships in {time.perf_counter() - started:.1f}s")
+
+    sample = list(profiles(20, rng))
+    started = time.perf_counter()
+    for profile in sample:
+        expected = [row["id"] for row in scan(rows, *profile)]
+        assert [row["id"] for row in index.match(*profile, now=NOW)] == expected
+    per_scan = (time.perf_counter() - started) / len(sample)
+    print(f"scan every row : {per_scan * 1000:8.1f} ms/query   ({queries:,} queries ~ {per_scan * queries / 3600:,.0f} h)")
+
+    workload = list(profiles(queries, rng))
+    started = time.perf_counter()
+    for profile in workload:
+        index.match(*profile, now=NOW)
+    elapsed = time.perf_counter() - started
+    memo = index.stats()["memo"]
+    print(f"index          : {elapsed / queries * 1e6:8.1f} us/query   ({queries:,} queries in {elapsed:.1f}s, "
+          f"{queries / elapsed:,.0f}/s, {memo['misses']:,} distinct profiles intersected)")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,88 @@
+"""Query latency of the full-text search backends on a synthetic corpus.
+
+Indexes N colleges, courses and scholarships (100k documents by default)
+built from a realistic vocabulary, then times ranked top-20 queries against
+the FTS5 and in-process BM25 indexes and reports p50/p99 latency.
+
+Run from the backend directory:
+    python benchmarks/bench_search.py [documents] [queries]
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_index import FTS5Index, InvertedIndex, SearchService, fts5_available  # noqa: E402
+
+DISTRICTS = ["Jammu", "Srinagar", "Anantnag", "Baramulla", "Kathua", "Udhampur", "Pulwama", "Kupwara",
+             "Rajouri", "Poonch", "Doda", "Kishtwar", "Ramban", "Reasi", "Samba", "Budgam",
+             "Ganderbal", "Bandipora", "Shopian", "Kulgam"]
+SUBJECTS = ["engineering", "medical", "nursing", "commerce", "arts", "science", "law", "pharmacy",
+            "computer", "management", "agriculture", "education", "architecture", "journalism",
+            "physics", "chemistry", "mathematics", "economics", "history", "english", "urdu", "biotechnology"]
+FACILITIES = ["hostel", "library", "laboratory", "sports", "canteen", "wifi", "transport", "auditorium",
+              "gymnasium", "medical centre"]
+FILLER = ["students", "campus", "programme", "faculty", "research", "admission", "merit", "government",
+          "private", "affiliated", "university", "accredited", "placement", "modern", "infrastructure"]
+QUERIES = ["engineering college srinagar hostel", "medical scholarship", "nursing jammu",
+           "computer science eligibility 12th", "law college", "merit scholarship girls",
+           "agriculture baramulla", "pharmacy library wifi", "economics research", "architecture"]
+
+
+def words(rng, vocabulary, count):
+    return " ".join(rng.choice(vocabulary) for _ in range(count))
+
+
+def corpus(size, seed=7):
+    rng = random.Random(seed)
+    for row_id in range(1, size // 3 + 2):
+        district, subject = rng.choice(DISTRICTS), rng.choice(SUBJECTS)
+        yield "college", {
+            "id": row_id, "name": f"{district} College of {subject.title()} {row_id}", "district": district,
+            "address": f"{district}, Jammu and Kashmir",
+            "description": words(rng, FILLER + SUBJECTS, 40), "facilities": ", ".join(rng.sample(FACILITIES, 4)),
+        }
+        yield "course", {
+            "id": row_id, "name": f"Bachelor of {subject.title()}", "duration": "4 years",
+            "description": words(rng, FILLER + SUBJECTS, 25), "eligibility": f"12th pass with {rng.choice(SUBJECTS)}",
+        }
+        yield "scholarship", {
+            "id": row_id, "name": f"{rng.choice(['Merit', 'Girls', 'Minority', 'Post-Matric'])} Scholarship {row_id}",
+            "provider": rng.choice(["Government of India", "J&K Government", "Private Trust"]),
+            "description": words(rng, FILLER + SUBJECTS, 20),
+            "eligibility": f"Residents of {district}, {rng.choice(SUBJECTS)} students",
+        }
+
+
+def bench(index, documents, queries):
+    service = SearchService(index)
+    started = time.perf_counter()
+    for count, (kind, values) in enumerate(corpus(documents)):
+        if count == documents:
+            break
+        service.index_row(kind, values)
+    build = time.perf_counter() - started
+
+    for query in QUERIES:
+        service.search(query)
+    latencies = []
+    for i in range(queries):
+        started = time.perf_counter()
+        service.search(QUERIES[i % len(QUERIES)], limit=20)
+        latencies.append(time.perf_counter() - started)
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(f"{index.name:7} {build:8.1f}s {quantiles[49] * 1000:9.2f} {quantiles[98] * 1000:9.2f}")
+
+
+def main(documents=100000, queries=500):
+    print(f"{documents:,} documents, {queries} top-20 queries")
+    print(f"{'backend':7} {'build':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for index in ([FTS5Index] if fts5_available() else []) + [InvertedIndex]:
+        bench(index(), documents, queries)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,69 @@
+"""Context correctness and throughput with several chatbot worker processes.
+
+Every user opens with "college admission" and follows up with messages
+that only make sense in context ("tell me more"). Turn k of user u is sent
+to worker (u + k) % WORKERS, the way a load balancer spreads a
+conversation over uvicorn workers. A follow-up is answered correctly when
+it is classified as "colleges" and flagged context-aware.
+
+Run from the backend directory:
+    python benchmarks/bench_shared_state.py [workers] [users]
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TURNS = ["college admission", "tell me more", "what about the deadlines", "tell me more about it"]
+
+_chatbot = None
+
+
+def _init_worker(backend, path):
+    global _chatbot
+    from advanced_chatbot import AdvancedChatbot
+    from user_state import InMemoryUserStateStore, SQLiteUserStateStore
+
+    store = SQLiteUserStateStore(path) if backend == "sqlite" else InMemoryUserStateStore()
+    _chatbot = AdvancedChatbot(user_states=store)
+
+
+def _handle(job):
+    user_id, turn = job
+    result = _chatbot.get_personalized_response(user_id, TURNS[turn])
+    return turn == 0 or (result["intent"] == "colleges" and result["context_aware"])
+
+
+def run(backend, workers, users):
+    path = os.path.join(tempfile.mkdtemp(), "chatbot_state.db")
+    pools = [multiprocessing.Pool(1, _init_worker, (backend, path)) for _ in range(workers)]
+    correct = total = 0
+    start = time.perf_counter()
+    for turn in range(len(TURNS)):
+        pending = [
+            pools[(user + turn) % workers].apply_async(_handle, ((f"user-{user}", turn),))
+            for user in range(users)
+        ]
+        for result in pending:
+            total += 1
+            correct += result.get()
+    elapsed = time.perf_counter() - start
+    for pool in pools:
+        pool.close()
+        pool.join()
+    follow_ups = users * (len(TURNS) - 1)
+    return (correct - users) / follow_ups, total / elapsed
+
+
+def main(workers=4, users=500):
+    print(f"{workers} workers, {users} users x {len(TURNS)} turns")
+    for backend in ("memory", "sqlite"):
+        accuracy, throughput = run(backend, workers, users)
+        print(f"{backend:7}: follow-ups answered in context {accuracy:6.1%}   {throughput:8,.0f} msg/s")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
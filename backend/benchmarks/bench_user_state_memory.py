@@ -0,0 +1,96 @@
+"""Bytes per user of chatbot history: legacy dict entries vs Interaction records.
+
+Simulates USERS users with TURNS turns each and measures the traced heap
+growth of each layout.
+
+Run from the backend directory:
+    python benchmarks/bench_user_state_memory.py [users] [turns]
+"""
+import gc
+import os
+import random
+import sys
+import tracemalloc
+from collections import defaultdict, deque
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from advanced_chatbot import AdvancedChatbot  # noqa: E402
+from user_state import InMemoryUserStateStore  # noqa: E402
+
+MESSAGES = [
+    "Tell me about engineering college admission in Srinagar",
+    "What scholarships are available for merit students?",
+    "I'm confused about my career, please help me decide",
+    "hello",
+]
+
+
+def make_turns(chatbot, turns):
+    """Precompute realistic (message, response, intent, emotion, confidence) tuples"""
+    samples = []
+    for message in MESSAGES:
+        result = chatbot.get_personalized_response("sampler", message)
+        samples.append((message, result['response'], result['intent'], result['emotion'], result['confidence']))
+    return [random.choice(samples) for _ in range(turns)]
+
+
+def fresh(text):
+    """A new string object, as produced by each request in production"""
+    return text[:-1] + text[-1]
+
+
+def legacy_layout(users, turns):
+    conversation_memory = defaultdict(lambda: deque(maxlen=10))
+    learning_data = defaultdict(list)
+    for user in range(users):
+        user_id = f"user-{user}"
+        for message, response, intent, emotion, confidence in turns:
+            message = fresh(message)
+            conversation_memory[user_id].append({
+                'timestamp': datetime.now(), 'user_message': message,
+                'intent': intent, 'confidence': confidence, 'emotion': emotion
+            })
+            learning_data[user_id].append({
+                'timestamp': datetime.now(), 'user_message': message,
+                'bot_response': fresh(response), 'intent': intent, 'confidence': confidence
+            })
+            if len(learning_data[user_id]) > 50:
+                learning_data[user_id] = learning_data[user_id][-50:]
+    return conversation_memory, learning_data
+
+
+def record_layout(users, turns):
+    chatbot = AdvancedChatbot(user_states=InMemoryUserStateStore(max_users=users, max_bytes=1 << 40))
+    for user in range(users):
+        user_id = f"user-{user}"
+        for message, response, intent, emotion, confidence in turns:
+            chatbot.learn_from_interaction(user_id, fresh(message), fresh(response), intent, confidence, emotion)
+    return chatbot
+
+
+def measure(layout, users, turns):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = layout(users, turns)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return (after - before) / users
+
+
+def main(users=100000, turns=10):
+    random.seed(42)
+    turn_data = make_turns(AdvancedChatbot(), turns)
+    legacy = measure(legacy_layout, users, turn_data)
+    records = measure(record_layout, users, turn_data)
+    print(f"{users:,} users x {turns} turns")
+    print(f"legacy dict entries  : {legacy:10,.0f} bytes/user")
+    print(f"interaction records  : {records:10,.0f} bytes/user  ({legacy / records:.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
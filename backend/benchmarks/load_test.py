@@ -0,0 +1,121 @@
+"""Latency and throughput of the async routes vs their old threadpool versions.
+
+Starts the API in a uvicorn subprocess with the pre-async handlers mounted
+under /bench/legacy (sync `def`, opening an unused `get_db` session for the
+chatbot), then drives each path at increasing concurrency and reports
+p50/p99 latency and requests per second.
+
+Run from the backend directory:
+    python benchmarks/load_test.py [--requests 2000] [--concurrency 1,8,32,128]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+CHAT_BODY = {"user_id": "load-test", "message": "Tell me about engineering college admission"}
+
+PATHS = [
+    ("chatbot  (sync + get_db)", "POST", "/bench/legacy/chatbot", CHAT_BODY),
+    ("chatbot  (async)", "POST", "/api/chatbot", CHAT_BODY),
+    ("colleges (sync session)", "GET", "/bench/legacy/colleges", None),
+    ("colleges (async session)", "GET", "/api/colleges/", None),
+]
+
+
+def serve(port: int) -> None:
+    import logging
+
+    import uvicorn
+    from fastapi import Depends
+    from sqlalchemy.orm import Session
+
+    import database as db
+    import main
+    from advanced_chatbot import get_advanced_chatbot
+
+    logging.getLogger("main").setLevel(logging.WARNING)
+
+    @main.app.post("/bench/legacy/chatbot", response_model=main.ChatbotResponse)
+    def legacy_chatbot(chat_message: main.ChatbotMessage, db_session: Session = Depends(main.get_db)):
+        result = get_advanced_chatbot().get_personalized_response(chat_message.user_id, chat_message.message)
+        return main.build_chatbot_response(result)
+
+    @main.app.get("/bench/legacy/colleges", response_model=List[main.College])
+    def legacy_colleges(db_session: Session = Depends(main.get_db)):
+        return db_session.query(db.College).all()
+
+    uvicorn.run(main.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+async def drive(client, method, path, body, total, concurrency):
+    latencies = []
+    remaining = total
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            response = await client.request(method, path, json=body)
+            latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    quantiles = statistics.quantiles(latencies, n=100)
+    return quantiles[49] * 1000, quantiles[98] * 1000, len(latencies) / elapsed
+
+
+async def run(base_url, total, levels):
+    import httpx
+
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        for _ in range(50):
+            try:
+                await client.get("/")
+                break
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+
+        print(f"{'path':28} {'conc':>5} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>9}")
+        for label, method, path, body in PATHS:
+            for concurrency in levels:
+                p50, p99, rps = await drive(client, method, path, body, total, concurrency)
+                print(f"{label:28} {concurrency:5d} {p50:9.2f} {p99:9.2f} {rps:9,.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", default="1,8,32,128")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port)
+        return
+
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve", "--port", str(args.port)], cwd=BACKEND_DIR
+    )
+    try:
+        levels = [int(level) for level in args.concurrency.split(",")]
+        asyncio.run(run(f"http://127.0.0.1:{args.port}", args.requests, levels))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
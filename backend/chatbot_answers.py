@@ -0,0 +1,230 @@
+import logging
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from sqlalchemy import bindparam, select
+from sqlalchemy.exc import SQLAlchemyError
+
+import database as db
+from cache import TTLCache
+from gazetteer import COLLEGE, COURSE, DISTRICT, EntitySpan, Gazetteer
+from scholarship_matching import JK_DISTRICTS, ScholarshipIndex
+
+logger = logging.getLogger(__name__)
+
+# Prepared statements: built once, so SQLAlchemy's compiled cache and the
+# driver's statement cache are hit on every execution. Districts are matched
+# by equality and courses by a range on the name (the prefix `course` up to
+# `course_end`), which both use the columns' indexes, unlike ILIKE '%...%'
+_COLLEGE_COURSES = (
+    select(db.College.id, db.College.name, db.College.district, db.Course.name.label("course"))
+    .join(db.Course, db.Course.college_id == db.College.id)
+    .where(db.Course.name >= bindparam("course"), db.Course.name < bindparam("course_end"))
+)
+COLLEGES_IN_DISTRICT = (
+    select(db.College.id, db.College.name, db.College.district)
+    .where(db.College.district == bindparam("district"))
+    .order_by(db.College.name, db.College.id)
+    .limit(bindparam("limit"))
+)
+COLLEGES_OFFERING_COURSE = _COLLEGE_COURSES.order_by(db.College.name, db.College.id, db.Course.name).limit(
+    bindparam("limit"))
+COLLEGES_IN_DISTRICT_OFFERING_COURSE = _COLLEGE_COURSES.where(
+    db.College.district == bindparam("district")).order_by(db.College.name, db.College.id, db.Course.name).limit(
+    bindparam("limit"))
+COLLEGE_BY_NAME = (
+    select(db.College.id, db.College.name, db.College.district, db.Course.name.label("course"))
+    .outerjoin(db.Course, db.Course.college_id == db.College.id)
+    .where(db.College.name == bindparam("college"))
+    .order_by(db.College.id, db.Course.name)
+)
+DISTINCT_DISTRICTS = select(db.College.district).where(db.College.district.isnot(None)).distinct()
+DISTINCT_COURSES = select(db.Course.name).where(db.Course.name.isnot(None)).distinct()
+DISTINCT_COLLEGES = select(db.College.name).where(db.College.name.isnot(None)).distinct()
+
+# Matching course rows fetched per college listed, so a college offering
+# several variants of a course (B.Tech Civil, B.Tech CSE, ...) still fits
+COURSE_ROWS_PER_COLLEGE = 4
+
+
+class ChatEntities(NamedTuple):
+    district: Optional[str] = None
+    course: Optional[str] = None  # a course name, or the degree a course name starts with ("B.Tech")
+    college: Optional[str] = None
+
+    @classmethod
+    def from_spans(cls, spans: List[EntitySpan]) -> "ChatEntities":
+        """The first entity of each kind"""
+        found = {}
+        for span in spans:
+            found.setdefault(span.kind, span.value)
+        return cls(found.get(DISTRICT), found.get(COURSE), found.get(COLLEGE))
+
+
+def course_terms(name: str) -> List[str]:
+    """Terms a query can use for a course: its full name and its leading degree ("B.Tech" of "B.Tech CSE")"""
+    name = name.strip()
+    terms = [name] if name else []
+    head = name.split(None, 1)[0] if name else ""
+    if head and head != name and any(ch.isalpha() for ch in head):
+        terms.append(head)
+    return terms
+
+
+class ChatbotAnswers:
+    """Answers district, course and scholarship questions from the live database.
+
+    Entities are recognised by a gazetteer of J&K districts and the college
+    and course names in the database, extended as rows are written (via
+    `database.watch_changes`).
+    Rendered answers are cached per intent, keyed by the entities; a write to
+    the intent's tables invalidates its cache, and the TTL bounds staleness
+    from writes by other processes. Returns None when the message names no
+    entity the database can answer for, so the caller falls back to its
+    templates.
+    """
+
+    INTENT_MODELS = {"colleges": (db.College, db.Course), "scholarships": (db.Scholarship,)}
+
+    def __init__(self, session_factory: Callable = db.SessionLocal, scholarships: Optional[ScholarshipIndex] = None,
+                 cache_size: int = 2048, ttl: Optional[float] = 300, limit: int = 5):
+        self.session_factory = session_factory
+        self.scholarships = scholarships
+        self.limit = limit
+        self.caches = {intent: TTLCache(maxsize=cache_size, ttl=ttl) for intent in self.INTENT_MODELS}
+        self.gazetteer = Gazetteer()
+        self.gazetteer.add_all(JK_DISTRICTS, DISTRICT)
+        self.errors = 0
+
+    def rebuild(self, session) -> int:
+        """Reload the gazetteer from the database and drop every cached answer"""
+        gazetteer = Gazetteer()
+        gazetteer.add_all(JK_DISTRICTS, DISTRICT)
+        # Stored spellings are added last, so they win and equality lookups match
+        gazetteer.add_all(session.scalars(DISTINCT_DISTRICTS), DISTRICT)
+        gazetteer.add_all(session.scalars(DISTINCT_COLLEGES), COLLEGE)
+        for name in session.scalars(DISTINCT_COURSES):
+            gazetteer.add_all(course_terms(name), COURSE)
+        self.gazetteer = gazetteer
+        for cache in self.caches.values():
+            cache.invalidate()
+        return len(gazetteer)
+
+    def apply_changes(self, changes: List[db.ChangeEvent]) -> None:
+        # New names are added to the gazetteer in place; names that disappear
+        # stay until the next rebuild and simply find no rows
+        gazetteer = self.gazetteer
+        for change in changes:
+            if change.op == "delete":
+                continue
+            if change.model is db.College:
+                if change.values.get("name"):
+                    gazetteer.add(change.values["name"], COLLEGE)
+                if change.values.get("district"):
+                    gazetteer.add(change.values["district"], DISTRICT)
+            elif change.model is db.Course and change.values.get("name"):
+                gazetteer.add_all(course_terms(change.values["name"]), COURSE)
+        for intent, models in self.INTENT_MODELS.items():
+            if any(issubclass(change.model, models) for change in changes):
+                self.caches[intent].invalidate()
+
+    def extract(self, text: str) -> List[EntitySpan]:
+        """Typed spans of the districts, colleges and courses named in `text`"""
+        return self.gazetteer.extract(text)
+
+    def answer(self, intent: str, text: str, spans: Optional[List[EntitySpan]] = None) -> Optional[str]:
+        """The answer for `intent`, using `spans` when the message was already extracted"""
+        cache = self.caches.get(intent)
+        if cache is None:
+            return None
+        entities = ChatEntities.from_spans(self.extract(text) if spans is None else spans)
+        if intent == "colleges" and not any(entities):
+            return None
+        if intent == "scholarships":
+            if not entities.district or self.scholarships is None:
+                return None
+            entities = ChatEntities(district=entities.district)
+        elif entities.college:
+            entities = ChatEntities(college=entities.college)
+        # A write committed while the query runs bumps the version, so the
+        # result is cached under a key no later lookup uses
+        key = (cache.version, entities)
+        response = cache.get(key)
+        if response is None:
+            try:
+                if intent == "colleges":
+                    response = self._colleges_answer(entities)
+                else:
+                    response = self._scholarships_answer(entities.district)
+            except SQLAlchemyError as e:
+                self.errors += 1
+                logger.error(f"Chatbot answer query failed: {str(e)}")
+                return None
+            cache.set(key, response)
+        return response
+
+    def _college_answer(self, college: str) -> str:
+        with self.session_factory() as session:
+            rows = session.execute(COLLEGE_BY_NAME, {"college": college}).all()
+        if not rows:
+            return f"I couldn't find {college} in our directory anymore."
+        first = rows[0]
+        courses = [row.course for row in rows if row.id == first.id and row.course]
+        if not courses:
+            return f"{first.name} ({first.district}) has no courses listed yet."
+        return f"{first.name} ({first.district}) offers:\n\n" + "\n".join(f"• {course}" for course in courses)
+
+    def _colleges_answer(self, entities: ChatEntities) -> str:
+        if entities.college:
+            return self._college_answer(entities.college)
+        district, course, _ = entities
+        where = f" in {district}" if district else ""
+        offering = f" offering {course}" if course else ""
+        with self.session_factory() as session:
+            if course is None:
+                rows = session.execute(COLLEGES_IN_DISTRICT, {"district": district, "limit": self.limit}).all()
+                colleges = OrderedDict((row.id, (row.name, row.district, [])) for row in rows)
+            else:
+                params = {"course": course, "course_end": course + "\uffff",
+                          "limit": self.limit * COURSE_ROWS_PER_COLLEGE}
+                statement = COLLEGES_OFFERING_COURSE
+                if district:
+                    statement = COLLEGES_IN_DISTRICT_OFFERING_COURSE
+                    params["district"] = district
+                colleges = OrderedDict()
+                for row in session.execute(statement, params):
+                    if row.id not in colleges:
+                        if len(colleges) == self.limit:
+                            break
+                        colleges[row.id] = (row.name, row.district, [])
+                    colleges[row.id][2].append(row.course)
+        if not colleges:
+            return f"I couldn't find any colleges{where}{offering} in our directory yet. Try the College Explorer for nearby districts."
+        lines = []
+        for name, college_district, courses in colleges.values():
+            line = f"• {name}" if district else f"• {name} ({college_district})"
+            if courses:
+                line += f": {', '.join(courses)}"
+            lines.append(line)
+        return f"Colleges{where}{offering}:\n\n" + "\n".join(lines)
+
+    def _scholarships_answer(self, district: str) -> str:
+        matches = self.scholarships.match(district=district, limit=self.limit)
+        if not matches:
+            return f"I couldn't find open scholarships for students from {district} right now."
+        lines = []
+        for scholarship in matches:
+            line = f"• {scholarship['name']}"
+            if scholarship.get("amount"):
+                line += f" - ₹{scholarship['amount']:,.0f}"
+            if scholarship.get("deadline"):
+                line += f", apply by {scholarship['deadline']:%d %b %Y}"
+            lines.append(line)
+        return f"Open scholarships for students from {district}:\n\n" + "\n".join(lines)
+
+    def stats(self) -> Dict:
+        return {
+            "gazetteer_terms": len(self.gazetteer),
+            "errors": self.errors,
+            "caches": {intent: cache.stats() for intent, cache in self.caches.items()},
+        }
@@ -1,140 +1,154 @@
-# Enhanced Knowledge Base for Digital Career Advisor Chatbot
-
-COMPREHENSIVE_KNOWLEDGE = {
-    "platform_info": {
-        "description": "Digital Career Advisor is a comprehensive platform designed specifically for Jammu & Kashmir students",
-        "services": [
-            "Career Aptitude Testing - Discover your strengths and perfect career match",
-            "College Explorer - Browse colleges with detailed information",
-            "Scholarship Finder - Access thousands of funding opportunities",
-            "Educational Timeline Planning - Plan your academic journey"
-        ],
-        "target_audience": "Students from Jammu & Kashmir region"
-    },
-    
-    "colleges_detailed": {
-        "jammu_colleges": [
-            "University of Jammu - Offers various undergraduate and postgraduate programs",
-            "Government Medical College Jammu - Premier medical institution",
-            "Jammu College of Engineering and Technology - Engineering programs",
-            "Jammu Institute of Management - Business and management courses"
-        ],
-        "srinagar_colleges": [
-            "University of Kashmir - Leading university with diverse programs",
-            "Government Medical College Srinagar - Medical education hub",
-            "National Institute of Technology Srinagar - Premier engineering institute",
-            "Islamic University of Science and Technology - Technology and science programs"
-        ],
-        "admission_process": [
-            "Check eligibility criteria for desired course",
-            "Fill out application forms before deadline",
-            "Submit required documents and certificates",
-            "Appear for entrance exams if applicable",
-            "Wait for merit list and counseling"
-        ]
-    },
-    
-    "scholarships_detailed": {
-        "government_scholarships": [
-            "Post Matric Scholarship for J&K Students",
-            "Merit Scholarship for Higher Education",
-            "National Scholarship Portal schemes",
-            "Chief Minister's Scholarship Program"
-        ],
-        "private_scholarships": [
-            "Corporate scholarships from major companies",
-            "Foundation and NGO scholarships",
-            "Merit-based institutional scholarships",
-            "Need-based financial aid programs"
-        ],
-        "application_tips": [
-            "Keep all academic documents ready",
-            "Apply before deadlines",
-            "Write compelling personal statements",
-            "Get recommendation letters from teachers"
-        ]
-    },
-    
-    "career_guidance": {
-        "popular_careers": [
-            "Engineering - Software, Civil, Mechanical, Electrical",
-            "Medicine - MBBS, Dentistry, Pharmacy, Nursing",
-            "Management - MBA, Business Administration",
-            "Education - Teaching, Research, Administration",
-            "Government Services - Civil Services, Banking, Defense"
-        ],
-        "aptitude_areas": [
-            "Logical Reasoning and Problem Solving",
-            "Verbal and Communication Skills",
-            "Mathematical and Analytical Ability",
-            "Creative and Artistic Skills",
-            "Leadership and Team Management"
-        ],
-        "career_planning_steps": [
-            "Self-assessment and interest identification",
-            "Research career options and requirements",
-            "Set educational and career goals",
-            "Develop necessary skills and qualifications",
-            "Create action plan with timelines"
-        ]
-    },
-    
-    "educational_paths": {
-        "after_10th": [
-            "Science Stream - PCM (Physics, Chemistry, Mathematics)",
-            "Commerce Stream - Business and Economics focus",
-            "Arts Stream - Humanities and Social Sciences",
-            "Vocational Courses - Skill-based training"
-        ],
-        "after_12th": [
-            "Engineering - B.Tech/B.E programs",
-            "Medicine - MBBS, BDS, Pharmacy",
-            "Commerce - B.Com, BBA, CA",
-            "Arts - BA in various specializations",
-            "Law - LLB programs",
-            "Agriculture - B.Sc Agriculture"
-        ],
-        "higher_education": [
-            "Master's Programs - M.Tech, MBA, M.Sc, MA",
-            "Research Programs - M.Phil, Ph.D",
-            "Professional Courses - CA, CS, CFA",
-            "Government Exams - UPSC, Banking, SSC"
-        ]
-    }
-}
-
-def get_detailed_response(intent: str, query: str) -> str:
-    """Generate detailed responses based on comprehensive knowledge"""
-    query_lower = query.lower()
-    
-    if intent == "colleges":
-        if "jammu" in query_lower:
-            return f"Here are some top colleges in Jammu:\n\n" + "\n".join([f"• {college}" for college in COMPREHENSIVE_KNOWLEDGE["colleges_detailed"]["jammu_colleges"]])
-        elif "srinagar" in query_lower:
-            return f"Here are some top colleges in Srinagar:\n\n" + "\n".join([f"• {college}" for college in COMPREHENSIVE_KNOWLEDGE["colleges_detailed"]["srinagar_colleges"]])
-        elif "admission" in query_lower:
-            return f"Here's the general admission process:\n\n" + "\n".join([f"{i+1}. {step}" for i, step in enumerate(COMPREHENSIVE_KNOWLEDGE["colleges_detailed"]["admission_process"])])
-        else:
-            return "I can provide detailed information about colleges in Jammu, Srinagar, and other districts. What specific information are you looking for?"
-    
-    elif intent == "scholarships":
-        if "government" in query_lower:
-            return f"Government scholarships available:\n\n" + "\n".join([f"• {scholarship}" for scholarship in COMPREHENSIVE_KNOWLEDGE["scholarships_detailed"]["government_scholarships"]])
-        elif "private" in query_lower:
-            return f"Private scholarships available:\n\n" + "\n".join([f"• {scholarship}" for scholarship in COMPREHENSIVE_KNOWLEDGE["scholarships_detailed"]["private_scholarships"]])
-        elif "apply" in query_lower or "application" in query_lower:
-            return f"Scholarship application tips:\n\n" + "\n".join([f"• {tip}" for tip in COMPREHENSIVE_KNOWLEDGE["scholarships_detailed"]["application_tips"]])
-        else:
-            return "I can help you with government scholarships, private funding, and application guidance. What type of scholarship information do you need?"
-    
-    elif intent == "career_guidance":
-        if "career" in query_lower and ("popular" in query_lower or "options" in query_lower):
-            return f"Popular career options for J&K students:\n\n" + "\n".join([f"• {career}" for career in COMPREHENSIVE_KNOWLEDGE["career_guidance"]["popular_careers"]])
-        elif "aptitude" in query_lower:
-            return f"Key aptitude areas assessed:\n\n" + "\n".join([f"• {area}" for area in COMPREHENSIVE_KNOWLEDGE["career_guidance"]["aptitude_areas"]])
-        elif "plan" in query_lower:
-            return f"Career planning steps:\n\n" + "\n".join([f"{i+1}. {step}" for i, step in enumerate(COMPREHENSIVE_KNOWLEDGE["career_guidance"]["career_planning_steps"])])
-        else:
-            return "I can help with career options, aptitude assessment, and planning guidance. What aspect of career guidance interests you?"
-    
-    return None
+# Knowledge base for the Digital Career Advisor chatbot.
+#
+# The data lives in chatbot_knowledge.json: the reference material
+# ("knowledge") and, per intent, the rules that turn query keywords into a
+# detailed answer ("answers"). Loading renders every answer once and indexes
+# it by keyword, so answering a query is a few substring checks and no string
+# building. The file is re-read when it changes.
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chatbot_knowledge.json")
+
+
+class AnswerEntry(NamedTuple):
+    keyword: str
+    requires: Tuple[str, ...]  # keywords that must also appear in the query
+    answer: str
+
+
+def render_answer(knowledge: Dict, rule: Dict) -> str:
+    """The title followed by the referenced knowledge list, bulleted or numbered"""
+    items = knowledge
+    for key in rule["items"]:
+        items = items[key]
+    if rule.get("numbered"):
+        lines = [f"{i}. {item}" for i, item in enumerate(items, 1)]
+    else:
+        lines = [f"• {item}" for item in items]
+    return f"{rule['title']}\n\n" + "\n".join(lines)
+
+
+class KnowledgeIndex:
+    """An immutable, fully rendered snapshot of one version of the data file.
+
+    Each intent's answers are indexed as (keyword, answer) entries sorted
+    longest keyword first, earlier rules first among equal lengths, so the
+    first entry found in a query is the longest match. With a handful of
+    keywords per intent, `keyword in text` checks beat a Python-level
+    automaton scan.
+    """
+
+    def __init__(self, data: Dict):
+        self.knowledge: Dict = data["knowledge"]
+        self.defaults: Dict[str, str] = {}
+        self.answers: Dict[str, Tuple[AnswerEntry, ...]] = {}
+        for intent, spec in data["answers"].items():
+            entries = []
+            for order, rule in enumerate(spec["rules"]):
+                answer = render_answer(self.knowledge, rule)
+                requires = tuple(rule.get("requires", ()))
+                entries.extend((-len(keyword), order, AnswerEntry(keyword, requires, answer))
+                               for keyword in rule["keywords"])
+            self.answers[intent] = tuple(entry for _, _, entry in sorted(entries, key=lambda e: e[:2]))
+            self.defaults[intent] = spec["default"]
+
+    def matched_response(self, intent: str, text: str) -> Optional[str]:
+        """The answer for the longest keyword in lowercased `text`, or None if no rule matches"""
+        for keyword, requires, answer in self.answers.get(intent, ()):
+            if keyword in text:
+                for word in requires:
+                    if word not in text:
+                        break
+                else:
+                    return answer
+        return None
+
+    def detailed_response(self, intent: str, text: str) -> Optional[str]:
+        """The answer for the longest keyword in lowercased `text`, or the intent's default"""
+        if intent not in self.answers:
+            return None
+        answer = self.matched_response(intent, text)
+        return answer if answer is not None else self.defaults[intent]
+
+
+class KnowledgeBase:
+    """The current KnowledgeIndex, replaced when the data file changes on disk.
+
+    At most every `reload_seconds` a lookup checks the file's modification
+    time and size; a changed file is parsed and indexed off to the side and
+    swapped in whole, so concurrent lookups see either the old or the new
+    version. A file that fails to load is logged and the old version kept.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, reload_seconds: float = 0):
+        self.path = path
+        self.reload_seconds = reload_seconds
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._signature = self._file_signature()
+        self._index = self._load()
+        self._next_check = time.monotonic() + reload_seconds
+
+    def _file_signature(self) -> Tuple[int, int]:
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self) -> KnowledgeIndex:
+        with open(self.path, encoding="utf-8") as f:
+            return KnowledgeIndex(json.load(f))
+
+    @property
+    def index(self) -> KnowledgeIndex:
+        if self.reload_seconds and time.monotonic() >= self._next_check:
+            self.reload_if_changed()
+        return self._index
+
+    @property
+    def knowledge(self) -> Dict:
+        return self.index.knowledge
+
+    def reload_if_changed(self) -> bool:
+        """Reload the data file if it changed since the last load; True if a new version was swapped in"""
+        with self._lock:
+            self._next_check = time.monotonic() + self.reload_seconds
+            try:
+                signature = self._file_signature()
+                if signature == self._signature:
+                    return False
+                index = self._load()
+            except (OSError, ValueError, KeyError, TypeError):
+                logger.exception("Failed to reload chatbot knowledge from %s; keeping the previous version", self.path)
+                return False
+            self._signature = signature
+            self._index = index
+            self.reloads += 1
+            logger.info("Reloaded chatbot knowledge from %s", self.path)
+            return True
+
+    def get_detailed_response(self, intent: str, query: str) -> Optional[str]:
+        return self.index.detailed_response(intent, query.lower())
+
+    def get_matched_response(self, intent: str, query: str) -> Optional[str]:
+        return self.index.matched_response(intent, query.lower())
+
+
+knowledge_base = KnowledgeBase(settings.CHATBOT_KNOWLEDGE_PATH or DEFAULT_PATH,
+                               settings.CHATBOT_KNOWLEDGE_RELOAD_SECONDS)
+
+# The reference material as loaded at import; read knowledge_base.knowledge
+# for the current version
+COMPREHENSIVE_KNOWLEDGE = knowledge_base.knowledge
+
+
+def get_detailed_response(intent: str, query: str) -> Optional[str]:
+    """Get detailed response based on intent and query"""
+    return knowledge_base.get_detailed_response(intent, query)
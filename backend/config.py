@@ -7,11 +7,27 @@ class Settings(BaseSettings):
     # Database Configuration
     DATABASE_URL: str = "sqlite:///./career_advisor.db"
     MONGODB_URL: str = "mongodb://localhost:27017"
+    SCHEMA_AUTO_MIGRATE: bool = True  # False: startup only checks the schema version; run `python migrate.py`
+    DB_ENGINE_PROFILE: str = "tuned"  # tuned, or default for driver and pool defaults
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 30
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # server databases; drops connections idle-killed by the server
+    DB_POOL_PRE_PING: bool = True  # server databases
+    DB_STATEMENT_TIMEOUT_MS: int = 30000  # PostgreSQL and MySQL; 0 disables
+    SQLITE_JOURNAL_MODE: str = "WAL"  # readers don't block the writer, nor it them
+    SQLITE_SYNCHRONOUS: str = "NORMAL"  # with WAL, durable across crashes but not power loss
+    SQLITE_MMAP_SIZE: int = 268435456  # 256MB of the file read through the page cache
+    SQLITE_CACHE_SIZE: int = -16384  # per connection; negative means KiB, so 16MB
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
     
     # Security
     SECRET_KEY: str = "your-super-secret-key-here-change-this-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    PASSWORD_HASH_ROUNDS: int = 12  # bcrypt cost; stored hashes at another cost are rehashed on login
+    PASSWORD_HASH_WORKERS: int = 2  # hashing processes; 0 hashes in the request threadpool
+    PASSWORD_HASH_MAX_QUEUE: int = 32  # hashes waiting for a worker before logins get 503
     
     # API Configuration
     API_V1_STR: str = "/api/v1"
@@ -42,6 +58,71 @@ class Settings(BaseSettings):
     # File Upload
     MAX_FILE_SIZE: int = 10485760  # 10MB
     UPLOAD_DIR: str = "./uploads"
+    USER_IMPORT_CHUNK_SIZE: int = 500  # rows per duplicate check, hashing batch and insert transaction
+    
+    # Caching
+    COLLEGE_CACHE_SIZE: int = 256
+    COLLEGE_CACHE_TTL_SECONDS: int = 60  # bounds staleness from writes by other workers
+    TOKEN_CACHE_SIZE: int = 10000
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: int = 30
+    
+    # Search
+    SEARCH_BACKEND: str = "memory"  # memory, fts5 or auto (fts5 when available)
+    SEARCH_MAX_RESULTS: int = 1000
+    
+    # Chatbot
+    CHATBOT_MAX_BATCH_SIZE: int = 5000
+    CHATBOT_KNOWLEDGE_PATH: str = ""  # empty: chatbot_knowledge.json next to the code
+    CHATBOT_KNOWLEDGE_RELOAD_SECONDS: float = 5  # how often to check the file for changes; 0 disables reloading
+    CHATBOT_DYNAMIC_ANSWERS: bool = True  # answer district, course and scholarship questions from the database
+    CHATBOT_ANSWER_CACHE_SIZE: int = 2048  # per intent
+    CHATBOT_ANSWER_CACHE_TTL_SECONDS: int = 300  # bounds staleness from writes by other workers
+    CHATBOT_ANSWER_LIMIT: int = 5  # colleges or scholarships listed per answer
+    CHATBOT_INTENT_MODEL_PATH: str = ""  # model from train_intent_model.py; empty uses the patterns only
+    CHATBOT_INTENT_MODEL_MIN_CONFIDENCE: float = 0.6  # below this the patterns decide
+    CHATBOT_STATE_BACKEND: str = "memory"  # memory, or sqlite to share state between workers
+    CHATBOT_STATE_SQLITE_PATH: str = "./chatbot_state.db"
+    CHATBOT_MAX_INSIGHTS_USERS: int = 500
+    CHATBOT_MAX_USERS: int = 10000
+    CHATBOT_MAX_STATE_BYTES: int = 67108864  # 64MB
+    CHATBOT_USER_TTL_SECONDS: int = 86400
+    CHATBOT_CONVERSATION_BACKEND: str = "none"  # none, sqlite or mongo
+    CHATBOT_CONVERSATION_SQLITE_PATH: str = "./chatbot_conversations.db"
+    CHATBOT_HISTORY_PRELOAD: int = 50
+    CHATBOT_HISTORY_MISS_CACHE_SIZE: int = 10000  # users known to have no stored history
+    CHATBOT_HISTORY_MISS_TTL_SECONDS: int = 60  # bounds how late history written by another worker is seen
+    CHATBOT_FLUSH_BATCH_SIZE: int = 200
+    CHATBOT_FLUSH_INTERVAL_SECONDS: float = 1.0
+    
+    # Rate limiting: token buckets refilled at PER_MINUTE, allowing BURST requests at once
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"  # memory, or sqlite to share buckets between workers
+    RATE_LIMIT_SQLITE_PATH: str = "./rate_limits.db"
+    RATE_LIMIT_MAX_KEYS: int = 100000  # memory backend; least recently used buckets are evicted past this
+    RATE_LIMIT_TRUST_FORWARDED_FOR: bool = False  # key by X-Forwarded-For; only behind a proxy that sets it
+    RATE_LIMIT_API_PER_MINUTE: float = 600  # per IP, every /api/ route
+    RATE_LIMIT_API_BURST: int = 120
+    RATE_LIMIT_CHATBOT_IP_PER_MINUTE: float = 120  # per IP, chatbot posts
+    RATE_LIMIT_CHATBOT_IP_BURST: int = 30
+    RATE_LIMIT_CHATBOT_BATCH_IP_PER_MINUTE: float = 2  # per IP, chatbot batch posts of up to CHATBOT_MAX_BATCH_SIZE
+    RATE_LIMIT_CHATBOT_BATCH_IP_BURST: int = 2
+    RATE_LIMIT_CHATBOT_USER_PER_MINUTE: float = 30  # per user_id
+    RATE_LIMIT_CHATBOT_USER_BURST: int = 10
+    RATE_LIMIT_LOGIN_IP_PER_MINUTE: float = 30  # per IP, /api/token
+    RATE_LIMIT_LOGIN_IP_BURST: int = 10
+    RATE_LIMIT_LOGIN_USERNAME_PER_MINUTE: float = 5  # per username and IP, /api/token
+    RATE_LIMIT_LOGIN_USERNAME_BURST: int = 5
+    RATE_LIMIT_GLOBAL_PER_MINUTE: float = 0  # all clients together on chatbot and login posts; 0 disables
+    RATE_LIMIT_GLOBAL_BURST: int = 200
+    
+    # Quiz
+    QUIZ_MAX_BATCH_SIZE: int = 20000
+    QUIZ_RESULTS_BACKEND: str = "none"  # none or mongo (aptitude_results_collection)
+    CAREER_CACHE_SIZE: int = 4096  # quantized trait profiles; 0 disables caching
+    CAREER_CACHE_TTL_SECONDS: int = 3600
+    CAREER_TRAIT_LEVELS: int = 10  # steps per aptitude area when quantizing
+    CAREER_RECOMMENDATIONS_BACKEND: str = "none"  # none or mongo (career_recommendations_collection)
     
     # Environment
     ENVIRONMENT: str = "development"
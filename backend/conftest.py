@@ -0,0 +1,114 @@
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+import auth
+import database as db
+import main
+
+
+@pytest.fixture
+def test_db(tmp_path):
+    """A fresh, fully migrated SQLite database wired into every session dependency.
+
+    Yields a sessionmaker for seeding and inspecting the database directly.
+    """
+    path = tmp_path / "test.db"
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    db.Base.metadata.create_all(bind=engine)
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+    AsyncTestingSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    def override_get_db():
+        session = TestingSessionLocal()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    async def override_get_async_db():
+        async with AsyncTestingSessionLocal() as session:
+            yield session
+
+    overrides = {main.get_db: override_get_db, db.get_db: override_get_db, db.get_async_db: override_get_async_db}
+    previous = {dependency: main.app.dependency_overrides.get(dependency) for dependency in overrides}
+    main.app.dependency_overrides.update(overrides)
+    main.college_cache.invalidate()
+    auth.token_cache.invalidate()
+    auth.user_cache.invalidate()
+    main.rate_limiter.reset()
+    with TestingSessionLocal() as session:
+        main.search_service.rebuild(session)
+        main.scholarship_index.rebuild(session)
+        main.timeline_index.rebuild(session)
+        main.chatbot_answers.rebuild(session)
+    previous_answer_sessions = main.chatbot_answers.session_factory
+    main.chatbot_answers.session_factory = TestingSessionLocal
+    try:
+        yield TestingSessionLocal
+    finally:
+        main.chatbot_answers.session_factory = previous_answer_sessions
+        for dependency, override in previous.items():
+            if override is None:
+                main.app.dependency_overrides.pop(dependency, None)
+            else:
+                main.app.dependency_overrides[dependency] = override
+        engine.dispose()
+
+
+class QueryCounter:
+    """SQL statements executed on any engine (sync or async) while active"""
+
+    def __init__(self):
+        self.statements = []
+
+    def __len__(self) -> int:
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@pytest.fixture
+def count_queries():
+    """Context manager factory: `with count_queries() as queries: ...; len(queries)`"""
+
+    @contextmanager
+    def counting():
+        counter = QueryCounter()
+        event.listen(Engine, "before_cursor_execute", counter._record)
+        try:
+            yield counter
+        finally:
+            event.remove(Engine, "before_cursor_execute", counter._record)
+
+    return counting
+
+
+@pytest.fixture
+def assert_constant_queries(count_queries):
+    """Fail if `request()` issues more queries after `grow()` adds rows.
+
+    Catches N+1 loading: a list endpoint must run the same number of
+    statements for a page of 2 rows as for a page of 20.
+    """
+
+    def check(request, grow):
+        request()  # warm up connection setup and caches
+        with count_queries() as before:
+            request()
+        grow()
+        with count_queries() as after:
+            request()
+        assert len(after) == len(before), (
+            f"query count grew with rows: {len(before)} -> {len(after)}\n" + "\n".join(after.statements)
+        )
+        return len(after)
+
+    return check
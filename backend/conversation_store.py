@@ -0,0 +1,276 @@
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from cache import TTLCache
+from user_state import Interaction
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationBackend(ABC):
+    """Durable storage for chatbot turns"""
+
+    name = "base"
+
+    @abstractmethod
+    def insert_many(self, rows: List[Dict]) -> None:
+        ...
+
+    @abstractmethod
+    def load_recent(self, user_id: str, limit: int) -> List[Interaction]:
+        """The user's last `limit` turns, oldest first"""
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteConversationBackend(ConversationBackend):
+    """In-process SQLite backend; `:memory:` works for tests"""
+
+    name = "sqlite"
+
+    def __init__(self, path: str = ":memory:"):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chatbot_conversations ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL, timestamp REAL NOT NULL, "
+                "user_message TEXT, bot_response TEXT, intent TEXT, emotion TEXT, confidence REAL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_chatbot_conversations_user ON chatbot_conversations (user_id, id)"
+            )
+
+    def insert_many(self, rows: List[Dict]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO chatbot_conversations "
+                "(user_id, timestamp, user_message, bot_response, intent, emotion, confidence) "
+                "VALUES (:user_id, :timestamp, :user_message, :bot_response, :intent, :emotion, :confidence)",
+                rows,
+            )
+
+    def load_recent(self, user_id: str, limit: int) -> List[Interaction]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT timestamp, user_message, bot_response, intent, emotion, confidence "
+                "FROM chatbot_conversations WHERE user_id = ? ORDER BY id DESC LIMIT ?",
+                (user_id, limit),
+            ).fetchall()
+        return [
+            Interaction.create(message, response, intent, emotion, confidence, timestamp)
+            for timestamp, message, response, intent, emotion, confidence in reversed(rows)
+        ]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class MongoConversationBackend(ConversationBackend):
+    """Backend for `database.chatbot_conversations_collection`.
+
+    Takes the synchronous pymongo collection (`motor_collection.delegate`),
+    since flushes run on a background thread rather than the event loop.
+    """
+
+    name = "mongo"
+
+    def __init__(self, collection):
+        self._collection = collection
+        self._indexed = False
+
+    def insert_many(self, rows: List[Dict]) -> None:
+        if not self._indexed:
+            self._collection.create_index([("user_id", 1), ("timestamp", -1)])
+            self._indexed = True
+        # insert_many adds an _id to each document; hand it copies
+        self._collection.insert_many([dict(row) for row in rows], ordered=False)
+
+    def load_recent(self, user_id: str, limit: int) -> List[Interaction]:
+        cursor = self._collection.find({"user_id": user_id}, {"_id": 0}).sort("timestamp", -1).limit(limit)
+        return [
+            Interaction.create(doc["user_message"], doc["bot_response"], doc["intent"],
+                               doc["emotion"], doc["confidence"], doc["timestamp"])
+            for doc in reversed(list(cursor))
+        ]
+
+
+class WriteBehindConversationStore:
+    """Buffers chatbot turns in memory and flushes them to a backend in bulk.
+
+    A background thread flushes when `max_batch` turns are pending or
+    `flush_interval` seconds have passed. Reads merge the backend's rows
+    with turns that have not been written yet, which are indexed by user.
+    Users the backend had no turns for are remembered for
+    `miss_ttl` seconds, so a stream of new users doesn't cost a backend
+    query per message.
+    """
+
+    def __init__(self, backend: ConversationBackend, max_batch: int = 200,
+                 flush_interval: float = 1.0, max_queue: int = 100000,
+                 miss_cache_size: int = 10000, miss_ttl: float = 60):
+        self.backend = backend
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self._pending: Deque[Dict] = deque()
+        self._in_flight: List[Dict] = []
+        # user_id -> that user's pending and in-flight rows, oldest first
+        self._unwritten: Dict[str, Deque[Dict]] = {}
+        self._misses = TTLCache(maxsize=miss_cache_size, ttl=miss_ttl)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        self._flushes = 0
+        self._flushed_rows = 0
+        self._failed_flushes = 0
+        self._dropped_rows = 0
+        self._last_flush_ms = 0.0
+        self._max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    def record(self, user_id: str, interaction: Interaction) -> None:
+        row = interaction._asdict()
+        row["user_id"] = user_id
+        with self._lock:
+            if len(self._pending) >= self.max_queue:
+                self._forget(self._pending.popleft())
+                self._dropped_rows += 1
+            self._pending.append(row)
+            self._unwritten.setdefault(user_id, deque()).append(row)
+            self._misses.pop(user_id)
+            pending = len(self._pending)
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name="chatbot-write-behind", daemon=True)
+                self._thread.start()
+        if pending >= self.max_batch:
+            self._wakeup.set()
+
+    def _forget(self, row: Dict) -> None:
+        """Drop a written or discarded row from the per-user index"""
+        rows = self._unwritten[row["user_id"]]
+        if rows[0] is row:
+            rows.popleft()
+        else:
+            # Only when the queue overflows while older rows of the user are in flight
+            rows.remove(row)
+        if not rows:
+            del self._unwritten[row["user_id"]]
+
+    def load_recent(self, user_id: str, limit: int) -> List[Interaction]:
+        with self._lock:
+            unwritten = list(self._unwritten.get(user_id, ()))
+        if not unwritten and self._misses.get(user_id):
+            return []
+        history = self.backend.load_recent(user_id, limit)
+        if not history and not unwritten:
+            self._misses.set(user_id, True)
+            return []
+        # A row in flight may already be committed and returned by the backend too
+        written = {(interaction.timestamp, interaction.user_message) for interaction in history}
+        history.extend(
+            Interaction.create(row["user_message"], row["bot_response"], row["intent"],
+                               row["emotion"], row["confidence"], row["timestamp"])
+            for row in unwritten
+            if (row["timestamp"], row["user_message"]) not in written
+        )
+        return history[-limit:]
+
+    def flush(self) -> int:
+        """Write all pending turns now; returns the number written"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = list(self._pending), deque()
+                self._in_flight = batch
+            if not batch:
+                return 0
+
+            started = time.perf_counter()
+            try:
+                self.backend.insert_many(batch)
+            except Exception as e:
+                logger.error(f"Conversation flush failed: {str(e)}")
+                with self._lock:
+                    self._failed_flushes += 1
+                    # Keep the turns for the next attempt, within the queue limit
+                    self._pending.extendleft(reversed(batch))
+                    while len(self._pending) > self.max_queue:
+                        self._forget(self._pending.popleft())
+                        self._dropped_rows += 1
+                    self._in_flight = []
+                return 0
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                for row in batch:
+                    self._forget(row)
+                self._in_flight = []
+                self._flushes += 1
+                self._flushed_rows += len(batch)
+                self._last_flush_ms = elapsed_ms
+                self._max_flush_ms = max(self._max_flush_ms, elapsed_ms)
+                self._total_flush_ms += elapsed_ms
+            return len(batch)
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def close(self) -> None:
+        """Stop the flusher thread after writing everything still buffered"""
+        self._closed = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+        self.backend.close()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "backend": self.backend.name,
+                "queue_depth": len(self._pending) + len(self._in_flight),
+                "flushes": self._flushes,
+                "flushed_rows": self._flushed_rows,
+                "failed_flushes": self._failed_flushes,
+                "dropped_rows": self._dropped_rows,
+                "unwritten_users": len(self._unwritten),
+                "cached_misses": len(self._misses),
+                "last_flush_ms": round(self._last_flush_ms, 3),
+                "max_flush_ms": round(self._max_flush_ms, 3),
+                "avg_flush_ms": round(self._total_flush_ms / self._flushes, 3) if self._flushes else 0.0,
+            }
+
+
+def create_conversation_store(settings) -> Optional[WriteBehindConversationStore]:
+    """Build the store selected by CHATBOT_CONVERSATION_BACKEND ("none", "sqlite" or "mongo")"""
+    backend_name = settings.CHATBOT_CONVERSATION_BACKEND
+    if backend_name == "none":
+        return None
+    if backend_name == "sqlite":
+        backend = SQLiteConversationBackend(settings.CHATBOT_CONVERSATION_SQLITE_PATH)
+    elif backend_name == "mongo":
+        import database
+        if database.mongo_db is None:
+            raise RuntimeError("CHATBOT_CONVERSATION_BACKEND=mongo requires motor to be installed")
+        backend = MongoConversationBackend(database.chatbot_conversations_collection.delegate)
+    else:
+        raise ValueError(f"Unknown chatbot conversation backend: {backend_name}")
+    return WriteBehindConversationStore(
+        backend,
+        max_batch=settings.CHATBOT_FLUSH_BATCH_SIZE,
+        flush_interval=settings.CHATBOT_FLUSH_INTERVAL_SECONDS,
+        miss_cache_size=settings.CHATBOT_HISTORY_MISS_CACHE_SIZE,
+        miss_ttl=settings.CHATBOT_HISTORY_MISS_TTL_SECONDS,
+    )
@@ -1,25 +1,87 @@
 from sqlalchemy import create_engine, Column, Integer, String, Float, ForeignKey, Table, MetaData, Text, Boolean, DateTime
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy import event, inspect, literal
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, sessionmaker, relationship, object_session
+from functools import partial
+from typing import Callable, List, NamedTuple, Tuple
 import datetime
+import hashlib
+import logging
+import threading
 from config import settings
+from engine_profiles import engine_options, instrument, make_engine
 
-# Database setup
+logger = logging.getLogger(__name__)
+
+# Database setup; pooling, timeouts and SQLite pragmas follow DB_ENGINE_PROFILE
 DATABASE_URL = settings.DATABASE_URL
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {})
+engine, pool_metrics = make_engine(DATABASE_URL)
+async_pool_metrics = None
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
-# MongoDB setup (optional)
-try:
-    from motor.motor_asyncio import AsyncIOMotorClient
-    MONGODB_URL = settings.MONGODB_URL
-    mongo_client = AsyncIOMotorClient(MONGODB_URL)
-    mongo_db = mongo_client.career_advisor_db
-except ImportError:
-    # MongoDB not available, use None
-    mongo_client = None
-    mongo_db = None
+# Async engine for non-blocking routes, created on first use so the async
+# driver (aiosqlite/asyncpg) is only required when an async route is hit
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+async_engine = None
+AsyncSessionLocal = None
+
+def async_database_url(url: str) -> str:
+    scheme, separator, rest = url.partition("://")
+    dialect = scheme.split("+")[0]
+    if dialect not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {dialect} databases")
+    return f"{ASYNC_DRIVERS[dialect]}{separator}{rest}"
+
+def get_async_sessionmaker():
+    global async_engine, async_pool_metrics, AsyncSessionLocal
+    if AsyncSessionLocal is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        async_url = async_database_url(DATABASE_URL)
+        async_engine = create_async_engine(async_url, **engine_options(async_url, is_async=True))
+        async_pool_metrics = instrument(async_engine.sync_engine, async_url)
+        AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    return AsyncSessionLocal
+
+# MongoDB setup (optional). Importing motor and building the client are
+# deferred to the first use of `mongo_db` or a collection below
+MONGODB_URL = settings.MONGODB_URL
+MONGO_COLLECTIONS = {
+    "aptitude_results_collection": "aptitude_results",
+    "career_recommendations_collection": "career_recommendations",
+    "user_profiles_collection": "user_profiles",
+    "chatbot_conversations_collection": "chatbot_conversations",
+}
+_mongo_db = None
+_mongo_lock = threading.Lock()
+
+def get_mongo_db():
+    """The Motor database, or None when motor is not installed"""
+    global _mongo_db
+    if _mongo_db is None:
+        with _mongo_lock:
+            if _mongo_db is None:
+                try:
+                    from motor.motor_asyncio import AsyncIOMotorClient
+                except ImportError:
+                    return None
+                _mongo_db = AsyncIOMotorClient(MONGODB_URL).career_advisor_db
+    return _mongo_db
+
+def __getattr__(name):
+    # mongo_client, mongo_db and the *_collection attributes, resolved on first access
+    if name == "mongo_db":
+        return get_mongo_db()
+    if name == "mongo_client":
+        mongo = get_mongo_db()
+        return mongo.client if mongo is not None else None
+    if name in MONGO_COLLECTIONS:
+        mongo = get_mongo_db()
+        if mongo is None:
+            raise RuntimeError(f"{name} needs MongoDB support; install motor")
+        return mongo[MONGO_COLLECTIONS[name]]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # PostgreSQL Models
 class User(Base):
@@ -85,20 +147,206 @@ class Timeline(Base):
     description = Column(Text)
     url = Column(String)
 
+# Change notifications: callbacks run after a commit that touched watched models
+class ChangeEvent(NamedTuple):
+    op: str  # insert, update or delete
+    model: type
+    values: dict  # column values loaded at flush time
+
+_change_watchers: List[Tuple[Tuple[type, ...], Callable[[List[ChangeEvent]], None]]] = []
+
+def watch_changes(models, callback: Callable[[List[ChangeEvent]], None]) -> None:
+    """Call `callback(events)` after each commit that inserted, updated or deleted rows of `models`"""
+    models = tuple(models)
+    for model in models:
+        if not any(model in watched for watched, _ in _change_watchers):
+            for op in ("insert", "update", "delete"):
+                event.listen(model, f"after_{op}", partial(_record_change, op))
+    _change_watchers.append((models, callback))
+
+def _record_change(op, mapper, connection, target):
+    session = object_session(target)
+    if session is None:
+        return
+    state = inspect(target)
+    values = {attr.key: state.dict[attr.key] for attr in mapper.column_attrs if attr.key in state.dict}
+    session.info.setdefault("changes", []).append(ChangeEvent(op, mapper.class_, values))
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_changes(session):
+    changes = session.info.pop("changes", None)
+    if not changes:
+        return
+    for models, callback in _change_watchers:
+        relevant = [change for change in changes if issubclass(change.model, models)]
+        if relevant:
+            try:
+                callback(relevant)
+            except Exception as e:
+                logger.error(f"Change watcher failed: {str(e)}")
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop("changes", None)
+
+def pool_stats():
+    stats = {"profile": settings.DB_ENGINE_PROFILE, "sync": pool_metrics.stats()}
+    if async_pool_metrics is not None:
+        stats["async"] = async_pool_metrics.stats()
+    return stats
+
+# Schema versioning: the recorded fingerprint of the models' DDL lets startup
+# skip create_all (one reflection query per table) when nothing has changed
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(String, nullable=False)
+    applied_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+def schema_fingerprint(bind=None) -> str:
+    """Hash of the CREATE TABLE / CREATE INDEX statements for every model"""
+    dialect = (bind or engine).dialect
+    if dialect.name not in _fingerprints:
+        _fingerprints[dialect.name] = _compute_fingerprint(dialect)
+    return _fingerprints[dialect.name]
+
+_fingerprints = {}
+
+def _compute_fingerprint(dialect) -> str:
+    from sqlalchemy.schema import CreateIndex, CreateTable
+    digest = hashlib.sha256()
+    for table in Base.metadata.sorted_tables:
+        digest.update(str(CreateTable(table).compile(dialect=dialect)).encode())
+        for index in sorted(table.indexes, key=lambda index: index.name or ""):
+            digest.update(str(CreateIndex(index).compile(dialect=dialect)).encode())
+    return digest.hexdigest()[:16]
+
+def schema_is_current(bind=None) -> bool:
+    """One query: does the database record the models' current fingerprint?"""
+    bind = bind or engine
+    try:
+        with bind.connect() as connection:
+            recorded = connection.execute(
+                SchemaVersion.__table__.select().with_only_columns(SchemaVersion.version)
+                .order_by(SchemaVersion.id.desc()).limit(1)
+            ).scalar()
+    except SQLAlchemyError:
+        return False  # no schema_version table yet
+    return recorded == schema_fingerprint(bind)
+
+class SchemaMismatch(RuntimeError):
+    """Existing tables differ from the models in ways migrate can't fix"""
+
+    def __init__(self, differences: List[str]):
+        super().__init__("schema differs from the models: " + "; ".join(differences))
+        self.differences = differences
+
+def _scalar_default(column):
+    default = column.default
+    return default.arg if default is not None and default.is_scalar else None
+
+def _can_add(column) -> bool:
+    """Whether ALTER TABLE ADD COLUMN can give existing rows a valid value for `column`"""
+    if column.primary_key or column.unique:
+        return False
+    return column.nullable or _scalar_default(column) is not None
+
+def _column_changes(bind) -> Tuple[List[Tuple[Table, Column]], List[str]]:
+    """(missing columns migrate can add, differences it can't fix) for the existing tables
+
+    Compared by name only: reflected types vary by dialect too much to
+    compare reliably. Missing tables and indexes are not differences,
+    since `migrate` creates them.
+    """
+    inspector = inspect(bind)
+    existing = set(inspector.get_table_names())
+    addable, differences = [], []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing:
+            continue
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in columns:
+                continue
+            if _can_add(column):
+                addable.append((table, column))
+            else:
+                differences.append(f"{table.name}.{column.name} is missing")
+        differences += [f"{table.name}.{name} is not in the models"
+                        for name in sorted(columns - set(table.columns.keys()))]
+    return addable, differences
+
+def schema_differences(bind=None) -> List[str]:
+    """Differences between existing tables and the models that `migrate` can't fix.
+
+    Those are columns only the database has, and missing columns that are
+    keys, unique, or NOT NULL without a default.
+    """
+    return _column_changes(bind or engine)[1]
+
+def _add_column(connection, table: Table, column: Column) -> None:
+    dialect = connection.dialect
+    quote = dialect.identifier_preparer.quote
+    ddl = f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column.type.compile(dialect=dialect)}"
+    default = _scalar_default(column)
+    if default is not None:
+        # Existing rows take the model's default rather than NULL
+        literal_default = literal(default, column.type).compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+        ddl += f" DEFAULT {literal_default}"
+    if not column.nullable:
+        ddl += " NOT NULL"
+    connection.exec_driver_sql(ddl)
+
+def migrate(bind=None) -> bool:
+    """Bring the database up to the models and record the fingerprint; False if already current.
+
+    Creates missing tables and indexes and adds missing columns that
+    existing rows can take (nullable or with a default). When existing
+    tables differ in other ways this raises SchemaMismatch instead of
+    recording a version the database doesn't have.
+    """
+    bind = bind or engine
+    if schema_is_current(bind):
+        return False
+    addable, differences = _column_changes(bind)
+    if differences:
+        raise SchemaMismatch(differences)
+    if addable:
+        with bind.begin() as connection:
+            for table, column in addable:
+                _add_column(connection, table, column)
+        logger.info("Added columns " + ", ".join(f"{table.name}.{column.name}" for table, column in addable))
+    Base.metadata.create_all(bind=bind)
+    # Indexes added to a model whose table already existed
+    inspector = inspect(bind)
+    for table in Base.metadata.sorted_tables:
+        present = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in present:
+                index.create(bind)
+    with bind.begin() as connection:
+        connection.execute(SchemaVersion.__table__.insert().values(version=schema_fingerprint(bind)))
+    return True
+
 # Database initialization function
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    migrate()
 
-# Get database session
+# Get database session; FastAPI caches dependencies per request, so auth and
+# the route share the one session this yields
 def get_db():
     db = SessionLocal()
     try:
         yield db
+    except Exception as e:
+        logger.error(f"Database error: {str(e)}")
+        db.rollback()
+        raise
     finally:
         db.close()
 
-# MongoDB collections
-aptitude_results_collection = mongo_db.aptitude_results
-career_recommendations_collection = mongo_db.career_recommendations
-user_profiles_collection = mongo_db.user_profiles
-chatbot_conversations_collection = mongo_db.chatbot_conversations
\ No newline at end of file
+# Get async database session
+async def get_async_db():
+    async with get_async_sessionmaker()() as session:
+        yield session
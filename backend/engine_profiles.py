@@ -0,0 +1,118 @@
+import threading
+from typing import Dict, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+
+from config import settings
+
+# DB_ENGINE_PROFILE values: "tuned" applies the DB_* / SQLITE_* settings
+# below, "default" leaves driver and pool defaults alone
+PROFILES = ("tuned", "default")
+
+
+def _is_memory_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def engine_options(url: str, profile: Optional[str] = None, is_async: bool = False) -> Dict:
+    """Keyword arguments for create_engine / create_async_engine under `profile`"""
+    profile = profile or settings.DB_ENGINE_PROFILE
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown DB_ENGINE_PROFILE {profile!r}; expected one of {', '.join(PROFILES)}")
+    url = make_url(url)
+    backend = url.get_backend_name()
+    connect_args = {}
+    if backend == "sqlite" and not is_async:
+        connect_args["check_same_thread"] = False
+    options = {"connect_args": connect_args}
+    if profile == "default":
+        return options
+
+    if backend == "sqlite":
+        connect_args["timeout"] = settings.SQLITE_BUSY_TIMEOUT_MS / 1000
+        if _is_memory_sqlite(url) or is_async:
+            # A single shared connection, or aiosqlite's NullPool: nothing to size
+            return options
+    else:
+        options["pool_pre_ping"] = settings.DB_POOL_PRE_PING
+        options["pool_recycle"] = settings.DB_POOL_RECYCLE_SECONDS
+        timeout = settings.DB_STATEMENT_TIMEOUT_MS
+        if timeout and backend == "postgresql":
+            if is_async:
+                connect_args["server_settings"] = {"statement_timeout": str(timeout)}
+            else:
+                connect_args["options"] = f"-c statement_timeout={timeout}"
+        elif timeout and backend == "mysql":
+            connect_args["init_command"] = f"SET SESSION max_execution_time={timeout}"
+    options["pool_size"] = settings.DB_POOL_SIZE
+    options["max_overflow"] = settings.DB_MAX_OVERFLOW
+    options["pool_timeout"] = settings.DB_POOL_TIMEOUT_SECONDS
+    return options
+
+
+def sqlite_pragmas() -> Dict[str, object]:
+    return {
+        "journal_mode": settings.SQLITE_JOURNAL_MODE,
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        "cache_size": settings.SQLITE_CACHE_SIZE,
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+    }
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in sqlite_pragmas().items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+class PoolMetrics:
+    """Counters from a pool's events, plus its live occupancy"""
+
+    def __init__(self, engine: Engine):
+        self.pool = engine.pool
+        self.connects = 0
+        self.checkouts = 0
+        self.invalidations = 0  # includes connections failing pre-ping
+        self._lock = threading.Lock()
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "invalidate", self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def stats(self) -> Dict:
+        stats = {"pool": type(self.pool).__name__, "connects": self.connects,
+                 "checkouts": self.checkouts, "invalidations": self.invalidations}
+        for name in ("size", "checkedin", "checkedout", "overflow"):
+            if hasattr(self.pool, name):
+                stats[name] = getattr(self.pool, name)()
+        return stats
+
+
+def instrument(engine: Engine, url: str, profile: Optional[str] = None) -> PoolMetrics:
+    """Apply the profile's on-connect setup to `engine` (the sync engine of an async one)"""
+    profile = profile or settings.DB_ENGINE_PROFILE
+    if profile == "tuned" and make_url(url).get_backend_name() == "sqlite":
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+    return PoolMetrics(engine)
+
+
+def make_engine(url: str, profile: Optional[str] = None):
+    """A sync engine configured by `profile` (DB_ENGINE_PROFILE by default), with its PoolMetrics"""
+    engine = create_engine(url, **engine_options(url, profile))
+    return engine, instrument(engine, url, profile)
@@ -0,0 +1,98 @@
+import re
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+# Entity kinds the chatbot recognises
+DISTRICT = "district"
+COURSE = "course"
+COLLEGE = "college"
+
+_END = ""  # trie key holding the {kind: value} of the term ending at a node; never a character
+_WORD_START = re.compile(r"[^\W_]+")
+
+
+class EntitySpan(NamedTuple):
+    start: int
+    end: int
+    kind: str
+    value: str  # the canonical spelling, as stored in the database
+
+
+def normalize_term(term: str) -> str:
+    return " ".join(term.lower().split())
+
+
+class Gazetteer:
+    """A character trie of known entity names, matched as whole words.
+
+    `extract` makes one left-to-right pass over a message: at each word
+    start it follows the trie for as long as some name continues, keeps the
+    longest name that ends on a word boundary, and resumes after it. Cost
+    grows with the message, not with the number of names, and `add` only
+    extends the trie, so names can be added while messages are scanned.
+    """
+
+    def __init__(self):
+        self._root: Dict = {}
+        self._lock = threading.Lock()  # serializes writers; readers never block
+        self.terms = 0
+
+    def __len__(self) -> int:
+        return self.terms
+
+    def add(self, term: str, kind: str, value: Optional[str] = None) -> None:
+        """Recognise `term` case-insensitively, with runs of spaces as one, as `kind`; spans report `value` (default `term`)"""
+        key = normalize_term(term)
+        if not key:
+            return
+        value = term if value is None else value
+        with self._lock:
+            node = self._root
+            for ch in key:
+                child = node.get(ch)
+                if child is None:
+                    child = node[ch] = {}
+                node = child
+            values = node.get(_END, {})
+            if not values:
+                self.terms += 1
+            # Replace rather than mutate, so a concurrent reader sees either version
+            node[_END] = {**values, kind: value}
+
+    def add_all(self, terms: Iterable[str], kind: str) -> None:
+        for term in terms:
+            self.add(term, kind)
+
+    def extract(self, text: str) -> List[EntitySpan]:
+        """Leftmost-longest, non-overlapping whole-word matches; a name known as several kinds yields a span per kind"""
+        text = text.lower()
+        length = len(text)
+        root = self._root
+        spans = []
+        resume = 0
+        for word in _WORD_START.finditer(text):
+            start = word.start()
+            if start < resume:
+                continue
+            node = root.get(text[start])
+            position = start + 1
+            match = None
+            while node is not None:
+                values = node.get(_END)
+                if values is not None and (position == length or not text[position].isalnum()):
+                    match = (position, values)
+                if position == length:
+                    break
+                ch = text[position]
+                if ch.isspace():
+                    # A run of whitespace, newlines included, is one space, as in `add`
+                    ch = " "
+                    while position + 1 < length and text[position + 1].isspace():
+                        position += 1
+                node = node.get(ch)
+                position += 1
+            if match is not None:
+                end, values = match
+                spans.extend(EntitySpan(start, end, kind, value) for kind, value in values.items())
+                resume = end
+        return spans
@@ -0,0 +1,197 @@
+import re
+from collections import deque
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+# Characters that re.IGNORECASE still equates with an ASCII letter after str.lower()
+_IGNORECASE_FOLD = str.maketrans({'ı': 'i', 'ſ': 's'})
+
+_LITERAL_ALTERNATION = re.compile(r'^\\b\((.*)\)\\b$')
+_REGEX_METACHARACTERS = set('.^$*+?{}[]()|\\')
+
+
+def _is_word_char(ch: str) -> bool:
+    """Mirror of the `\\w` class used by `re` for str patterns"""
+    return ch.isalnum() or ch == '_'
+
+
+def _literal_alternatives(pattern: str) -> Optional[List[str]]:
+    """Split a `\\b(a|b|c)\\b` pattern into its literal alternatives.
+
+    Returns None when the pattern uses any other regex syntax, in which case
+    the caller has to keep matching it with `re`.
+    """
+    match = _LITERAL_ALTERNATION.match(pattern)
+    if not match:
+        return None
+
+    alternatives = []
+    for alternative in match.group(1).split('|'):
+        literal = []
+        escaped = False
+        for ch in alternative:
+            if escaped:
+                if ch.isalnum():
+                    return None  # \d, \s, \b ... are classes, not literals
+                literal.append(ch)
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch in _REGEX_METACHARACTERS:
+                return None
+            else:
+                literal.append(ch)
+        if escaped or not literal:
+            return None
+        alternatives.append(''.join(literal))
+    return alternatives
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton reporting every (possibly overlapping) keyword occurrence"""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._outputs: List[List[Tuple[int, object]]] = [[]]
+        self._delta: Optional[List[Dict[str, int]]] = None
+
+    def add(self, keyword: str, value: object) -> None:
+        """Register `keyword`; `value` is reported with every occurrence"""
+        if not keyword:
+            raise ValueError("Keyword must not be empty")
+        state = 0
+        for ch in keyword:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._outputs.append([])
+                self._goto[state][ch] = next_state
+            state = next_state
+        self._outputs[state].append((len(keyword), value))
+        self._delta = None
+
+    def build(self) -> None:
+        """Compute failure links and flatten them into a full transition table"""
+        fail = [0] * len(self._goto)
+        outputs = [list(out) for out in self._outputs]
+        delta: List[Dict[str, int]] = [dict(goto) for goto in self._goto]
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            # Inherit the transitions of the failure state for characters
+            # this state does not handle itself (BFS order guarantees the
+            # failure state is already complete)
+            for ch, target in delta[fail[state]].items():
+                delta[state].setdefault(ch, target)
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail[next_state] = delta[fail[state]].get(ch, 0)
+                outputs[next_state].extend(outputs[fail[next_state]])
+
+        self._delta = delta
+        self._compiled_outputs = [tuple(out) for out in outputs]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, object]]:
+        """Yield `(start, end, value)` for every keyword occurrence in `text`"""
+        if self._delta is None:
+            self.build()
+        delta = self._delta
+        outputs = self._compiled_outputs
+        state = 0
+        for index, ch in enumerate(text):
+            state = delta[state].get(ch, 0)
+            if outputs[state]:
+                end = index + 1
+                for length, value in outputs[state]:
+                    yield end - length, end, value
+
+
+class ScanResult(NamedTuple):
+    intent_matches: Dict[str, int]  # number of matching patterns per intent
+    emotion_scores: Dict[str, int]  # number of keywords found per emotion
+
+
+class IntentEngine:
+    """Matches every intent pattern and emotion keyword in a single pass.
+
+    Literal `\\b(a|b)\\b` patterns are compiled into one keyword automaton
+    together with the emotion keywords, so a message is lowercased and
+    scanned once instead of once per pattern. The results are identical to
+    running `re.search(pattern, text.lower(), re.IGNORECASE)` per pattern and
+    `keyword in text.lower()` per emotion keyword.
+    """
+
+    _INTENT = 0
+    _EMOTION = 1
+
+    def __init__(self, intent_patterns: Dict[str, Dict], emotion_keywords: Dict[str, List[str]]):
+        self.intents = list(intent_patterns)
+        self.emotions = list(emotion_keywords)
+        self.pattern_counts = {intent: len(data['patterns']) for intent, data in intent_patterns.items()}
+
+        self._automaton = KeywordAutomaton()
+        self._fallback_patterns: List[Tuple[str, int, re.Pattern]] = []
+        self._slot_intents: List[str] = []
+
+        for intent, data in intent_patterns.items():
+            for pattern in data['patterns']:
+                slot = len(self._slot_intents)
+                self._slot_intents.append(intent)
+                alternatives = _literal_alternatives(pattern)
+                if alternatives is None:
+                    self._fallback_patterns.append((intent, slot, re.compile(pattern, re.IGNORECASE)))
+                    continue
+                for alternative in alternatives:
+                    keyword = alternative.lower().translate(_IGNORECASE_FOLD)
+                    self._automaton.add(keyword, (self._INTENT, slot))
+
+        for emotion, keywords in emotion_keywords.items():
+            for index, keyword in enumerate(keywords):
+                self._automaton.add(keyword, (self._EMOTION, (emotion, index)))
+
+        self._automaton.build()
+
+    def scan(self, text: str) -> ScanResult:
+        """Collect per-intent pattern matches and emotion hits for `text`"""
+        lowered = text.lower()
+        folded = lowered.translate(_IGNORECASE_FOLD)
+
+        matched_slots = set()
+        found_keywords = set()
+        if folded == lowered:
+            self._collect(lowered, matched_slots, found_keywords)
+        else:
+            # Emotion keywords are plain substring checks, so they must not
+            # see the case-folded text
+            self._collect(folded, matched_slots, None)
+            self._collect(lowered, None, found_keywords)
+
+        for intent, slot, compiled in self._fallback_patterns:
+            if compiled.search(lowered):
+                matched_slots.add(slot)
+
+        intent_matches = dict.fromkeys(self.intents, 0)
+        for slot in matched_slots:
+            intent_matches[self._slot_intents[slot]] += 1
+
+        emotion_scores = dict.fromkeys(self.emotions, 0)
+        for emotion, _index in found_keywords:
+            emotion_scores[emotion] += 1
+
+        return ScanResult(intent_matches, emotion_scores)
+
+    def _collect(self, text: str, matched_slots: Optional[set], found_keywords: Optional[set]) -> None:
+        length = len(text)
+        for start, end, (kind, payload) in self._automaton.iter_matches(text):
+            if kind == self._EMOTION:
+                if found_keywords is not None:
+                    found_keywords.add(payload)
+                continue
+            if matched_slots is None or payload in matched_slots:
+                continue
+            # Emulate `\b` on both sides of the keyword
+            before = start > 0 and _is_word_char(text[start - 1])
+            after = end < length and _is_word_char(text[end])
+            if before != _is_word_char(text[start]) and after != _is_word_char(text[end - 1]):
+                matched_slots.add(payload)
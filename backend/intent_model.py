@@ -0,0 +1,210 @@
+import json
+import math
+import re
+import zlib
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+
+# File layout: MAGIC, a 4-byte little-endian header length, the JSON header,
+# then each array's raw bytes at the 64-byte aligned offset the header lists
+MAGIC = b"INTENTMODEL1\n"
+_ALIGN = 64
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+@lru_cache(maxsize=65536)
+def _word_features(word: str, n_bits: int) -> Tuple[int, ...]:
+    """Hashed ids of a word's unigram and the character trigrams of "<word>"; words repeat, so they are cached"""
+    mask = (1 << n_bits) - 1
+    padded = f"<{word}>"
+    grams = [f"w {word}"] + [f"c {padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    return tuple(zlib.crc32(gram.encode()) & mask for gram in grams)
+
+
+def _feature_ids(text: str, n_bits: int) -> List[int]:
+    """Hashed word unigrams, word bigrams and character trigrams of each padded word, with repeats.
+
+    crc32 rather than `hash()`, which is salted per process, so a model
+    trained in one process scores the same features in another.
+    """
+    mask = (1 << n_bits) - 1
+    words = _TOKEN.findall(text.lower())
+    ids = [feature for word in words for feature in _word_features(word, n_bits)]
+    ids += [zlib.crc32(f"b {first} {second}".encode()) & mask for first, second in zip(words, words[1:])]
+    return ids
+
+
+def hashed_features(text: str, n_bits: int) -> Counter:
+    """Counts of each hashed feature of `text`"""
+    return Counter(_feature_ids(text, n_bits))
+
+
+class SparseBatch(NamedTuple):
+    """Feature occurrences of a batch of messages, one entry per (message, feature)"""
+    docs: np.ndarray  # message index
+    features: np.ndarray  # hashed feature id
+    counts: np.ndarray
+
+
+def vectorize(texts: Sequence[str], n_bits: int) -> SparseBatch:
+    per_text = [_feature_ids(text, n_bits) for text in texts]
+    ids = np.fromiter((feature for ids in per_text for feature in ids), dtype=np.int64)
+    docs = np.repeat(np.arange(len(texts), dtype=np.int64), [len(ids) for ids in per_text])
+    # Repeated features of a message collapse into one entry with a count
+    keys, counts = np.unique((docs << n_bits) | ids, return_counts=True)
+    return SparseBatch(keys >> n_bits, keys & ((1 << n_bits) - 1), counts.astype(np.float32))
+
+
+class IntentModel:
+    """A linear classifier over L2-normalized, sublinear TF-IDF hashed n-grams.
+
+    Only the features seen in training are stored: their sorted ids, IDF
+    and a weight row per id (float16), so the file is a few hundred KB
+    instead of 2**n_bits rows. `load` memory-maps the arrays, which makes
+    loading O(1) and lets worker processes share the pages.
+    """
+
+    def __init__(self, classes: List[str], n_bits: int, feature_ids: np.ndarray, idf: np.ndarray,
+                 weights: np.ndarray, bias: np.ndarray, unseen_idf: float):
+        self.classes = list(classes)
+        self.n_bits = n_bits
+        self.feature_ids = feature_ids  # sorted
+        self.idf = idf
+        self.weights = weights  # (features, classes)
+        self.bias = bias
+        self.unseen_idf = unseen_idf
+
+    def _rows(self, batch: SparseBatch) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(row of each occurrence in the stored arrays, whether the feature is stored, TF-IDF values)"""
+        rows = np.searchsorted(self.feature_ids, batch.features)
+        rows = np.minimum(rows, len(self.feature_ids) - 1)
+        known = self.feature_ids[rows] == batch.features
+        idf = np.where(known, self.idf[rows], self.unseen_idf)
+        values = (1 + np.log(batch.counts)) * idf
+        return rows, known, values
+
+    def decision_function(self, texts: Sequence[str]) -> np.ndarray:
+        """Class scores (before softmax), shape (len(texts), len(classes))"""
+        batch = vectorize(texts, self.n_bits)
+        scores = np.zeros((len(texts), len(self.classes)), dtype=np.float32)
+        if not len(batch.docs):
+            return scores + self.bias
+        rows, known, values = self._rows(batch)
+        norms = np.sqrt(np.bincount(batch.docs, weights=values * values, minlength=len(texts)))
+        norms[norms == 0] = 1
+        docs, rows, values = batch.docs[known], rows[known], values[known]
+        # One pass per class over the occurrences; bincount sums them per message in C
+        weights = np.asarray(self.weights[rows], dtype=np.float32)
+        for column in range(len(self.classes)):
+            scores[:, column] = np.bincount(docs, weights=values * weights[:, column], minlength=len(texts))
+        return scores / norms[:, None].astype(np.float32) + self.bias
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        scores = self.decision_function(texts)
+        scores -= scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        scores /= scores.sum(axis=1, keepdims=True)
+        return scores
+
+    def predict(self, texts: Sequence[str]) -> List[Tuple[str, float]]:
+        """(intent, probability) of the most likely class for each message"""
+        if not texts:
+            return []
+        probabilities = self.predict_proba(texts)
+        best = probabilities.argmax(axis=1)
+        return [(self.classes[index], float(probabilities[row, index])) for row, index in enumerate(best)]
+
+    def save(self, path: str) -> None:
+        arrays = {
+            "feature_ids": self.feature_ids.astype("<i8"),
+            "idf": self.idf.astype("<f4"),
+            "weights": self.weights.astype("<f2"),
+            "bias": self.bias.astype("<f4"),
+        }
+        header = {"classes": self.classes, "n_bits": self.n_bits, "unseen_idf": self.unseen_idf, "arrays": {}}
+        # Offsets depend on the header's own length; two passes settle it
+        for _ in range(2):
+            offset = len(MAGIC) + 4 + len(json.dumps(header).encode())
+            for name, array in arrays.items():
+                offset += -offset % _ALIGN
+                header["arrays"][name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+                offset += array.nbytes
+        encoded = json.dumps(header).encode()
+        with open(path, "wb") as f:
+            f.write(MAGIC + len(encoded).to_bytes(4, "little") + encoded)
+            for name, array in arrays.items():
+                f.write(b"\0" * (header["arrays"][name]["offset"] - f.tell()))
+                f.write(array.tobytes())
+
+    @classmethod
+    def load(cls, path: str) -> "IntentModel":
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not an intent model file")
+            header = json.loads(f.read(int.from_bytes(f.read(4), "little")))
+        arrays = {
+            name: np.memmap(path, dtype=np.dtype(spec["dtype"]), mode="r", offset=spec["offset"],
+                            shape=tuple(spec["shape"]))
+            for name, spec in header["arrays"].items()
+        }
+        return cls(header["classes"], header["n_bits"], arrays["feature_ids"], arrays["idf"],
+                   arrays["weights"], arrays["bias"], header["unseen_idf"])
+
+    def stats(self) -> Dict:
+        return {"classes": self.classes, "features": len(self.feature_ids), "n_bits": self.n_bits}
+
+
+def train(texts: Sequence[str], labels: Sequence[str], n_bits: int = 18, epochs: int = 300,
+          learning_rate: float = 0.1, l2: float = 1e-4) -> IntentModel:
+    """Fit softmax regression with Adam on full-batch gradients"""
+    classes = sorted(set(labels))
+    batch = vectorize(texts, n_bits)
+    feature_ids, columns = np.unique(batch.features, return_inverse=True)
+    documents = len(texts)
+    df = np.bincount(columns, minlength=len(feature_ids))
+    idf = (np.log((1 + documents) / (1 + df)) + 1).astype(np.float32)
+    unseen_idf = float(math.log(1 + documents) + 1)
+
+    values = (1 + np.log(batch.counts)) * idf[columns]
+    norms = np.sqrt(np.bincount(batch.docs, weights=values * values, minlength=documents))
+    norms[norms == 0] = 1
+    values = values / norms[batch.docs]
+    targets = np.zeros((documents, len(classes)))
+    targets[np.arange(documents), [classes.index(label) for label in labels]] = 1
+
+    weights = np.zeros((len(feature_ids), len(classes)))
+    bias = np.zeros(len(classes))
+    moments = [np.zeros_like(weights), np.zeros_like(weights), np.zeros_like(bias), np.zeros_like(bias)]
+    beta1, beta2, eps = 0.9, 0.999, 1e-8
+    for step in range(1, epochs + 1):
+        scores = np.stack([np.bincount(batch.docs, weights=values * weights[columns, c], minlength=documents)
+                           for c in range(len(classes))], axis=1) + bias
+        scores -= scores.max(axis=1, keepdims=True)
+        probabilities = np.exp(scores)
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        residual = (probabilities - targets) / documents
+        grad_weights = np.stack([np.bincount(columns, weights=values * residual[batch.docs, c],
+                                             minlength=len(feature_ids)) for c in range(len(classes))], axis=1)
+        grad_weights += l2 * weights
+        grad_bias = residual.sum(axis=0)
+        for parameter, grad, first, second in ((weights, grad_weights, moments[0], moments[1]),
+                                               (bias, grad_bias, moments[2], moments[3])):
+            first *= beta1
+            first += (1 - beta1) * grad
+            second *= beta2
+            second += (1 - beta2) * grad * grad
+            parameter -= learning_rate * (first / (1 - beta1 ** step)) / (np.sqrt(second / (1 - beta2 ** step)) + eps)
+    return IntentModel(classes, n_bits, feature_ids.astype(np.int64), idf, weights.astype(np.float32),
+                       bias.astype(np.float32), unseen_idf)
+
+
+def read_examples(path: str) -> Iterable[Tuple[str, str]]:
+    """(message, intent) pairs from a JSON-lines file of {"message": ..., "intent": ...}"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield record["message"], record["intent"]
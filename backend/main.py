@@ -1,22 +1,36 @@
-from fastapi import FastAPI, Depends, HTTPException, Request, status
+from fastapi import FastAPI, Depends, File, HTTPException, Query, Request, Response, UploadFile, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from typing import Dict, List, Optional
 import database as db
 from pydantic import BaseModel, EmailStr
 from datetime import datetime, timedelta
 import auth
-from auth import get_current_user
+from auth import get_current_user, get_current_admin
 import seed_data
 from config import settings
 import logging
 import traceback
 import re
-import random
-from chatbot_knowledge import get_detailed_response
-from advanced_chatbot import advanced_chatbot
+from advanced_chatbot import close_advanced_chatbot, get_advanced_chatbot, set_chatbot_answers
+from chatbot_answers import ChatbotAnswers
+from cache import TTLCache
+from search_index import SearchService, create_index
+from scholarship_matching import ScholarshipIndex
+from timeline_index import LATEST, TimelineIndex, iter_ics
+from aptitude_quiz import get_quiz_engine
+from rate_limit import RateLimitMiddleware, create_rate_limiter
+import user_import
+import csv
+import hashlib
+import heapq
+import itertools
+import json
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -45,13 +59,30 @@ app = FastAPI(
             "name": "scholarships",
             "description": "Scholarship information operations",
         },
+        {
+            "name": "timeline",
+            "description": "Admission, exam and scholarship deadlines",
+        },
         {
             "name": "quiz",
             "description": "Quiz and assessment operations",
         },
+        {
+            "name": "search",
+            "description": "Full-text search over colleges, courses and scholarships",
+        },
+        {
+            "name": "admin",
+            "description": "Operational statistics for administrators",
+        },
     ]
 )
 
+# Rate limiting runs inside CORS, so 429 responses still carry CORS headers
+rate_limiter = create_rate_limiter(settings)
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -59,6 +90,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "Retry-After"],
 )
 
 # Global exception handler
@@ -73,25 +105,31 @@ async def global_exception_handler(request: Request, exc: Exception):
 # Initialize database and seed data on startup
 @app.on_event("startup")
 def startup_db_client():
-    db.Base.metadata.create_all(bind=db.engine)
+    if settings.SCHEMA_AUTO_MIGRATE:
+        if db.migrate():
+            logger.info("Database schema created or updated")
+    elif not db.schema_is_current():
+        logger.warning("Database schema is out of date; run `python migrate.py`")
     session = db.SessionLocal()
     try:
         seed_data.seed_database(session)
         logger.info("Database initialized with seed data!")
+        documents = search_service.rebuild(session)
+        logger.info(f"Search index built with {documents} documents ({search_service.index.name})")
+        scholarship_index.rebuild(session)
+        timeline_index.rebuild(session)
+        chatbot_answers.rebuild(session)
     finally:
         session.close()
+    auth.password_hasher.start()
 
-# Dependency to get the database session
-def get_db():
-    db_session = db.SessionLocal()
-    try:
-        yield db_session
-    except Exception as e:
-        logger.error(f"Database error: {str(e)}")
-        db_session.rollback()
-        raise HTTPException(status_code=500, detail="Database connection error")
-    finally:
-        db_session.close()
+@app.on_event("shutdown")
+def shutdown_chatbot():
+    close_advanced_chatbot()
+    auth.password_hasher.close()
+
+# Dependency to get the database session (the same one auth.get_current_user uses)
+get_db = db.get_db
 
 # Pydantic models for API
 class Token(BaseModel):
@@ -105,7 +143,6 @@ class UserCreate(BaseModel):
     full_name: str
     district: Optional[str] = None
     education_level: Optional[str] = None
-    role: str = "student"
 
 class UserResponse(BaseModel):
     id: int
@@ -136,11 +173,91 @@ class College(CollegeBase):
     class Config:
         from_attributes = True
 
+class Course(BaseModel):
+    id: int
+    name: str
+    description: Optional[str] = None
+    duration: Optional[str] = None
+    eligibility: Optional[str] = None
+    
+    class Config:
+        from_attributes = True
+
+class CollegeWithCourses(College):
+    courses: List[Course] = []
+
+class Scholarship(BaseModel):
+    id: int
+    name: str
+    provider: Optional[str] = None
+    eligibility: Optional[str] = None
+    amount: Optional[float] = None
+    deadline: Optional[datetime] = None
+    website: Optional[str] = None
+    description: Optional[str] = None
+    
+    class Config:
+        from_attributes = True
+
+class ScholarshipMatchResponse(BaseModel):
+    criteria: dict
+    results: List[Scholarship]
+
+class TimelineEvent(BaseModel):
+    id: int
+    title: Optional[str] = None
+    event_type: Optional[str] = None
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+    description: Optional[str] = None
+    url: Optional[str] = None
+
+class TimelineFeedItem(TimelineEvent):
+    source: str  # timeline or scholarship
+
+class QuizSubmission(BaseModel):
+    user_id: Optional[str] = None
+    answers: Dict[str, str]  # question id -> option id
+
+class CareerRecommendation(BaseModel):
+    career: str
+    category: str
+    description: str
+    score: float
+
+class QuizResult(BaseModel):
+    traits: Dict[str, float]
+    top_areas: List[str]
+    recommendations: List[CareerRecommendation]
+
+class QuizBatchRequest(BaseModel):
+    students: List[QuizSubmission]
+
+class QuizBatchResponse(BaseModel):
+    results: List[QuizResult]
+
+class SearchHit(BaseModel):
+    kind: str
+    id: int
+    title: str
+    score: float
+
+class SearchResponse(BaseModel):
+    query: str
+    results: List[SearchHit]
+    has_more: bool
+
 class ChatbotMessage(BaseModel):
     message: str
     conversation_history: Optional[List[dict]] = []
     user_id: Optional[str] = "default"
 
+class ChatEntity(BaseModel):
+    start: int
+    end: int
+    kind: str  # district, college or course
+    value: str
+
 class ChatbotResponse(BaseModel):
     response: str
     intent: str
@@ -148,9 +265,16 @@ class ChatbotResponse(BaseModel):
     emotion: Optional[str] = "neutral"
     context_aware: Optional[bool] = False
     suggestions: Optional[List[str]] = []
+    entities: List[ChatEntity] = []
+
+class ChatbotBatchRequest(BaseModel):
+    messages: List[ChatbotMessage]
+
+class ChatbotBatchResponse(BaseModel):
+    results: List[ChatbotResponse]
 
 @app.get("/")
-def read_root():
+async def read_root():
     return {
         "message": "Welcome to Digital Career Advisor API for J&K Students",
         "version": settings.VERSION,
@@ -158,10 +282,19 @@ def read_root():
     }
 
 # Authentication endpoints
+# Password hashing runs in auth.password_hasher's process pool, so these two
+# routes are async: waiting for a hash holds neither a thread nor the loop
+def hasher_busy(exc: auth.HasherBusy) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many sign-ins right now, please retry shortly",
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
 @app.post("/api/token", response_model=Token, tags=["auth"])
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db_session: Session = Depends(get_db)):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db_session: Session = Depends(get_db)):
     try:
-        user = auth.authenticate_user(db_session, form_data.username, form_data.password)
+        user = await auth.authenticate_user(db_session, form_data.username, form_data.password)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -173,14 +306,18 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db_
             data={"sub": user.username}, expires_delta=access_token_expires
         )
         return {"access_token": access_token, "token_type": "bearer"}
+    except auth.HasherBusy as e:
+        raise hasher_busy(e)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Login error: {str(e)}")
         raise HTTPException(status_code=500, detail="Login failed")
 
 # User endpoints
 @app.post("/api/users/", response_model=UserResponse, status_code=status.HTTP_201_CREATED, tags=["users"])
-def create_user(user: UserCreate, db_session: Session = Depends(get_db)):
-    try:
+async def create_user(user: UserCreate, db_session: Session = Depends(get_db)):
+    def check_available():
         db_user = db_session.query(db.User).filter(db.User.username == user.username).first()
         if db_user:
             raise HTTPException(status_code=400, detail="Username already registered")
@@ -188,8 +325,9 @@ def create_user(user: UserCreate, db_session: Session = Depends(get_db)):
         db_email = db_session.query(db.User).filter(db.User.email == user.email).first()
         if db_email:
             raise HTTPException(status_code=400, detail="Email already registered")
-        
-        hashed_password = auth.get_password_hash(user.password)
+        db_session.close()  # don't hold a pooled connection while the password hashes
+
+    def insert(hashed_password):
         new_user = db.User(
             username=user.username,
             email=user.email,
@@ -197,189 +335,522 @@ def create_user(user: UserCreate, db_session: Session = Depends(get_db)):
             full_name=user.full_name,
             district=user.district,
             education_level=user.education_level,
-            role=user.role
+            role="student"  # admins are promoted out of band, never self-registered
         )
         db_session.add(new_user)
         db_session.commit()
         db_session.refresh(new_user)
         return new_user
+
+    try:
+        await run_in_threadpool(check_available)
+        hashed_password = await auth.password_hasher.hash(user.password)
+        return await run_in_threadpool(insert, hashed_password)
+    except auth.HasherBusy as e:
+        raise hasher_busy(e)
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"User creation error: {str(e)}")
-        db_session.rollback()
+        await run_in_threadpool(db_session.rollback)
         raise HTTPException(status_code=500, detail="User creation failed")
 
+class UserImportRow(BaseModel):
+    row: int
+    username: Optional[str] = None
+    status: str
+    detail: Optional[str] = None
+
+class UserImportReport(BaseModel):
+    created: int
+    duplicates: int
+    invalid: int
+    rows: List[UserImportRow]
+
+@app.post("/api/users/import", response_model=UserImportReport, tags=["users"])
+async def import_users(
+    file: UploadFile = File(..., description="CSV with a header row, or NDJSON, of UserCreate fields"),
+    format: Optional[str] = Query(None, description="csv or ndjson; detected from the file name by default"),
+    admin: db.User = Depends(get_current_admin),
+    db_session: Session = Depends(get_db),
+):
+    """Create many users from one upload, reporting the outcome of every row"""
+    fmt = format or user_import.detect_format(file.filename, file.content_type)
+    if fmt not in user_import.FORMATS:
+        raise HTTPException(status_code=400, detail="Upload a .csv or .ndjson file, or pass format=csv|ndjson")
+    if file.size is not None and file.size > settings.MAX_FILE_SIZE:
+        raise HTTPException(status_code=413, detail=f"File exceeds {settings.MAX_FILE_SIZE} bytes")
+    records = user_import.iter_records(file.file, fmt, settings.MAX_FILE_SIZE)
+    try:
+        report = await user_import.import_users(
+            db_session, user_import.iter_chunks(records, settings.USER_IMPORT_CHUNK_SIZE), UserCreate,
+            auth.password_hasher)
+    except user_import.FileTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse the file: {e}")
+    statuses = [row.status for row in report]
+    return {
+        "created": statuses.count("created"),
+        "duplicates": statuses.count("duplicate"),
+        "invalid": statuses.count("invalid"),
+        "rows": [row._asdict() for row in report],
+    }
+
 @app.get("/api/users/me", response_model=UserResponse, tags=["users"])
 def read_users_me(current_user: db.User = Depends(get_current_user), db_session: Session = Depends(get_db)):
     return current_user
 
+# College listing: serialized pages are cached per query, invalidated whenever
+# a college or course is written here and expired after a TTL for writes made
+# by other workers
+COLLEGE_SUMMARY_COLUMNS = (db.College.id, db.College.name, db.College.district,
+                           db.College.address, db.College.website, db.College.contact)
+COLLEGE_FULL_COLUMNS = COLLEGE_SUMMARY_COLUMNS + (db.College.description, db.College.facilities)
+
+college_cache = TTLCache(maxsize=settings.COLLEGE_CACHE_SIZE, ttl=settings.COLLEGE_CACHE_TTL_SECONDS)
+db.watch_changes([db.College, db.Course], lambda changes: college_cache.invalidate())
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
 @app.get("/api/colleges/", response_model=List[College], tags=["colleges"])
-def get_colleges(db_session: Session = Depends(get_db)):
+async def get_colleges(
+    request: Request,
+    district: Optional[str] = None,
+    name_prefix: Optional[str] = None,
+    course: Optional[str] = Query(None, description="Only colleges offering a course whose name contains this text"),
+    after: Optional[int] = Query(None, description="Keyset cursor: return colleges with a larger id"),
+    limit: int = Query(100, ge=1, le=500),
+    fields: str = Query("full", pattern="^(full|summary)$", description="summary omits description and facilities"),
+    db_session: AsyncSession = Depends(db.get_async_db)
+):
+    """List colleges ordered by id, one page at a time.
+
+    The next page's cursor is returned in the X-Next-Cursor header. Responses
+    carry an ETag, so a client repeating a request with If-None-Match gets a
+    304 until the page's content changes.
+    """
+    key = (district, name_prefix, course, after, limit, fields)
+    version = college_cache.version
+    cached = college_cache.get((version, key))
+    if cached is None:
+        try:
+            columns = COLLEGE_SUMMARY_COLUMNS if fields == "summary" else COLLEGE_FULL_COLUMNS
+            query = select(*columns).order_by(db.College.id).limit(limit)
+            if after is not None:
+                query = query.where(db.College.id > after)
+            if district:
+                query = query.where(db.College.district == district)
+            if name_prefix:
+                query = query.where(db.College.name.like(_escape_like(name_prefix) + "%", escape="\\"))
+            if course:
+                query = query.where(db.College.courses.any(
+                    db.Course.name.ilike("%" + _escape_like(course) + "%", escape="\\")
+                ))
+            result = await db_session.execute(query)
+            rows = [dict(row._mapping) for row in result]
+        except Exception as e:
+            logger.error(f"Colleges fetch error: {str(e)}")
+            raise HTTPException(status_code=500, detail="Failed to fetch colleges")
+        
+        next_cursor = str(rows[-1]["id"]) if len(rows) == limit else None
+        body = json.dumps(rows).encode()
+        # A hash of the content, not the cache version: that restarts at 0 and
+        # differs per worker, so it could validate a stale copy
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()[:20]
+        cached = (body, next_cursor, etag)
+        college_cache.set((version, key), cached)
+    
+    body, next_cursor, etag = cached
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = next_cursor
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# Courses are loaded with one extra SELECT ... WHERE college_id IN (...) per
+# page (selectinload), never one query per college
+@app.get("/api/colleges/with-courses", response_model=List[CollegeWithCourses], tags=["colleges"])
+async def get_colleges_with_courses(
+    response: Response,
+    district: Optional[str] = None,
+    after: Optional[int] = Query(None, description="Keyset cursor: return colleges with a larger id"),
+    limit: int = Query(50, ge=1, le=200),
+    db_session: AsyncSession = Depends(db.get_async_db)
+):
+    """List colleges with their courses, ordered by id; paginated like /api/colleges/"""
+    query = select(db.College).options(selectinload(db.College.courses)).order_by(db.College.id).limit(limit)
+    if after is not None:
+        query = query.where(db.College.id > after)
+    if district:
+        query = query.where(db.College.district == district)
     try:
-        colleges = db_session.query(db.College).all()
-        return colleges
+        colleges = (await db_session.scalars(query)).all()
     except Exception as e:
         logger.error(f"Colleges fetch error: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch colleges")
+    
+    if len(colleges) == limit:
+        response.headers["X-Next-Cursor"] = str(colleges[-1].id)
+    return colleges
 
-@app.get("/api/colleges/{college_id}", response_model=College)
-def get_college(college_id: int, db_session: Session = Depends(get_db)):
-    college = db_session.query(db.College).filter(db.College.id == college_id).first()
+@app.get("/api/colleges/{college_id}", response_model=CollegeWithCourses, tags=["colleges"])
+async def get_college(college_id: int, db_session: AsyncSession = Depends(db.get_async_db)):
+    college = await db_session.get(db.College, college_id, options=[selectinload(db.College.courses)])
     if college is None:
         raise HTTPException(status_code=404, detail="College not found")
     return college
 
-# Chatbot knowledge base
-CHATBOT_KNOWLEDGE = {
-    "greeting": [
-        "Hello! I'm your AI assistant for the Digital Career Advisor platform. How can I help you today?",
-        "Hi there! I'm here to help you with career guidance, college information, scholarships, and more. What would you like to know?",
-        "Welcome! I can assist you with finding colleges, scholarships, career advice, and educational opportunities. What can I help you with?"
-    ],
-    "colleges": {
-        "keywords": ["college", "university", "institution", "admission", "courses", "degree", "engineering", "medical", "arts"],
-        "responses": [
-            "We have information about various colleges and universities across Jammu & Kashmir. You can find details about admission processes, courses offered, facilities, and contact information. Would you like to know about colleges in a specific district?",
-            "Our platform provides comprehensive information about colleges including admission requirements, course offerings, and campus facilities. What type of course or college are you interested in?",
-            "I can help you find colleges based on your interests, location preferences, or career goals. What field of study interests you most?"
-        ]
-    },
-    "scholarships": {
-        "keywords": ["scholarship", "financial aid", "funding", "grant", "money", "financial assistance", "tuition"],
-        "responses": [
-            "We have a comprehensive database of scholarships available for J&K students. These include government scholarships, private funding, and merit-based awards. What type of scholarship are you looking for?",
-            "There are many scholarship opportunities for students from Jammu & Kashmir. I can help you find scholarships based on your academic performance, financial need, or specific criteria. What's your current education level?",
-            "Our scholarship database includes various funding options for different courses and levels of study. Are you looking for undergraduate, postgraduate, or research scholarships?"
-        ]
-    },
-    "career_guidance": {
-        "keywords": ["career", "job", "profession", "aptitude", "quiz", "guidance", "counseling", "future"],
-        "responses": [
-            "I can help you with career guidance through our comprehensive aptitude test. This will help you discover your strengths and find the perfect career match. Would you like to take the career quiz?",
-            "Our career guidance system uses advanced assessment tools to help you find the right career path. The quiz covers various aspects like interests, skills, and personality traits. Ready to explore your career options?",
-            "Career planning is crucial for your future success. Our platform offers personalized career recommendations based on your interests and abilities. Let's start with a career assessment!"
-        ]
-    },
-    "general_info": {
-        "keywords": ["help", "information", "about", "what", "how", "platform", "website"],
-        "responses": [
-            "Digital Career Advisor is a comprehensive platform designed specifically for Jammu & Kashmir students. We provide career guidance, college information, scholarship opportunities, and educational resources to help you succeed in your academic and professional journey.",
-            "Our platform offers four main services: Career Aptitude Testing, College Explorer, Scholarship Finder, and Educational Timeline Planning. Each service is tailored to help J&K students make informed decisions about their future.",
-            "We're here to support students from Jammu & Kashmir with all aspects of their educational journey. From choosing the right career path to finding funding opportunities, we've got you covered!"
-        ]
-    }
-}
+# Scholarships: eligibility is parsed into an inverted index at write time
+scholarship_index = ScholarshipIndex()
+db.watch_changes([db.Scholarship], scholarship_index.apply_changes)
 
-def detect_intent(message: str) -> tuple:
-    """Detect the intent of the user's message"""
-    message_lower = message.lower()
-    
-    # Check for greeting
-    greeting_words = ["hello", "hi", "hey", "good morning", "good afternoon", "good evening"]
-    if any(word in message_lower for word in greeting_words):
-        return "greeting", 0.9
-    
-    # Check for college-related queries
-    college_score = sum(1 for keyword in CHATBOT_KNOWLEDGE["colleges"]["keywords"] if keyword in message_lower)
-    if college_score > 0:
-        return "colleges", min(0.8, college_score * 0.2)
-    
-    # Check for scholarship-related queries
-    scholarship_score = sum(1 for keyword in CHATBOT_KNOWLEDGE["scholarships"]["keywords"] if keyword in message_lower)
-    if scholarship_score > 0:
-        return "scholarships", min(0.8, scholarship_score * 0.2)
-    
-    # Check for career guidance queries
-    career_score = sum(1 for keyword in CHATBOT_KNOWLEDGE["career_guidance"]["keywords"] if keyword in message_lower)
-    if career_score > 0:
-        return "career_guidance", min(0.8, career_score * 0.2)
-    
-    # Default to general info
-    return "general_info", 0.5
-
-def generate_response(intent: str, confidence: float, message: str) -> str:
-    """Generate appropriate response based on intent"""
-    # Try to get detailed response first
-    detailed_response = get_detailed_response(intent, message)
-    if detailed_response:
-        return detailed_response
-    
-    # Fallback to basic responses
-    if intent == "greeting":
-        return random.choice(CHATBOT_KNOWLEDGE["greeting"])
-    
-    elif intent == "colleges":
-        response = random.choice(CHATBOT_KNOWLEDGE["colleges"]["responses"])
-        # Add specific college information if mentioned
-        if any(district in message.lower() for district in ["jammu", "srinagar", "kashmir"]):
-            response += " I can provide specific information about colleges in the districts you mentioned."
-        return response
-    
-    elif intent == "scholarships":
-        return random.choice(CHATBOT_KNOWLEDGE["scholarships"]["responses"])
+@app.get("/api/scholarships/", response_model=List[Scholarship], tags=["scholarships"])
+async def get_scholarships(
+    response: Response,
+    after: Optional[int] = Query(None, description="Keyset cursor: return scholarships with a larger id"),
+    limit: int = Query(100, ge=1, le=500),
+    db_session: AsyncSession = Depends(db.get_async_db)
+):
+    """List scholarships ordered by id; the next page's cursor is in X-Next-Cursor"""
+    query = select(db.Scholarship).order_by(db.Scholarship.id).limit(limit)
+    if after is not None:
+        query = query.where(db.Scholarship.id > after)
+    scholarships = (await db_session.scalars(query)).all()
+    if len(scholarships) == limit:
+        response.headers["X-Next-Cursor"] = str(scholarships[-1].id)
+    return scholarships
+
+@app.get("/api/scholarships/match", response_model=ScholarshipMatchResponse, tags=["scholarships"])
+async def match_scholarships(
+    user: Optional[str] = Query(None, description="Admins only: match this username's profile instead of their own"),
+    education_level: Optional[str] = None,
+    district: Optional[str] = None,
+    stream: Optional[str] = Query(None, description="science, commerce or arts"),
+    income: Optional[float] = Query(None, ge=0, description="Annual family income in rupees"),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: db.User = Depends(get_current_user),
+    db_session: AsyncSession = Depends(db.get_async_db)
+):
+    """Open scholarships the caller is eligible for, by amount then deadline.
+
+    District and education level come from the caller's profile unless
+    given explicitly; criteria that are not known are not used to filter.
+    """
+    profile = current_user
+    if user is not None and user != current_user.username:
+        if current_user.role != "admin":
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin privileges required")
+        profile = await db_session.scalar(select(db.User).where(db.User.username == user))
+        if profile is None:
+            raise HTTPException(status_code=404, detail="User not found")
+    education_level = education_level or profile.education_level
+    district = district or profile.district
     
-    elif intent == "career_guidance":
-        return random.choice(CHATBOT_KNOWLEDGE["career_guidance"]["responses"])
+    results = scholarship_index.match(education_level, district, stream, income, limit=limit)
+    criteria = {"education_level": education_level, "district": district, "stream": stream, "income": income}
+    return {"criteria": criteria, "results": results}
+
+@app.get("/api/scholarships/{scholarship_id}", response_model=Scholarship, tags=["scholarships"])
+async def get_scholarship(scholarship_id: int, db_session: AsyncSession = Depends(db.get_async_db)):
+    scholarship = await db_session.get(db.Scholarship, scholarship_id)
+    if scholarship is None:
+        raise HTTPException(status_code=404, detail="Scholarship not found")
+    return scholarship
+
+# Timeline: events sorted by closing date, updated from committed changes
+timeline_index = TimelineIndex()
+db.watch_changes([db.Timeline], timeline_index.apply_changes)
+
+@app.get("/api/timeline/events", response_model=List[TimelineEvent], tags=["timeline"])
+async def get_timeline_events(
+    start: Optional[datetime] = Query(None, description="Range start; defaults to now"),
+    end: Optional[datetime] = Query(None, description="Range end; open-ended if omitted"),
+    event_type: Optional[str] = Query(None, description="admission, exam, scholarship, ..."),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """Events open at any point between start and end, soonest closing first"""
+    start = start or datetime.utcnow()
+    if end is not None and end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    return [event._asdict() for event in timeline_index.overlapping(start, end, event_type, limit)]
+
+@app.get("/api/timeline/events.ics", tags=["timeline"])
+async def export_timeline_events(
+    start: Optional[datetime] = Query(None, description="Range start; defaults to now"),
+    end: Optional[datetime] = Query(None, description="Range end; open-ended if omitted"),
+    event_type: Optional[str] = None,
+):
+    """The same events as /api/timeline/events, streamed as an iCalendar file"""
+    events = timeline_index.overlapping(start or datetime.utcnow(), end, event_type)
+    name = f"{settings.PROJECT_NAME} {event_type or 'timeline'}"
+    return StreamingResponse(
+        iter_ics(events, name),
+        media_type="text/calendar; charset=utf-8",
+        headers={"Content-Disposition": 'attachment; filename="timeline.ics"'},
+    )
+
+@app.get("/api/timeline/closing", response_model=List[TimelineEvent], tags=["timeline"])
+async def get_closing_events(
+    days: int = Query(7, ge=0, le=366),
+    event_type: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """Events whose end date is within the next `days` days, soonest first"""
+    return [event._asdict() for event in timeline_index.closing_within(days, event_type=event_type, limit=limit)]
+
+@app.get("/api/timeline/me", response_model=List[TimelineFeedItem], tags=["timeline"])
+def get_my_timeline(
+    days: int = Query(30, ge=1, le=366),
+    limit: int = Query(50, ge=1, le=500),
+    current_user: db.User = Depends(get_current_user),
+):
+    """Upcoming events plus deadlines of scholarships matching the user's profile, soonest first"""
+    now = datetime.utcnow()
+    until = now + timedelta(days=days)
+    events = (dict(event._asdict(), source="timeline") for event in timeline_index.overlapping(now, until))
+    deadlines = sorted(
+        (
+            {"id": row["id"], "title": row["name"], "event_type": "scholarship", "start_date": None,
+             "end_date": row["deadline"], "description": row.get("description"), "url": row.get("website"),
+             "source": "scholarship"}
+            for row in scholarship_index.match(current_user.education_level, current_user.district,
+                                               limit=None, now=now)
+            if row.get("deadline") is not None and row["deadline"] <= until
+        ),
+        key=lambda item: (item["end_date"], item["id"]),
+    )
+    feed = heapq.merge(events, deadlines, key=lambda item: item["end_date"] or LATEST)
+    return list(itertools.islice(feed, limit))
+
+# Aptitude quiz: questions are served from memory, answers scored in NumPy
+async def store_aptitude_results(submissions: List[QuizSubmission], results: List[Dict]) -> None:
+    if settings.QUIZ_RESULTS_BACKEND != "mongo":
+        return
+    documents = [
+        {"user_id": submission.user_id, "answers": submission.answers, "created_at": datetime.utcnow(), **result}
+        for submission, result in zip(submissions, results)
+    ]
+    try:
+        await db.aptitude_results_collection.insert_many(documents, ordered=False)
+    except Exception as e:
+        logger.error(f"Aptitude results write error: {str(e)}")
+
+@app.get("/api/quiz/questions", tags=["quiz"])
+async def get_quiz_questions():
+    """The aptitude quiz; each question's options map onto the five aptitude areas"""
+    return Response(content=get_quiz_engine().questions_json, media_type="application/json")
+
+@app.post("/api/quiz/results", response_model=QuizResult, tags=["quiz"])
+async def submit_quiz_results(submission: QuizSubmission, top_k: int = Query(5, ge=1, le=20)):
+    """Aptitude area scores (0-1) and the careers whose profiles match them best"""
+    engine = get_quiz_engine()
+    try:
+        if engine.blocking:
+            result = await run_in_threadpool(engine.score, submission.answers, top_k)
+        else:
+            result = engine.score(submission.answers, top_k)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await store_aptitude_results([submission], [result])
+    return result
+
+@app.post("/api/quiz/results/batch", response_model=QuizBatchResponse, tags=["quiz"])
+async def submit_quiz_results_batch(batch: QuizBatchRequest, top_k: int = Query(5, ge=1, le=20)):
+    """Score a whole class or school in one vectorized pass; results are in request order"""
+    if len(batch.students) > settings.QUIZ_MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.QUIZ_MAX_BATCH_SIZE} students per batch",
+        )
+    answers = [submission.answers for submission in batch.students]
+    try:
+        results = await run_in_threadpool(get_quiz_engine().score_batch, answers, top_k)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await store_aptitude_results(batch.students, results)
+    return {"results": results}
+
+# Full-text search: built at startup, then updated from committed changes
+search_service = SearchService(create_index(settings.SEARCH_BACKEND))
+db.watch_changes([db.College, db.Course, db.Scholarship], search_service.apply_changes)
+
+@app.get("/api/search", response_model=SearchResponse, tags=["search"])
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    type: Optional[List[str]] = Query(None, description="Restrict to college, course and/or scholarship"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+):
+    """Rank colleges, courses and scholarships by relevance to `q` (BM25)"""
+    kinds = set(type or ())
+    unknown = kinds - {"college", "course", "scholarship"}
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown search type: {', '.join(sorted(unknown))}")
+    if offset + limit > settings.SEARCH_MAX_RESULTS:
+        raise HTTPException(status_code=400, detail=f"Search results are limited to the first {settings.SEARCH_MAX_RESULTS}")
+    hits, has_more = search_service.search(q, kinds, limit, offset)
+    return {"query": q, "results": [hit._asdict() for hit in hits], "has_more": has_more}
+
+# Chatbot: questions naming a district, course or scholarship audience are
+# answered from the database, with results cached until the rows change
+chatbot_answers = ChatbotAnswers(db.SessionLocal, scholarship_index, cache_size=settings.CHATBOT_ANSWER_CACHE_SIZE,
+                                 ttl=settings.CHATBOT_ANSWER_CACHE_TTL_SECONDS, limit=settings.CHATBOT_ANSWER_LIMIT)
+db.watch_changes([db.College, db.Course, db.Scholarship], chatbot_answers.apply_changes)
+if settings.CHATBOT_DYNAMIC_ANSWERS:
+    set_chatbot_answers(chatbot_answers)
+
+EMPTY_MESSAGE_RESPONSE = ChatbotResponse(
+    response="I'm here to help! Please ask me about colleges, scholarships, career guidance, or any other educational topics.",
+    intent="general_info",
+    confidence=0.5,
+    emotion="neutral",
+    context_aware=False
+)
+
+ERROR_RESPONSE = ChatbotResponse(
+    response="I apologize, but I'm experiencing some technical difficulties. Please try again in a moment.",
+    intent="error",
+    confidence=0.0,
+    emotion="neutral",
+    context_aware=False
+)
+
+def build_chatbot_response(result: dict) -> ChatbotResponse:
+    """Wrap an AdvancedChatbot result with intent-specific suggestions"""
+    suggestions = []
+    if result['intent'] == 'colleges':
+        suggestions = ["Tell me about admission requirements", "What courses are available?", "Show me colleges in my district"]
+    elif result['intent'] == 'scholarships':
+        suggestions = ["What are the eligibility criteria?", "When are the deadlines?", "How do I apply?"]
+    elif result['intent'] == 'career_guidance':
+        suggestions = ["Take the aptitude test", "What careers match my interests?", "How do I plan my future?"]
     
-    else:
-        return random.choice(CHATBOT_KNOWLEDGE["general_info"]["responses"])
+    return ChatbotResponse(
+        response=result['response'],
+        intent=result['intent'],
+        confidence=result['confidence'],
+        emotion=result['emotion'],
+        context_aware=result['context_aware'],
+        suggestions=suggestions,
+        entities=result.get('entities', [])
+    )
+
+async def run_chatbot(func, *args):
+    """Call into the chatbot inline, or on the threadpool when its stores do blocking I/O"""
+    if get_advanced_chatbot().blocking:
+        return await run_in_threadpool(func, *args)
+    return func(*args)
 
 @app.post("/api/chatbot", response_model=ChatbotResponse, tags=["chatbot"])
-def chatbot_response(chat_message: ChatbotMessage, db_session: Session = Depends(get_db)):
+async def chatbot_response(chat_message: ChatbotMessage):
     """Handle chatbot queries with advanced AI processing"""
     try:
         message = chat_message.message.strip()
         user_id = chat_message.user_id or "default"
         
         if not message:
-            return ChatbotResponse(
-                response="I'm here to help! Please ask me about colleges, scholarships, career guidance, or any other educational topics.",
-                intent="general_info",
-                confidence=0.5,
-                emotion="neutral",
-                context_aware=False
-            )
+            return EMPTY_MESSAGE_RESPONSE
         
         # Use advanced chatbot for processing
-        result = advanced_chatbot.get_personalized_response(user_id, message)
-        
-        # Add suggestions based on intent
-        suggestions = []
-        if result['intent'] == 'colleges':
-            suggestions = ["Tell me about admission requirements", "What courses are available?", "Show me colleges in my district"]
-        elif result['intent'] == 'scholarships':
-            suggestions = ["What are the eligibility criteria?", "When are the deadlines?", "How do I apply?"]
-        elif result['intent'] == 'career_guidance':
-            suggestions = ["Take the aptitude test", "What careers match my interests?", "How do I plan my future?"]
+        result = await run_chatbot(get_advanced_chatbot().get_personalized_response, user_id, message)
         
         logger.info(f"Advanced chatbot query: '{message}' -> Intent: {result['intent']}, Confidence: {result['confidence']}, Emotion: {result['emotion']}")
         
-        return ChatbotResponse(
-            response=result['response'],
-            intent=result['intent'],
-            confidence=result['confidence'],
-            emotion=result['emotion'],
-            context_aware=result['context_aware'],
-            suggestions=suggestions
-        )
+        return build_chatbot_response(result)
         
     except Exception as e:
         logger.error(f"Advanced chatbot error: {str(e)}")
-        return ChatbotResponse(
-            response="I apologize, but I'm experiencing some technical difficulties. Please try again in a moment.",
-            intent="error",
-            confidence=0.0,
-            emotion="neutral",
-            context_aware=False
+        return ERROR_RESPONSE
+
+def iter_batch_responses(messages: List[ChatbotMessage]):
+    """Yield a ChatbotResponse per message, in submission order"""
+    pairs = [(chat_message.user_id or "default", chat_message.message.strip()) for chat_message in messages]
+    results = get_advanced_chatbot().iter_personalized_responses(pair for pair in pairs if pair[1])
+    
+    for _, message in pairs:
+        if not message:
+            yield EMPTY_MESSAGE_RESPONSE
+            continue
+        result = next(results)
+        yield build_chatbot_response(result) if result is not None else ERROR_RESPONSE
+
+@app.post("/api/chatbot/batch", response_model=ChatbotBatchResponse, tags=["chatbot"])
+def chatbot_batch_response(batch: ChatbotBatchRequest, stream: bool = False):
+    """Handle many chatbot queries in one request.
+
+    Messages are processed in order, so consecutive turns from the same user
+    keep their conversation context. With `stream=true` results are sent as
+    NDJSON, one ChatbotResponse per line, as soon as each is produced.
+    """
+    if len(batch.messages) > settings.CHATBOT_MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch exceeds {settings.CHATBOT_MAX_BATCH_SIZE} messages"
         )
+    
+    logger.info(f"Advanced chatbot batch: {len(batch.messages)} messages, stream={stream}")
+    
+    if stream:
+        lines = (response.model_dump_json() + "\n" for response in iter_batch_responses(batch.messages))
+        return StreamingResponse(lines, media_type="application/x-ndjson")
+    
+    return ChatbotBatchResponse(results=list(iter_batch_responses(batch.messages)))
+
+@app.get("/api/chatbot/insights", tags=["chatbot"])
+async def get_users_insights(user_ids: str):
+    """Get insights for a comma-separated list of users in one call"""
+    ids = list(dict.fromkeys(user_id.strip() for user_id in user_ids.split(",") if user_id.strip()))
+    if len(ids) > settings.CHATBOT_MAX_INSIGHTS_USERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.CHATBOT_MAX_INSIGHTS_USERS} user ids per request"
+        )
+    try:
+        return await run_chatbot(get_advanced_chatbot().get_users_insights, ids)
+    except Exception as e:
+        logger.error(f"Insights error: {str(e)}")
+        return {"error": "Unable to retrieve insights"}
 
 @app.get("/api/chatbot/insights/{user_id}", tags=["chatbot"])
-def get_user_insights(user_id: str):
+async def get_user_insights(user_id: str):
     """Get user interaction insights and preferences"""
     try:
-        insights = advanced_chatbot.get_user_insights(user_id)
+        insights = await run_chatbot(get_advanced_chatbot().get_user_insights, user_id)
         return insights
     except Exception as e:
         logger.error(f"Insights error: {str(e)}")
         return {"error": "Unable to retrieve insights"}
+
+@app.get("/api/admin/quiz/cache", tags=["admin"])
+def get_quiz_cache_stats(admin: db.User = Depends(get_current_admin)):
+    """Report the career recommendation cache's hit, miss and eviction counters"""
+    return get_quiz_engine().stats()
+
+@app.get("/api/admin/db/pool", tags=["admin"])
+def get_database_pool_stats(admin: db.User = Depends(get_current_admin)):
+    """Report connection pool occupancy and connect/checkout/invalidation counters"""
+    return db.pool_stats()
+
+@app.get("/api/admin/auth/hasher", tags=["admin"])
+def get_password_hasher_stats(admin: db.User = Depends(get_current_admin)):
+    """Report the password hashing pool's backlog, rejections and rehashes"""
+    return auth.password_hasher.stats()
+
+@app.get("/api/admin/rate-limits", tags=["admin"])
+def get_rate_limit_stats(admin: db.User = Depends(get_current_admin)):
+    """Report allowed and rejected requests per rate limit rule and the bucket store's size"""
+    return rate_limiter.stats()
+
+@app.get("/api/admin/chatbot/state", tags=["admin"])
+def get_chatbot_state_stats(admin: db.User = Depends(get_current_admin)):
+    """Report the chatbot's per-user state store and conversation persistence metrics"""
+    return get_advanced_chatbot().stats()
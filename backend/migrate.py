@@ -0,0 +1,38 @@
+"""Create missing tables and columns and record the schema version.
+
+Columns the models gained are added to existing tables when existing rows
+can take them (nullable, or with a default). Other differences, such as
+a new NOT NULL or unique column or a column the models dropped, are
+listed and nothing is recorded; apply those by hand. Startup does this
+itself unless SCHEMA_AUTO_MIGRATE is off; then run it as a deploy step:
+    python migrate.py          # apply
+    python migrate.py --check  # exit 1 if the database needs migrating
+"""
+import argparse
+import sys
+
+import database as db
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--check", action="store_true", help="only report whether the schema is current")
+    args = parser.parse_args()
+    if args.check:
+        current = db.schema_is_current()
+        print(f"schema {db.schema_fingerprint()} is {'current' if current else 'not applied'}")
+        return 0 if current else 1
+    try:
+        applied = db.migrate()
+    except db.SchemaMismatch as e:
+        print("existing tables differ from the models in ways that need a manual ALTER; apply them, then rerun:",
+              file=sys.stderr)
+        for difference in e.differences:
+            print(f"  {difference}", file=sys.stderr)
+        return 1
+    print(f"schema {db.schema_fingerprint()} {'applied' if applied else 'already current'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
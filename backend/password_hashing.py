@@ -0,0 +1,187 @@
+import asyncio
+import functools
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from passlib.context import CryptContext
+
+
+@functools.lru_cache(maxsize=None)
+def crypt_context(rounds: int) -> CryptContext:
+    """bcrypt at `rounds`; a hash made at any other cost reports needs_update"""
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_desired_rounds=rounds,
+        bcrypt__max_desired_rounds=rounds,
+    )
+
+
+def _lower_priority() -> None:
+    # Under contention for cores the request-serving process wins
+    if hasattr(os, "nice"):
+        os.nice(10)
+
+
+# Run in the worker processes, so they take only picklable arguments
+def _hash(password: str, rounds: int) -> str:
+    return crypt_context(rounds).hash(password)
+
+
+def _hash_many(passwords: List[str], rounds: int) -> List[str]:
+    context = crypt_context(rounds)
+    return [context.hash(password) for password in passwords]
+
+
+def _verify_and_update(password: str, hashed_password: str, rounds: int) -> Tuple[bool, Optional[str]]:
+    return crypt_context(rounds).verify_and_update(password, hashed_password)
+
+
+class HasherBusy(Exception):
+    """Raised instead of queueing when the hasher's backlog is full"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"password hasher busy, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """bcrypt hashing off the event loop and off the request threadpool.
+
+    Hashes run in a pool of `workers` processes, so a burst of logins costs
+    those cores and nothing else: the threadpool stays free for unrelated
+    sync routes. At most `workers + max_queue` hashes are admitted at once;
+    past that, calls fail fast with `HasherBusy`, whose `retry_after` is the
+    recent time from admission to result, i.e. how long the backlog takes
+    to drain. With `workers=0` hashes run in the request threadpool instead
+    (the old behaviour, without processes). After `close`, calls raise
+    `HasherBusy` until `start` is called again.
+    """
+
+    def __init__(self, rounds: int = 12, workers: int = 2, max_queue: int = 32):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_queue = max_queue
+        self.context = crypt_context(rounds)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._latency = 0.25  # moving average in seconds, seeded with bcrypt's cost at 12 rounds
+        self._completed = 0
+        self._rejected = 0
+        self._rehashed = 0
+
+    @property
+    def capacity(self) -> int:
+        return max(self.workers, 1) + self.max_queue
+
+    def start(self) -> None:
+        """Spawn the worker processes now rather than on the first login"""
+        with self._lock:
+            self._closed = False
+            self._ensure_executor()
+
+    def _ensure_executor(self) -> None:
+        # Called with the lock held
+        if self.workers and self._executor is None:
+            # spawn: forking a process that runs threads can copy held locks
+            self._executor = ProcessPoolExecutor(
+                self.workers, mp_context=multiprocessing.get_context("spawn"), initializer=_lower_priority)
+
+    def close(self) -> None:
+        # Under the lock that guards submit, so no call submits to the executor once it is shut down
+        with self._lock:
+            self._closed = True
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self._latency))
+
+    async def _run(self, function, *args, items: int = 1, wait: bool = False):
+        while True:
+            with self._lock:
+                if self._closed:
+                    self._rejected += 1
+                    raise HasherBusy(self.retry_after())
+                if self._pending < self.capacity:
+                    self._pending += 1
+                    break
+                if not wait:
+                    self._rejected += 1
+                    raise HasherBusy(self.retry_after())
+            await asyncio.sleep(0.05)
+        started = time.perf_counter()
+        completed = False
+        try:
+            if self.workers:
+                with self._lock:
+                    # close() may have run since admission
+                    if self._closed:
+                        self._rejected += 1
+                        raise HasherBusy(self.retry_after())
+                    self._ensure_executor()
+                    future = self._executor.submit(function, *args)
+                result = await asyncio.wrap_future(future)
+            else:
+                result = await run_in_threadpool(function, *args)
+            completed = True
+            return result
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._pending -= 1
+                if completed:
+                    self._completed += items
+                    self._latency += 0.1 * (elapsed / items - self._latency)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash, password, self.rounds)
+
+    async def hash_many(self, passwords: List[str], per_task: int = 8) -> List[str]:
+        """Hashes of `passwords`, in order, spread over every worker.
+
+        Meant for bulk imports: the batch goes out as small tasks, at most one
+        per worker in flight, so logins queue behind a task rather than
+        behind the whole batch; and it waits for capacity instead of raising
+        `HasherBusy`.
+        """
+        in_flight = asyncio.Semaphore(max(self.workers, 1))
+
+        async def run_task(part):
+            async with in_flight:
+                return await self._run(_hash_many, part, self.rounds, items=len(part), wait=True)
+
+        parts = [passwords[start:start + per_task] for start in range(0, len(passwords), per_task)]
+        results = await asyncio.gather(*(run_task(part) for part in parts))
+        return [hashed for part in results for hashed in part]
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """(matches, new hash); the new hash is set when the stored one uses other parameters"""
+        verified, new_hash = await self._run(_verify_and_update, password, hashed_password, self.rounds)
+        if new_hash is not None:
+            with self._lock:
+                self._rehashed += 1
+        return verified, new_hash
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "rounds": self.rounds,
+                "workers": self.workers,
+                "capacity": self.capacity,
+                "pending": self._pending,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "rehashed": self._rehashed,
+                "latency_seconds": round(self._latency, 4),
+            }
@@ -0,0 +1,440 @@
+import json
+import logging
+import math
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.formparsers import FormParser, MultiPartException, MultiPartParser
+
+logger = logging.getLogger(__name__)
+
+IP, USER_ID, USERNAME, USERNAME_IP = "ip", "user_id", "username", "username_ip"
+# Body fields each key kind is read from; requests without one skip the rule
+BODY_FIELDS = {USER_ID: "user_id", USERNAME: "username"}
+# Key kinds that need the body read
+BODY_KEYS = {USER_ID, USERNAME, USERNAME_IP}
+MAX_KEY_BODY_BYTES = 64 * 1024  # larger bodies are rejected when a rule needs a key from them
+SWEEP_PER_TAKE = 2
+PURGE_EVERY_TAKES = 1000
+RETRY_AFTER_BODY = json.dumps({"detail": "Too many requests, please retry shortly"}).encode()
+TOO_LARGE_BODY = json.dumps({"detail": "Request body too large"}).encode()
+UNREADABLE_BODY = json.dumps({"detail": "Could not parse the request body"}).encode()
+
+
+class RateLimitRule(NamedTuple):
+    """A token bucket per distinct key: `burst` requests at once, refilled at `per_minute`.
+
+    A path ending in "/" matches every path under it; `methods` empty
+    matches any method.
+    """
+    name: str
+    key: Optional[str]  # IP, USER_ID, USERNAME or USERNAME_IP; None for one bucket shared by all clients
+    per_minute: float
+    burst: int
+    paths: Tuple[str, ...]
+    methods: Tuple[str, ...] = ()
+
+    def matches(self, method: str, path: str) -> bool:
+        if self.methods and method not in self.methods:
+            return False
+        return any(path == prefix or (prefix.endswith("/") and path.startswith(prefix)) for prefix in self.paths)
+
+
+class BucketStore(ABC):
+    """Interface for token bucket backends.
+
+    `take` refills the bucket for the time elapsed since its last update,
+    then removes `cost` tokens if it holds that many. It returns 0 when the
+    request is allowed and otherwise the seconds until it would be.
+    """
+
+    blocking = False  # whether `take` may wait on I/O
+
+    @abstractmethod
+    def take(self, key: str, capacity: float, rate: float, cost: float = 1) -> float:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+    @abstractmethod
+    def stats(self) -> Dict:
+        ...
+
+
+def _refill(tokens: float, updated: float, now: float, capacity: float, rate: float) -> float:
+    return min(capacity, tokens + (now - updated) * rate)
+
+
+class InMemoryBucketStore(BucketStore):
+    """Process-local buckets in an LRU capped at `max_keys`.
+
+    A bucket that has refilled to capacity is indistinguishable from a new
+    one, so each `take` drops the least recently used buckets that are full
+    again. When a flood of distinct keys still outgrows the cap, the oldest
+    bucket is evicted and its key starts over with a full bucket: memory
+    stays bounded at the cost of some leniency towards the evicted key.
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        # key -> [tokens, updated, full_at] on the monotonic clock
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._expirations = 0
+        self._evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def take(self, key: str, capacity: float, rate: float, cost: float = 1) -> float:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = capacity
+            else:
+                self._buckets.move_to_end(key)
+                tokens = _refill(bucket[0], bucket[1], now, capacity, rate)
+            wait = 0.0 if tokens >= cost else (cost - tokens) / rate
+            if not wait:
+                tokens -= cost
+            self._buckets[key] = [tokens, now, now + (capacity - tokens) / rate]
+            self._sweep(now)
+            return wait
+
+    def _sweep(self, now: float) -> None:
+        for _ in range(SWEEP_PER_TAKE):
+            key, bucket = next(iter(self._buckets.items()))
+            if now < bucket[2]:
+                break
+            del self._buckets[key]
+            self._expirations += 1
+            if not self._buckets:
+                break
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+            self._evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "keys": len(self._buckets),
+                "max_keys": self.max_keys,
+                "expirations": self._expirations,
+                "evictions": self._evictions,
+            }
+
+
+class SQLiteBucketStore(BucketStore):
+    """Buckets shared by every worker process through a SQLite WAL database.
+
+    Each `take` is one short write transaction keyed by the bucket, so all
+    workers on a host draw from the same buckets. Rows store when they will
+    be full again; every PURGE_EVERY_TAKES takes deletes those that are.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str, timeout: float = 1.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._takes = 0
+        self._purged = 0
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, full_at REAL NOT NULL)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, capacity: float, rate: float, cost: float = 1) -> float:
+        # Wall clock, the only one the worker processes share
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM rate_limit_buckets WHERE key = ?", (key,)).fetchone()
+            tokens = capacity if row is None else _refill(row[0], row[1], now, capacity, rate)
+            wait = 0.0 if tokens >= cost else (cost - tokens) / rate
+            if not wait:
+                tokens -= cost
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_limit_buckets (key, tokens, updated, full_at) VALUES (?, ?, ?, ?)",
+                (key, tokens, now, now + (capacity - tokens) / rate),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        with self._stats_lock:
+            self._takes += 1
+            purge = self._takes % PURGE_EVERY_TAKES == 0
+        if purge:
+            self.purge_expired()
+        return wait
+
+    def purge_expired(self) -> int:
+        """Delete buckets that have refilled; returns how many were removed"""
+        cursor = self._conn().execute("DELETE FROM rate_limit_buckets WHERE full_at <= ?", (time.time(),))
+        with self._stats_lock:
+            self._purged += cursor.rowcount
+        return cursor.rowcount
+
+    def clear(self) -> None:
+        self._conn().execute("DELETE FROM rate_limit_buckets")
+
+    def stats(self) -> Dict:
+        keys = self._conn().execute("SELECT COUNT(*) FROM rate_limit_buckets").fetchone()[0]
+        with self._stats_lock:
+            return {"backend": "sqlite", "path": self.path, "keys": keys, "expirations": self._purged}
+
+
+class RateLimiter:
+    """Checks requests against every matching rule and counts the outcomes.
+
+    Rules are checked in order and a request stops at the first one that
+    rejects it, so tokens already taken from earlier rules stay spent. If
+    the store fails, the request is let through and counted under
+    `store_errors`: a broken limiter must not take the API down with it.
+    """
+
+    def __init__(self, rules: List[RateLimitRule], store: BucketStore, trust_forwarded_for: bool = False):
+        self.rules = list(rules)
+        self.store = store
+        self.trust_forwarded_for = trust_forwarded_for
+        self._lock = threading.Lock()
+        self._allowed: Dict[str, int] = {}  # by rule name
+        self._limited: Dict[str, int] = {}
+        self._store_errors = 0
+
+    def matching_rules(self, method: str, path: str) -> List[RateLimitRule]:
+        return [rule for rule in self.rules if rule.matches(method, path)]
+
+    def client_ip(self, scope: Dict) -> str:
+        if self.trust_forwarded_for:
+            for name, value in scope.get("headers", ()):
+                if name == b"x-forwarded-for":
+                    return value.decode("latin-1").split(",")[0].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    def check(self, rules: List[RateLimitRule], keys: Dict[str, Optional[str]]) -> Optional[Tuple[RateLimitRule, float]]:
+        """(rule, seconds to wait) of the first rule that rejects, or None when every bucket had a token"""
+        for rule in rules:
+            key = keys.get(rule.key) if rule.key else "*"
+            if not key:
+                continue
+            try:
+                wait = self.store.take(f"{rule.name}:{key}", rule.burst, rule.per_minute / 60)
+            except Exception as e:
+                logger.error(f"Rate limit store error: {str(e)}")
+                with self._lock:
+                    self._store_errors += 1
+                continue
+            with self._lock:
+                counters = self._limited if wait else self._allowed
+                counters[rule.name] = counters.get(rule.name, 0) + 1
+            if wait:
+                return rule, wait
+        return None
+
+    def reset(self) -> None:
+        """Drop every bucket and zero the counters"""
+        self.store.clear()
+        with self._lock:
+            self._allowed.clear()
+            self._limited.clear()
+            self._store_errors = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            rules = {
+                rule.name: {
+                    "key": rule.key or "global",
+                    "per_minute": rule.per_minute,
+                    "burst": rule.burst,
+                    "allowed": self._allowed.get(rule.name, 0),
+                    "limited": self._limited.get(rule.name, 0),
+                }
+                for rule in self.rules
+            }
+            store_errors = self._store_errors
+        return {"rules": rules, "store_errors": store_errors, "store": self.store.stats()}
+
+
+async def _body_keys(headers: Headers, body: bytes) -> Dict[str, str]:
+    """user_id and username from a JSON, form-encoded or multipart body.
+
+    Raises ValueError for a body that doesn't parse as its content type.
+    Forms go through starlette's own parsers, so the fields seen here are
+    the ones the route will see.
+    """
+    content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+    fields: Dict = {}
+    if content_type == "application/json":
+        parsed = json.loads(body)
+        fields = parsed if isinstance(parsed, dict) else {}
+    elif content_type in ("application/x-www-form-urlencoded", "multipart/form-data"):
+        async def stream():
+            yield body
+
+        if content_type == "multipart/form-data":
+            parser = MultiPartParser(headers, stream())
+        else:
+            parser = FormParser(headers, stream())
+        try:
+            form = await parser.parse()
+        except MultiPartException as e:
+            raise ValueError(e.message)
+        fields = {name: form.get(name) for name in form.keys()}
+        await form.close()
+    keys = {}
+    for kind, field in BODY_FIELDS.items():
+        value = fields.get(field)
+        if isinstance(value, (str, int)) and str(value).strip():
+            keys[kind] = str(value).strip().lower()
+    return keys
+
+
+class RateLimitMiddleware:
+    """ASGI middleware answering 429 with Retry-After when a rule's bucket is empty.
+
+    Rejected requests never reach the router, so they cost neither a
+    threadpool slot nor the handler's work. Bodies are read only for
+    rules keyed by user_id or username, and are replayed to the app
+    unchanged. A body too large or malformed to read a key from is
+    rejected (413 or 400) rather than let past those rules.
+    """
+
+    def __init__(self, app, limiter: RateLimiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        rules = self.limiter.matching_rules(scope["method"], scope["path"])
+        if not rules:
+            await self.app(scope, receive, send)
+            return
+
+        keys = {IP: self.limiter.client_ip(scope)}
+        if any(rule.key in BODY_KEYS for rule in rules):
+            receive, body = await _buffer_body(receive)
+            if body is None:
+                await _respond(send, 413, TOO_LARGE_BODY)
+                return
+            try:
+                keys.update(await _body_keys(Headers(scope=scope), body))
+            except ValueError:
+                await _respond(send, 400, UNREADABLE_BODY)
+                return
+            if USERNAME in keys:
+                keys[USERNAME_IP] = f"{keys[USERNAME]}@{keys[IP]}"
+
+        if self.limiter.store.blocking:
+            rejected = await run_in_threadpool(self.limiter.check, rules, keys)
+        else:
+            rejected = self.limiter.check(rules, keys)
+        if rejected is None:
+            await self.app(scope, receive, send)
+            return
+
+        rule, wait = rejected
+        await _respond(send, 429, RETRY_AFTER_BODY, [
+            (b"retry-after", str(max(1, math.ceil(wait))).encode()),
+            (b"x-ratelimit-rule", rule.name.encode()),
+        ])
+
+
+async def _respond(send, status: int, body: bytes, headers: Optional[List[Tuple[bytes, bytes]]] = None) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ] + (headers or []),
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _buffer_body(receive):
+    """Read up to MAX_KEY_BODY_BYTES of the body; returns a receive that replays it, and the body or None if larger"""
+    messages = []
+    size = 0
+    complete = False
+    while True:
+        message = await receive()
+        messages.append(message)
+        if message["type"] != "http.request":
+            break
+        size += len(message.get("body", b""))
+        if size > MAX_KEY_BODY_BYTES:
+            break
+        if not message.get("more_body", False):
+            complete = True
+            break
+
+    async def replay():
+        if messages:
+            return messages.pop(0)
+        return await receive()
+
+    body = b"".join(message.get("body", b"") for message in messages) if complete else None
+    return replay, body
+
+
+def create_rate_limiter(settings) -> RateLimiter:
+    """Build the limiter for the chatbot and auth routes from RATE_LIMIT_* settings"""
+    if settings.RATE_LIMIT_BACKEND == "memory":
+        store = InMemoryBucketStore(max_keys=settings.RATE_LIMIT_MAX_KEYS)
+    elif settings.RATE_LIMIT_BACKEND == "sqlite":
+        store = SQLiteBucketStore(settings.RATE_LIMIT_SQLITE_PATH)
+    else:
+        raise ValueError(f"Unknown rate limit backend: {settings.RATE_LIMIT_BACKEND}")
+
+    chatbot = ("/api/chatbot", "/api/chatbot/batch")
+    rules = [
+        RateLimitRule("api_ip", IP, settings.RATE_LIMIT_API_PER_MINUTE, settings.RATE_LIMIT_API_BURST, ("/api/",)),
+        RateLimitRule("chatbot_ip", IP, settings.RATE_LIMIT_CHATBOT_IP_PER_MINUTE,
+                      settings.RATE_LIMIT_CHATBOT_IP_BURST, ("/api/chatbot",), ("POST",)),
+        # A batch carries up to CHATBOT_MAX_BATCH_SIZE messages, so it gets a far smaller budget of its own
+        RateLimitRule("chatbot_batch_ip", IP, settings.RATE_LIMIT_CHATBOT_BATCH_IP_PER_MINUTE,
+                      settings.RATE_LIMIT_CHATBOT_BATCH_IP_BURST, ("/api/chatbot/batch",), ("POST",)),
+        RateLimitRule("chatbot_user", USER_ID, settings.RATE_LIMIT_CHATBOT_USER_PER_MINUTE,
+                      settings.RATE_LIMIT_CHATBOT_USER_BURST, ("/api/chatbot",), ("POST",)),
+        RateLimitRule("login_ip", IP, settings.RATE_LIMIT_LOGIN_IP_PER_MINUTE,
+                      settings.RATE_LIMIT_LOGIN_IP_BURST, ("/api/token",), ("POST",)),
+        # Per username and IP, so guessing at someone's password from one address can't lock them out everywhere
+        RateLimitRule("login_username", USERNAME_IP, settings.RATE_LIMIT_LOGIN_USERNAME_PER_MINUTE,
+                      settings.RATE_LIMIT_LOGIN_USERNAME_BURST, ("/api/token",), ("POST",)),
+    ]
+    if settings.RATE_LIMIT_GLOBAL_PER_MINUTE:
+        # Last, so a client already over its own limits doesn't spend the shared budget
+        rules.append(RateLimitRule("global", None, settings.RATE_LIMIT_GLOBAL_PER_MINUTE,
+                                   settings.RATE_LIMIT_GLOBAL_BURST, chatbot + ("/api/token",), ("POST",)))
+    return RateLimiter(rules, store, trust_forwarded_for=settings.RATE_LIMIT_TRUST_FORWARDED_FOR)
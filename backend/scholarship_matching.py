@@ -0,0 +1,283 @@
+import datetime
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import select
+
+import database as db
+from cache import TTLCache
+
+JK_DISTRICTS = (
+    "Anantnag", "Bandipora", "Baramulla", "Budgam", "Doda", "Ganderbal", "Jammu", "Kathua", "Kishtwar", "Kulgam",
+    "Kupwara", "Poonch", "Pulwama", "Rajouri", "Ramban", "Reasi", "Samba", "Shopian", "Srinagar", "Udhampur",
+)
+EDUCATION_LEVELS = ("10th", "12th", "Undergraduate", "Graduate", "Postgraduate")
+STREAMS = ("science", "commerce", "arts")
+# Upper bounds (rupees per year) of the income bands used as index keys
+INCOME_BANDS = (100000, 250000, 500000, 800000, float("inf"))
+
+# (pattern, values) pairs applied in order; each match is blanked out so a
+# later, more general pattern ("matric", "science") can't match it again
+_LEVEL_RULES = [
+    (r"post[- ]?matric", ("12th", "Undergraduate", "Graduate", "Postgraduate")),
+    (r"pre[- ]?matric", ("10th",)),
+    (r"post[- ]?graduat\w*|\bpg\b|\bmasters?\b|\bm\.(a|sc|com|tech)\b|\bm\.?phil\b|\bph\.?d\b|\bmba\b", ("Postgraduate",)),
+    (r"under[- ]?graduat\w*|\bug\b|\bbachelors?\b|\bb\.?(tech|sc|com|ed|e)\b|\bb\.a\b|\bdiploma\b", ("Undergraduate",)),
+    (r"\bgraduat\w*", ("Graduate",)),
+    (r"\b12th\b|\bclass\s*(xii|12)\b|higher secondary|\bintermediate\b", ("12th",)),
+    (r"\b10th\b|\bclass\s*(x|10)\b|\bmatric\w*|secondary school", ("10th",)),
+]
+_STREAM_RULES = [
+    (r"social sciences?|humanities|\barts\b|\bb\.a\b", ("arts",)),
+    (r"\bcommerce\b|\bb\.?com\b|\baccount\w*|\bbusiness\b|\bmba\b", ("commerce",)),
+    (r"\bscience\b|\bpcm\b|\bpcb\b|\bstem\b|engineering|\bmedic\w*|\bmbbs\b|\bb\.?tech\b|\btechnical\b|"
+     r"\bnursing\b|\bpharmacy\b", ("science",)),
+]
+_STATE_NAMES = re.compile(r"jammu\s*(and|&)\s*kashmir|\bj\s*&\s*k\b")
+_DISTRICT = re.compile(r"\b(%s)\b" % "|".join(district.lower() for district in JK_DISTRICTS))
+_INCOME = re.compile(
+    r"income[^.;]*?(?:below|less than|under|up ?to|not exceeding|not more than|within|max(?:imum)?( of)?|<=?|≤)"
+    r"\s*(?:rs\.?|inr|₹)?\s*(\d[\d,]*(?:\.\d+)?)\s*(lakhs?|lacs?|l\b|crores?)?"
+)
+
+
+class EligibilityCriteria(NamedTuple):
+    """Structured eligibility; an empty set means the dimension is unrestricted"""
+    education_levels: FrozenSet[str] = frozenset()
+    districts: FrozenSet[str] = frozenset()
+    streams: FrozenSet[str] = frozenset()
+    max_income: Optional[float] = None
+
+
+def _apply_rules(text: str, rules) -> Tuple[str, Set[str]]:
+    found: Set[str] = set()
+    for pattern, values in rules:
+        text, count = re.subn(pattern, " ", text)
+        if count:
+            found.update(values)
+    return text, found
+
+
+def parse_income(text: str) -> Optional[float]:
+    """The family income limit in rupees stated in `text`, if any"""
+    match = _INCOME.search(text.lower())
+    if match is None:
+        return None
+    amount = float(match.group(2).replace(",", ""))
+    unit = match.group(3) or ""
+    if unit.startswith(("lakh", "lac", "l")):
+        amount *= 100000
+    elif unit.startswith("crore"):
+        amount *= 10000000
+    return amount
+
+
+def parse_eligibility(text: Optional[str]) -> EligibilityCriteria:
+    """Extract education levels, districts, streams and an income limit from free text"""
+    if not text:
+        return EligibilityCriteria()
+    lowered = text.lower()
+    max_income = parse_income(lowered)
+    without_state = _STATE_NAMES.sub(" ", lowered)
+    districts = {district.title() for district in _DISTRICT.findall(without_state)}
+    _, levels = _apply_rules(without_state, _LEVEL_RULES)
+    _, streams = _apply_rules(without_state, _STREAM_RULES)
+    return EligibilityCriteria(frozenset(levels), frozenset(districts), frozenset(streams), max_income)
+
+
+def income_band(income: float) -> int:
+    for band, upper in enumerate(INCOME_BANDS):
+        if income <= upper:
+            return band
+    return len(INCOME_BANDS) - 1
+
+
+# Profile values are mapped onto the index vocabulary; a value outside it
+# (say, a district outside J&K) only matches unrestricted scholarships
+_CANONICAL = {value.lower(): value for value in EDUCATION_LEVELS + JK_DISTRICTS + STREAMS}
+
+
+def normalize_education_level(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    value = value.strip()
+    if value.lower() in _CANONICAL:
+        return _CANONICAL[value.lower()]
+    _, levels = _apply_rules(value.lower(), _LEVEL_RULES)
+    return next((level for level in EDUCATION_LEVELS if level in levels), value)
+
+
+def _normalize(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    value = value.strip()
+    return _CANONICAL.get(value.lower(), value)
+
+
+class ScholarshipIndex:
+    """Inverted index from eligibility criteria to scholarship ids.
+
+    Eligibility is parsed when a scholarship is written (via
+    `database.watch_changes`), never per request. A match intersects, for
+    each dimension, the ids restricted to the student's value with the ids
+    that don't restrict that dimension, and only the surviving ids are
+    ranked; the ranked list per combination of criteria is memoized until
+    the next write.
+    """
+
+    DIMENSIONS = ("education_levels", "districts", "streams", "income_bands")
+
+    def __init__(self, memo_size: int = 4096):
+        self._rows: Dict[int, Dict] = {}
+        self._criteria: Dict[int, EligibilityCriteria] = {}
+        self._unrestricted: Dict[str, Set[int]] = {dimension: set() for dimension in self.DIMENSIONS}
+        self._restricted: Dict[str, Dict[str, Set[int]]] = {dimension: defaultdict(set) for dimension in self.DIMENSIONS}
+        self._memo = TTLCache(maxsize=memo_size)
+        self._positions: Optional[Dict[int, int]] = None  # id -> rank among all scholarships
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @staticmethod
+    def _keys(criteria: EligibilityCriteria) -> Dict[str, FrozenSet]:
+        bands = frozenset()
+        if criteria.max_income is not None:
+            # Every band with a student who could be under the limit
+            lowers = (0,) + INCOME_BANDS[:-1]
+            bands = frozenset(band for band, lower in enumerate(lowers) if lower < criteria.max_income)
+        return {
+            "education_levels": criteria.education_levels,
+            "districts": criteria.districts,
+            "streams": criteria.streams,
+            "income_bands": bands,
+        }
+
+    def rebuild(self, session) -> int:
+        with self._lock:
+            for scholarship_id in list(self._rows):
+                self.remove_row(scholarship_id)
+            columns = [column for column in db.Scholarship.__table__.columns]
+            for row in session.execute(select(*columns)):
+                self.index_row(dict(row._mapping))
+            return len(self._rows)
+
+    def index_row(self, values: Dict) -> EligibilityCriteria:
+        """Add or update a scholarship; fields missing from `values` keep their indexed value"""
+        with self._lock:
+            scholarship_id = values["id"]
+            row = dict(self._rows.get(scholarship_id, {}))
+            row.update(values)
+            if scholarship_id in self._criteria and "eligibility" not in values:
+                criteria = self._criteria[scholarship_id]
+            else:
+                self._unindex(scholarship_id)
+                criteria = parse_eligibility(row.get("eligibility"))
+                for dimension, keys in self._keys(criteria).items():
+                    if not keys:
+                        self._unrestricted[dimension].add(scholarship_id)
+                    for key in keys:
+                        self._restricted[dimension][key].add(scholarship_id)
+                self._criteria[scholarship_id] = criteria
+            self._rows[scholarship_id] = row
+            self._positions = None
+            self._memo.invalidate()
+            return criteria
+
+    def _unindex(self, scholarship_id: int) -> None:
+        criteria = self._criteria.pop(scholarship_id, None)
+        if criteria is None:
+            return
+        for dimension, keys in self._keys(criteria).items():
+            self._unrestricted[dimension].discard(scholarship_id)
+            for key in keys:
+                ids = self._restricted[dimension][key]
+                ids.discard(scholarship_id)
+                if not ids:
+                    del self._restricted[dimension][key]
+
+    def remove_row(self, scholarship_id: int) -> None:
+        with self._lock:
+            self._unindex(scholarship_id)
+            self._rows.pop(scholarship_id, None)
+            self._positions = None
+            self._memo.invalidate()
+
+    def apply_changes(self, changes: List[db.ChangeEvent]) -> None:
+        for change in changes:
+            if change.values.get("id") is None:
+                continue
+            if change.op == "delete":
+                self.remove_row(change.values["id"])
+            else:
+                self.index_row(change.values)
+
+    def criteria(self, scholarship_id: int) -> Optional[EligibilityCriteria]:
+        return self._criteria.get(scholarship_id)
+
+    def _rank_key(self, scholarship_id: int):
+        row = self._rows[scholarship_id]
+        deadline = row.get("deadline")
+        return (-(row.get("amount") or 0), deadline is None, deadline or datetime.datetime.max, scholarship_id)
+
+    def _candidates(self, key: Tuple) -> Tuple[Tuple, ...]:
+        """(deadline, income limit, row) of every eligible scholarship, best first"""
+        ranked = self._memo.get(key)
+        if ranked is None:
+            # Per dimension, the ids open to anyone and those restricted to the student's value
+            postings = sorted(
+                ((self._unrestricted[dimension], self._restricted[dimension].get(value, set()))
+                 for dimension, value in zip(self.DIMENSIONS, key) if value is not None),
+                key=lambda pair: len(pair[0]) + len(pair[1]),
+            )
+            if postings:
+                # Only the smallest dimension is materialized; each other one narrows
+                # the survivors with intersections that cost O(len(ids)), not a union
+                ids = postings[0][0] | postings[0][1]
+                for unrestricted, restricted in postings[1:]:
+                    ids = (ids & unrestricted) | (ids & restricted)
+            else:
+                ids = self._rows
+            if self._positions is None:
+                self._positions = {scholarship_id: position for position, scholarship_id
+                                   in enumerate(sorted(self._rows, key=self._rank_key))}
+            rows, criteria = self._rows, self._criteria
+            ranked = tuple(
+                (rows[scholarship_id].get("deadline"), criteria[scholarship_id].max_income, rows[scholarship_id])
+                for scholarship_id in sorted(ids, key=self._positions.__getitem__)
+            )
+            self._memo.set(key, ranked)
+        return ranked
+
+    def match(self, education_level: Optional[str] = None, district: Optional[str] = None,
+              stream: Optional[str] = None, income: Optional[float] = None,
+              limit: int = 20, now: Optional[datetime.datetime] = None) -> List[Dict]:
+        """Open scholarships the student qualifies for, largest amount then earliest deadline first.
+
+        A criterion the student doesn't provide is not used to filter.
+        """
+        now = now or datetime.datetime.utcnow()
+        key = (
+            normalize_education_level(education_level),
+            _normalize(district),
+            _normalize(stream),
+            income_band(income) if income is not None else None,
+        )
+        with self._lock:
+            candidates = self._candidates(key)
+        results = []
+        for deadline, max_income, row in candidates:
+            if deadline is not None and deadline < now:
+                continue
+            if income is not None and max_income is not None and income > max_income:
+                continue
+            results.append(row)
+            if len(results) == limit:
+                break
+        return results
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"scholarships": len(self._rows), "memo": self._memo.stats()}
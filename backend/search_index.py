@@ -0,0 +1,293 @@
+import math
+import re
+import sqlite3
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+
+import database as db
+
+# Searchable text per model: (title field, body fields)
+DOCUMENT_FIELDS = {
+    "college": ("name", ("district", "address", "description", "facilities")),
+    "course": ("name", ("duration", "description", "eligibility")),
+    "scholarship": ("name", ("provider", "description", "eligibility")),
+}
+MODEL_KINDS = {db.College: "college", db.Course: "course", db.Scholarship: "scholarship"}
+KIND_CODES = {"college": 0, "course": 1, "scholarship": 2}
+KIND_NAMES = {code: kind for kind, code in KIND_CODES.items()}
+
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from how i in is it me my of on or show the to what where which with".split()
+)
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+DocumentKey = Tuple[str, int]
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stop words, with plural 's' stripped"""
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in STOP_WORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class SearchHit(NamedTuple):
+    kind: str
+    id: int
+    title: str
+    score: float
+
+
+class InvertedIndex:
+    """In-process inverted index ranked with BM25; titles count twice.
+
+    Postings live in dicts so documents can be added and removed cheaply.
+    Queries score with NumPy over per-term arrays, which are materialised on
+    first use and dropped whenever a document containing the term changes.
+    """
+
+    name = "memory"
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)  # term -> {slot: term frequency}
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._slots: Dict[DocumentKey, int] = {}
+        self._keys: List[Optional[DocumentKey]] = []
+        self._free_slots: List[int] = []
+        self._doc_terms: Dict[int, Tuple[str, ...]] = {}
+        self._lengths = np.zeros(1024, dtype=np.float32)
+        self._kinds = np.full(1024, -1, dtype=np.int8)
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _allocate(self, key: DocumentKey) -> int:
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self._keys[slot] = key
+        else:
+            slot = len(self._keys)
+            self._keys.append(key)
+            if slot == len(self._lengths):
+                self._lengths = np.concatenate([self._lengths, np.zeros_like(self._lengths)])
+                self._kinds = np.concatenate([self._kinds, np.full_like(self._kinds, -1)])
+        self._slots[key] = slot
+        return slot
+
+    def upsert(self, key: DocumentKey, title: str, body: str) -> None:
+        self.remove(key)
+        tokens = tokenize(title) * 2 + tokenize(body)
+        frequencies: Dict[str, int] = defaultdict(int)
+        for token in tokens:
+            frequencies[token] += 1
+        slot = self._allocate(key)
+        for term, frequency in frequencies.items():
+            self._postings[term][slot] = frequency
+            self._arrays.pop(term, None)
+        self._doc_terms[slot] = tuple(frequencies)
+        self._lengths[slot] = len(tokens)
+        self._kinds[slot] = KIND_CODES[key[0]]
+        self._total_length += len(tokens)
+
+    def remove(self, key: DocumentKey) -> None:
+        slot = self._slots.pop(key, None)
+        if slot is None:
+            return
+        for term in self._doc_terms.pop(slot):
+            postings = self._postings[term]
+            del postings[slot]
+            if not postings:
+                del self._postings[term]
+            self._arrays.pop(term, None)
+        self._total_length -= int(self._lengths[slot])
+        self._lengths[slot] = 0
+        self._kinds[slot] = -1
+        self._keys[slot] = None
+        self._free_slots.append(slot)
+
+    def _term_arrays(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            postings = self._postings.get(term)
+            if not postings:
+                return None
+            arrays = (np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                      np.fromiter(postings.values(), dtype=np.float32, count=len(postings)))
+            self._arrays[term] = arrays
+        return arrays
+
+    def search(self, terms: Sequence[str], kinds: Optional[Iterable[str]], count: int) -> List[Tuple[DocumentKey, float]]:
+        documents = len(self._slots)
+        if not documents:
+            return []
+        k1, b = self.k1, self.b
+        used = len(self._keys)
+        norms = k1 * (1 - b) + (k1 * b * documents / self._total_length) * self._lengths[:used]
+
+        scores = np.zeros(used, dtype=np.float32)
+        for term in set(terms):
+            arrays = self._term_arrays(term)
+            if arrays is None:
+                continue
+            slots, frequencies = arrays
+            idf = math.log(1 + (documents - len(slots) + 0.5) / (len(slots) + 0.5))
+            scores[slots] += idf * (k1 + 1) * frequencies / (frequencies + norms[slots])
+        if kinds:
+            scores[~np.isin(self._kinds[:used], [KIND_CODES[kind] for kind in kinds])] = 0
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > count:
+            matched = matched[np.argpartition(-scores[matched], count - 1)[:count]]
+        ranked = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(self._keys[slot], float(scores[slot])) for slot in ranked]
+
+
+class FTS5Index:
+    """SQLite FTS5 index (in-process, in-memory) ranked with its built-in BM25"""
+
+    name = "fts5"
+
+    def __init__(self):
+        self._conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE documents USING fts5(kind UNINDEXED, title, body, tokenize='porter unicode61')"
+        )
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    @staticmethod
+    def _rowid(key: DocumentKey) -> int:
+        return key[1] * len(KIND_CODES) + KIND_CODES[key[0]]
+
+    def upsert(self, key: DocumentKey, title: str, body: str) -> None:
+        rowid = self._rowid(key)
+        with self._conn:
+            self._conn.execute("DELETE FROM documents WHERE rowid = ?", (rowid,))
+            self._conn.execute(
+                "INSERT INTO documents (rowid, kind, title, body) VALUES (?, ?, ?, ?)", (rowid, key[0], title, body)
+            )
+
+    def remove(self, key: DocumentKey) -> None:
+        with self._conn:
+            self._conn.execute("DELETE FROM documents WHERE rowid = ?", (self._rowid(key),))
+
+    def search(self, terms: Sequence[str], kinds: Optional[Iterable[str]], count: int) -> List[Tuple[DocumentKey, float]]:
+        match = " OR ".join('"%s"' % term for term in dict.fromkeys(terms))
+        sql = "SELECT rowid, -bm25(documents, 0.0, 2.0, 1.0) FROM documents WHERE documents MATCH ?"
+        params: list = [match]
+        if kinds:
+            kinds = list(kinds)
+            sql += " AND kind IN (%s)" % ",".join("?" * len(kinds))
+            params.extend(kinds)
+        sql += " ORDER BY bm25(documents, 0.0, 2.0, 1.0) LIMIT ?"
+        params.append(count)
+        rows = self._conn.execute(sql, params).fetchall()
+        codes = len(KIND_CODES)
+        return [((KIND_NAMES[rowid % codes], rowid // codes), score) for rowid, score in rows]
+
+
+def fts5_available() -> bool:
+    try:
+        sqlite3.connect(":memory:").execute("CREATE VIRTUAL TABLE probe USING fts5(text)")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def create_index(backend: str = "auto"):
+    """Build the index selected by SEARCH_BACKEND ("memory", "fts5" or "auto").
+
+    "auto" uses FTS5 when the SQLite build includes it and the in-process
+    index otherwise. FTS5 scores every document matching any query term, so
+    broad queries over large catalogs are much slower than the NumPy index
+    (see benchmarks/bench_search.py); it trades that for a smaller footprint.
+    """
+    if backend == "memory" or (backend == "auto" and not fts5_available()):
+        return InvertedIndex()
+    if backend in ("auto", "fts5"):
+        return FTS5Index()
+    raise ValueError(f"Unknown search backend: {backend}")
+
+
+class SearchService:
+    """Full-text search over colleges, courses and scholarships.
+
+    Built once from the database and then kept current from committed
+    changes (see `database.watch_changes`).
+    """
+
+    def __init__(self, index=None):
+        self.index = index if index is not None else create_index()
+        self._documents: Dict[DocumentKey, Dict[str, str]] = {}
+        self._lock = threading.RLock()
+
+    def rebuild(self, session) -> int:
+        """Re-index every searchable row; returns the number of documents"""
+        with self._lock:
+            for key in list(self._documents):
+                self.index.remove(key)
+            self._documents.clear()
+            for model, kind in MODEL_KINDS.items():
+                title_field, body_fields = DOCUMENT_FIELDS[kind]
+                columns = [getattr(model, field) for field in ("id", title_field) + body_fields]
+                for row in session.execute(select(*columns)):
+                    self.index_row(kind, dict(row._mapping))
+            return len(self._documents)
+
+    def index_row(self, kind: str, values: Dict) -> None:
+        """Add or update one document; fields missing from `values` keep their indexed text"""
+        title_field, body_fields = DOCUMENT_FIELDS[kind]
+        key = (kind, values["id"])
+        with self._lock:
+            fields = dict(self._documents.get(key, {}))
+            for field in (title_field,) + body_fields:
+                if field in values:
+                    fields[field] = values[field] or ""
+            self._documents[key] = fields
+            body = " ".join(fields.get(field, "") for field in body_fields)
+            self.index.upsert(key, fields.get(title_field, ""), body)
+
+    def remove_row(self, kind: str, row_id: int) -> None:
+        with self._lock:
+            self._documents.pop((kind, row_id), None)
+            self.index.remove((kind, row_id))
+
+    def apply_changes(self, changes: List[db.ChangeEvent]) -> None:
+        for change in changes:
+            kind = MODEL_KINDS[change.model]
+            if change.values.get("id") is None:
+                continue
+            if change.op == "delete":
+                self.remove_row(kind, change.values["id"])
+            else:
+                self.index_row(kind, change.values)
+
+    def search(self, query: str, kinds: Optional[Iterable[str]] = None,
+               limit: int = 20, offset: int = 0) -> Tuple[List[SearchHit], bool]:
+        """Ranked hits for `query` and whether more results follow this page"""
+        terms = tokenize(query)
+        if not terms:
+            return [], False
+        with self._lock:
+            ranked = self.index.search(terms, kinds, offset + limit + 1)
+            hits = [
+                SearchHit(kind, row_id, self._documents[(kind, row_id)].get(DOCUMENT_FIELDS[kind][0], ""), round(score, 4))
+                for (kind, row_id), score in ranked[offset:offset + limit]
+            ]
+        return hits, len(ranked) > offset + limit
+
+    def stats(self) -> Dict:
+        return {"backend": self.index.name, "documents": len(self._documents)}
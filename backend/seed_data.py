@@ -1,12 +1,9 @@
 # Seed data for the application
-from database import get_db, engine, Base
+from database import get_db
 import database as db
 
 def seed_database(db_session=None):
-    """Initialize the database with seed data"""
-    # Create tables if they don't exist
-    Base.metadata.create_all(bind=engine)
-    
+    """Initialize the database with seed data; the schema must exist (see `database.migrate`)"""
     # Add seed data if needed
     # This function will be called when the application starts
     pass
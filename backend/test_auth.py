@@ -0,0 +1,97 @@
+from datetime import timedelta
+
+from fastapi.testclient import TestClient
+
+import auth
+import database as db
+from main import app
+
+client = TestClient(app)
+
+
+def add_user(test_db, username="asha", full_name="Asha", **fields):
+    session = test_db()
+    session.add(db.User(username=username, email=f"{username}@example.com", hashed_password="x",
+                        full_name=full_name, **fields))
+    session.commit()
+    session.close()
+
+
+def bearer(username="asha", **kwargs):
+    return {"Authorization": f"Bearer {auth.create_access_token({'sub': username}, **kwargs)}"}
+
+
+def test_verify_token_caches_until_expiry():
+    token = auth.create_access_token({"sub": "asha"}, expires_delta=timedelta(minutes=5))
+    auth.token_cache.invalidate()
+    hits = auth.token_cache.stats()["hits"]
+    assert auth.verify_token(token) == "asha"
+    assert auth.verify_token(token) == "asha"
+    assert auth.token_cache.stats()["hits"] == hits + 1
+    expired = auth.create_access_token({"sub": "asha"}, expires_delta=timedelta(seconds=-1))
+    assert auth.verify_token(expired) is None
+    assert auth.verify_token(token + "x") is None
+
+
+def test_cached_user_needs_no_queries(test_db, count_queries):
+    add_user(test_db)
+    headers = bearer()
+    assert client.get("/api/users/me", headers=headers).json()["full_name"] == "Asha"
+    with count_queries() as queries:
+        response = client.get("/api/users/me", headers=headers)
+    assert response.json()["full_name"] == "Asha"
+    assert len(queries) == 0
+
+
+def test_user_update_evicts_cache(test_db):
+    add_user(test_db)
+    headers = bearer()
+    assert client.get("/api/users/me", headers=headers).json()["full_name"] == "Asha"
+
+    session = test_db()
+    session.query(db.User).filter(db.User.username == "asha").one().full_name = "Asha Bhat"
+    session.commit()
+    session.close()
+    assert client.get("/api/users/me", headers=headers).json()["full_name"] == "Asha Bhat"
+
+    session = test_db()
+    session.query(db.User).filter(db.User.username == "asha").one().is_active = False
+    session.commit()
+    session.close()
+    response = client.get("/api/users/me", headers=headers)
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Inactive user"
+
+
+def test_deleted_user_and_bad_tokens_are_rejected(test_db):
+    add_user(test_db)
+    headers = bearer()
+    assert client.get("/api/users/me", headers=headers).status_code == 200
+    session = test_db()
+    session.delete(session.query(db.User).filter(db.User.username == "asha").one())
+    session.commit()
+    session.close()
+    assert client.get("/api/users/me", headers=headers).status_code == 401
+    assert client.get("/api/users/me", headers=bearer(expires_delta=timedelta(seconds=-1))).status_code == 401
+    assert client.get("/api/users/me", headers={"Authorization": "Bearer garbage"}).status_code == 401
+
+
+def test_auth_and_route_share_one_session(test_db, monkeypatch):
+    add_user(test_db)
+    opened = []
+    original = test_db.class_.__init__
+
+    def tracking_init(self, *args, **kwargs):
+        opened.append(self)
+        original(self, *args, **kwargs)
+
+    monkeypatch.setattr(test_db.class_, "__init__", tracking_init)
+    assert client.get("/api/users/me", headers=bearer()).status_code == 200
+    assert len(opened) == 1
+
+
+def test_registration_cannot_grant_admin(test_db):
+    response = client.post("/api/users/", json={"username": "mallory", "email": "mallory@example.com",
+                                                "password": "secret123", "full_name": "M", "role": "admin"})
+    assert response.status_code == 201 and response.json()["role"] == "student"
+    assert client.get("/api/admin/chatbot/state", headers=bearer("mallory")).status_code == 403
@@ -0,0 +1,118 @@
+import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import database as db
+import main
+from chatbot_answers import ChatEntities, ChatbotAnswers, course_terms
+
+client = TestClient(main.app)
+
+
+@pytest.fixture
+def seeded(test_db):
+    with test_db() as session:
+        nit = db.College(name="NIT Srinagar", district="Srinagar")
+        nit.courses = [db.Course(name="B.Tech Civil"), db.Course(name="B.Tech CSE"), db.Course(name="M.Tech CSE")]
+        kashmir = db.College(name="University of Kashmir", district="Srinagar")
+        kashmir.courses = [db.Course(name="BA English"), db.Course(name="MBA")]
+        jammu = db.College(name="Government College of Engineering Jammu", district="Jammu")
+        jammu.courses = [db.Course(name="B.Tech Mechanical")]
+        session.add_all([nit, kashmir, jammu])
+        session.add_all([
+            db.Scholarship(name="Srinagar Merit Award", eligibility="Students domiciled in Srinagar district",
+                           amount=25000, deadline=datetime.datetime(2099, 3, 1)),
+            db.Scholarship(name="J&K Open Grant", eligibility="Any student", amount=10000,
+                           deadline=datetime.datetime(2099, 1, 1)),
+            db.Scholarship(name="Jammu Only Grant", eligibility="Residents of Jammu district", amount=90000),
+        ])
+        session.commit()
+    return test_db
+
+
+def test_course_terms():
+    assert course_terms("B.Tech CSE") == ["B.Tech CSE", "B.Tech"]
+    assert course_terms("MBA") == ["MBA"]
+    assert course_terms("2 year diploma") == ["2 year diploma"]
+
+
+def entities(text):
+    return ChatEntities.from_spans(main.chatbot_answers.extract(text))
+
+
+def test_extracts_entities_from_the_database(seeded):
+    assert entities("Colleges in SRINAGAR offering b.tech?") == ChatEntities("Srinagar", "B.Tech")
+    # The longest course term wins; "ba" inside "Bandipora" is not a course
+    assert entities("b.tech cse in bandipora") == ChatEntities("Bandipora", "B.Tech CSE")
+    # A college name takes precedence over the district inside it
+    assert entities("Is NIT Srinagar good?") == ChatEntities(college="NIT Srinagar")
+    assert entities("tell me about colleges") == ChatEntities()
+
+
+def test_college_answers_come_from_the_database(seeded):
+    answers = main.chatbot_answers
+    assert answers.answer("colleges", "colleges in Srinagar offering B.Tech") == (
+        "Colleges in Srinagar offering B.Tech:\n\n• NIT Srinagar: B.Tech CSE, B.Tech Civil")
+    assert answers.answer("colleges", "which colleges have b.tech") == (
+        "Colleges offering B.Tech:\n\n"
+        "• Government College of Engineering Jammu (Jammu): B.Tech Mechanical\n"
+        "• NIT Srinagar (Srinagar): B.Tech CSE, B.Tech Civil")
+    assert answers.answer("colleges", "colleges in srinagar") == (
+        "Colleges in Srinagar:\n\n• NIT Srinagar\n• University of Kashmir")
+    assert answers.answer("colleges", "MBA in Kupwara").startswith("I couldn't find any colleges in Kupwara offering MBA")
+    assert answers.answer("colleges", "engineering colleges") is None
+    assert answers.answer("colleges", "courses at University of Kashmir") == (
+        "University of Kashmir (Srinagar) offers:\n\n• BA English\n• MBA")
+
+
+def test_scholarship_answers_use_the_eligibility_index(seeded):
+    answer = main.chatbot_answers.answer("scholarships", "scholarships for Srinagar students")
+    assert answer == ("Open scholarships for students from Srinagar:\n\n"
+                      "• Srinagar Merit Award - ₹25,000, apply by 01 Mar 2099\n"
+                      "• J&K Open Grant - ₹10,000, apply by 01 Jan 2099")
+    assert main.chatbot_answers.answer("scholarships", "any scholarships?") is None
+
+
+def test_cached_until_rows_change(seeded, count_queries):
+    answers = main.chatbot_answers
+    first = answers.answer("colleges", "colleges in Jammu")
+    with count_queries() as queries:
+        assert answers.answer("colleges", "Colleges in JAMMU please") == first
+        answers.answer("scholarships", "scholarships in Jammu")
+        assert answers.answer("scholarships", "scholarships in Jammu")
+    assert len(queries) == 0
+
+    # A new college invalidates college answers and adds its course to the vocabulary
+    before = answers.stats()["caches"]
+    with seeded() as session:
+        college = db.College(name="Jammu Institute of Management", district="Jammu")
+        college.courses = [db.Course(name="BBA")]
+        session.add(college)
+        session.commit()
+    assert "Jammu Institute of Management" in answers.answer("colleges", "colleges in Jammu")
+    assert entities("bba at Jammu Institute of Management") == ChatEntities(
+        course="BBA", college="Jammu Institute of Management")
+    after = answers.stats()["caches"]
+    invalidated = {name: after[name]["invalidations"] - before[name]["invalidations"] for name in after}
+    assert invalidated["colleges"] > invalidated["scholarships"]
+
+
+def test_database_errors_fall_back_to_templates(tmp_path):
+    # The database file's directory doesn't exist, so connecting fails
+    engine = create_engine(f"sqlite:///{tmp_path / 'missing' / 'app.db'}")
+    answers = ChatbotAnswers(session_factory=sessionmaker(bind=engine))
+    assert answers.answer("colleges", "colleges in Jammu") is None
+    assert answers.errors == 1
+
+
+def test_chatbot_route_answers_from_the_database(seeded):
+    response = client.post("/api/chatbot", json={"user_id": "db-answers", "message": "Colleges in Srinagar offering B.Tech"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["intent"] == "colleges"
+    assert data["response"].startswith("Colleges in Srinagar offering B.Tech:\n\n• NIT Srinagar")
+    assert data["entities"] == [{"start": 12, "end": 20, "kind": "district", "value": "Srinagar"},
+                                {"start": 30, "end": 36, "kind": "course", "value": "B.Tech"}]
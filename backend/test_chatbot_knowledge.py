@@ -0,0 +1,91 @@
+import json
+import os
+import shutil
+
+import pytest
+
+from advanced_chatbot import AdvancedChatbot
+from chatbot_knowledge import COMPREHENSIVE_KNOWLEDGE, DEFAULT_PATH, KnowledgeBase, get_detailed_response, knowledge_base
+from user_state import InMemoryUserStateStore
+
+
+@pytest.fixture
+def knowledge_file(tmp_path):
+    path = tmp_path / "knowledge.json"
+    shutil.copy(DEFAULT_PATH, path)
+    return path
+
+
+def rewrite(path, change):
+    data = json.loads(path.read_text())
+    change(data)
+    stat = os.stat(path)
+    path.write_text(json.dumps(data))
+    # Make the change visible even on filesystems with coarse timestamps
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_answers_are_rendered_from_the_knowledge():
+    answer = get_detailed_response("colleges", "Top colleges in JAMMU?")
+    assert answer.startswith("Here are some top colleges in Jammu:\n\n• University of Jammu")
+    assert answer.count("\n• ") == len(COMPREHENSIVE_KNOWLEDGE["colleges_detailed"]["jammu_colleges"])
+    steps = get_detailed_response("career_guidance", "help me plan")
+    assert "\n1. Self-assessment" in steps and "\n2. " in steps
+    assert get_detailed_response("scholarships", "anything") == (
+        "I can help you with government scholarships, private funding, and application guidance. "
+        "What type of scholarship information do you need?")
+    assert get_detailed_response("greeting", "hello") is None
+
+
+def test_longest_keyword_wins():
+    # "application" outranks "government" and "apply"; "admission" outranks "jammu"
+    assert get_detailed_response("scholarships", "government application").startswith("Scholarship application tips")
+    assert get_detailed_response("colleges", "jammu admission").startswith("Here's the general admission process")
+    # "srinagar" is longer than "jammu", whichever rule comes first
+    assert get_detailed_response("colleges", "jammu srinagar").startswith("Here are some top colleges in Srinagar")
+    # A rule's required keyword must be present too
+    assert get_detailed_response("career_guidance", "popular options").startswith("I can help with career options")
+    assert get_detailed_response("career_guidance", "popular career options").startswith("Popular career options")
+
+
+def test_equal_lengths_fall_back_to_rule_order(knowledge_file):
+    def add_udhampur(data):
+        data["answers"]["colleges"]["rules"][0]["keywords"].append("udhampur")
+    rewrite(knowledge_file, add_udhampur)
+    kb = KnowledgeBase(str(knowledge_file))
+    # "udhampur" (rule 0) and "srinagar" (rule 1) are both eight letters
+    assert kb.get_detailed_response("colleges", "srinagar udhampur").startswith("Here are some top colleges in Jammu")
+
+
+def test_chatbot_answers_matched_keywords_from_the_index():
+    chatbot = AdvancedChatbot(user_states=InMemoryUserStateStore(), knowledge=knowledge_base)
+    response = chatbot.generate_contextual_response("colleges", "Colleges in Srinagar?", user_id="kb")
+    assert response.startswith("Here are some top colleges in Srinagar")
+    # No keyword matched: the intent's templates, not the knowledge default
+    response = chatbot.generate_contextual_response("colleges", "engineering college", user_id="kb")
+    assert response.startswith(tuple(chatbot.intent_patterns["colleges"]["responses"]))
+    assert knowledge_base.get_matched_response("greeting", "hello") is None
+
+
+def test_hot_reload(knowledge_file, monkeypatch):
+    kb = KnowledgeBase(str(knowledge_file), reload_seconds=60)
+    old = kb.index
+    assert not kb.reload_if_changed()
+
+    def retitle(data):
+        data["answers"]["colleges"]["rules"][0]["title"] = "Jammu colleges:"
+        data["answers"]["colleges"]["rules"][0]["keywords"].append("tawi")
+    rewrite(knowledge_file, retitle)
+    # Not checked again until the reload interval has passed
+    assert kb.get_detailed_response("colleges", "tawi").startswith("I can provide")
+    monkeypatch.setattr(kb, "_next_check", 0)
+    assert kb.get_detailed_response("colleges", "tawi").startswith("Jammu colleges:\n\n• University of Jammu")
+    assert kb.reloads == 1 and kb.index is not old
+
+
+def test_failed_reload_keeps_previous_version(knowledge_file):
+    kb = KnowledgeBase(str(knowledge_file))
+    knowledge_file.write_text("{not json")
+    assert not kb.reload_if_changed()
+    assert kb.get_detailed_response("colleges", "jammu").startswith("Here are some top colleges in Jammu")
+    assert kb.reloads == 0
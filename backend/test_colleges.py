@@ -0,0 +1,125 @@
+from fastapi.testclient import TestClient
+
+import database as db
+import main
+from main import app
+
+client = TestClient(app)
+
+
+def seed_colleges(Session):
+    session = Session()
+    for index, (name, district) in enumerate([
+        ("Government College Jammu", "Jammu"),
+        ("Government Medical College Srinagar", "Srinagar"),
+        ("NIT Srinagar", "Srinagar"),
+        ("Jammu Institute of Management", "Jammu"),
+        ("Kathua Degree College", "Kathua"),
+    ]):
+        college = db.College(name=name, district=district, address=f"Address {index}", website="https://example.org",
+                             contact="0191-000000", description="Long description " * 50, facilities="Hostel, Library")
+        college.courses = [db.Course(name="B.Tech Computer Science" if "NIT" in name else "B.A. English")]
+        session.add(college)
+    session.commit()
+    session.close()
+
+
+def test_keyset_pagination(test_db):
+    seed_colleges(test_db)
+    first = client.get("/api/colleges/?limit=2")
+    assert first.status_code == 200
+    assert [college["id"] for college in first.json()] == [1, 2]
+    cursor = first.headers["X-Next-Cursor"]
+
+    second = client.get(f"/api/colleges/?limit=2&after={cursor}")
+    assert [college["id"] for college in second.json()] == [3, 4]
+    last = client.get(f"/api/colleges/?limit=2&after={second.headers['X-Next-Cursor']}")
+    assert [college["id"] for college in last.json()] == [5]
+    assert "X-Next-Cursor" not in last.headers
+
+
+def test_filters_and_summary_fields(test_db):
+    seed_colleges(test_db)
+    srinagar = client.get("/api/colleges/?district=Srinagar").json()
+    assert [college["name"] for college in srinagar] == ["Government Medical College Srinagar", "NIT Srinagar"]
+
+    prefix = client.get("/api/colleges/?name_prefix=Government&fields=summary").json()
+    assert len(prefix) == 2
+    assert "description" not in prefix[0] and "facilities" not in prefix[0]
+
+    btech = client.get("/api/colleges/?course=b.tech").json()
+    assert [college["name"] for college in btech] == ["NIT Srinagar"]
+
+    assert client.get("/api/colleges/?name_prefix=%25").json() == []
+
+
+def test_etag_revalidation_and_invalidation(test_db):
+    seed_colleges(test_db)
+    response = client.get("/api/colleges/?district=Jammu")
+    etag = response.headers["ETag"]
+    assert client.get("/api/colleges/?district=Jammu", headers={"If-None-Match": etag}).status_code == 304
+
+    session = test_db()
+    session.add(db.College(name="Jammu Law College", district="Jammu", address="", website="", contact="",
+                           description="", facilities=""))
+    session.commit()
+    session.close()
+
+    refreshed = client.get("/api/colleges/?district=Jammu", headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.headers["ETag"] != etag
+    assert len(refreshed.json()) == 3
+
+
+def add_colleges(Session, count, courses_each=3):
+    session = Session()
+    for index in range(count):
+        college = db.College(name=f"Extra College {index}", district="Doda", address="Doda", website="",
+                             contact="", description="", facilities="")
+        college.courses = [db.Course(name=f"Course {number}", duration="3 years") for number in range(courses_each)]
+        session.add(college)
+    session.commit()
+    session.close()
+
+
+def test_colleges_with_courses(test_db):
+    seed_colleges(test_db)
+    response = client.get("/api/colleges/with-courses?limit=3")
+    assert response.status_code == 200
+    colleges = response.json()
+    assert [college["id"] for college in colleges] == [1, 2, 3]
+    assert [course["name"] for course in colleges[2]["courses"]] == ["B.Tech Computer Science"]
+    assert response.headers["X-Next-Cursor"] == "3"
+
+    detail = client.get("/api/colleges/3").json()
+    assert detail["name"] == "NIT Srinagar"
+    assert [course["name"] for course in detail["courses"]] == ["B.Tech Computer Science"]
+    assert client.get("/api/colleges/999").status_code == 404
+
+
+def test_college_endpoints_do_not_query_per_row(test_db, assert_constant_queries):
+    add_colleges(test_db, 2)
+    grow = lambda: add_colleges(test_db, 20)
+
+    with_courses = lambda: client.get("/api/colleges/with-courses?limit=100")
+    assert assert_constant_queries(with_courses, grow) <= 2
+    assert assert_constant_queries(lambda: client.get("/api/colleges/1"), grow) <= 2
+
+    uncached_list = lambda: (main.college_cache.invalidate(), client.get("/api/colleges/?limit=500&course=course"))
+    assert_constant_queries(uncached_list, grow)
+
+
+def test_etag_survives_restart_only_for_unchanged_content(test_db):
+    seed_colleges(test_db)
+    etag = client.get("/api/colleges/?district=Jammu").headers["ETag"]
+    # A restart, or another worker, starts its cache version from scratch
+    main.college_cache.invalidate()
+    main.college_cache.version = 0
+    assert client.get("/api/colleges/?district=Jammu", headers={"If-None-Match": etag}).status_code == 304
+
+    session = test_db()
+    session.query(db.College).filter(db.College.district == "Jammu").first().contact = "changed"
+    session.commit()
+    session.close()
+    main.college_cache.version = 0
+    assert client.get("/api/colleges/?district=Jammu", headers={"If-None-Match": etag}).status_code == 200
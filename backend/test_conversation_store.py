@@ -0,0 +1,102 @@
+from advanced_chatbot import AdvancedChatbot
+from conversation_store import SQLiteConversationBackend, WriteBehindConversationStore
+from user_state import InMemoryUserStateStore, Interaction
+
+
+def make_chatbot(backend, **store_options):
+    store = WriteBehindConversationStore(backend, **store_options)
+    return AdvancedChatbot(user_states=InMemoryUserStateStore(), conversation_store=store)
+
+
+def test_history_survives_restart():
+    backend = SQLiteConversationBackend(":memory:")
+    chatbot = make_chatbot(backend, flush_interval=60)
+    chatbot.get_personalized_response("persisted", "college admission")
+    chatbot.get_personalized_response("persisted", "engineering college")
+    assert chatbot.conversation_store.flush() == 2
+
+    restarted = make_chatbot(backend, flush_interval=60)
+    result = restarted.get_personalized_response("persisted", "engineering college in Jammu")
+    assert result["context_aware"] is True
+    assert restarted.get_user_insights("persisted")["total_interactions"] == 3
+
+
+def test_unflushed_turns_are_visible_to_reads():
+    backend = SQLiteConversationBackend(":memory:")
+    chatbot = make_chatbot(backend, flush_interval=60, max_batch=1000)
+    chatbot.get_personalized_response("pending", "scholarship")
+    assert chatbot.conversation_store.stats()["queue_depth"] == 1
+
+    chatbot.user_states.remove("pending")
+    assert chatbot.get_user_insights("pending")["total_interactions"] == 1
+
+
+def test_size_threshold_triggers_background_flush():
+    backend = SQLiteConversationBackend(":memory:")
+    chatbot = make_chatbot(backend, flush_interval=60, max_batch=3)
+    for _ in range(3):
+        chatbot.get_personalized_response("bulk", "hello")
+    chatbot.close()
+    stats = chatbot.conversation_store.stats()
+    assert stats["flushed_rows"] == 3
+    assert stats["queue_depth"] == 0
+    assert stats["flushes"] >= 1
+
+
+class CountingBackend(SQLiteConversationBackend):
+    def __init__(self):
+        super().__init__(":memory:")
+        self.loads = 0
+
+    def load_recent(self, user_id, limit):
+        self.loads += 1
+        return super().load_recent(user_id, limit)
+
+
+def test_users_without_history_are_looked_up_once():
+    backend = CountingBackend()
+    chatbot = make_chatbot(backend, flush_interval=60)
+    for _ in range(3):
+        chatbot.get_user_insights("stranger")
+    assert backend.loads == 1
+
+    # Recording a turn forgets the miss
+    store = chatbot.conversation_store
+    store.record("stranger", Interaction.create("hi", "Hello", "greeting", "neutral", 0.9))
+    assert len(store.load_recent("stranger", 10)) == 1
+    assert backend.loads == 2
+
+
+def test_in_flight_rows_already_written_are_not_duplicated(monkeypatch):
+    backend = SQLiteConversationBackend(":memory:")
+    chatbot = make_chatbot(backend, flush_interval=60)
+    chatbot.get_personalized_response("racer", "hello")
+    store = chatbot.conversation_store
+    seen = []
+    insert_many = backend.insert_many
+
+    def insert_then_read(rows):
+        insert_many(rows)
+        # The rows are committed but still in flight
+        seen.append(store.load_recent("racer", 10))
+
+    monkeypatch.setattr(backend, "insert_many", insert_then_read)
+    assert store.flush() == 1
+    assert len(seen[0]) == 1
+    assert store.stats()["unwritten_users"] == 0
+
+
+def test_failed_flush_keeps_rows_indexed(monkeypatch):
+    backend = SQLiteConversationBackend(":memory:")
+    chatbot = make_chatbot(backend, flush_interval=60, max_queue=2)
+
+    def failing(rows):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(backend, "insert_many", failing)
+    for message in ["hello", "scholarship", "college"]:
+        chatbot.get_personalized_response("flaky", message)
+    assert chatbot.conversation_store.flush() == 0
+    recent = chatbot.conversation_store.load_recent("flaky", 10)
+    assert [turn.user_message for turn in recent] == ["scholarship", "college"]
+    assert chatbot.conversation_store.stats()["dropped_rows"] == 1
@@ -0,0 +1,51 @@
+import pytest
+from sqlalchemy import text
+
+import database as db
+from engine_profiles import engine_options, make_engine
+
+
+def pragma(engine, name):
+    with engine.connect() as connection:
+        return connection.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def test_tuned_sqlite_profile_applies_pragmas_and_pool(tmp_path):
+    engine, metrics = make_engine(f"sqlite:///{tmp_path / 'tuned.db'}", profile="tuned")
+    assert pragma(engine, "journal_mode") == "wal"
+    assert pragma(engine, "synchronous") == 1  # NORMAL
+    assert pragma(engine, "cache_size") == -16384
+    assert pragma(engine, "busy_timeout") == 5000
+    assert engine.pool.size() == 5
+    stats = metrics.stats()
+    assert (stats["pool"], stats["connects"], stats["checkouts"]) == ("QueuePool", 1, 4)
+    assert stats["checkedout"] == 0 and stats["checkedin"] == 1
+    engine.dispose()
+
+
+def test_default_profile_keeps_driver_defaults(tmp_path):
+    engine, _ = make_engine(f"sqlite:///{tmp_path / 'default.db'}", profile="default")
+    assert pragma(engine, "journal_mode") == "delete"
+    assert pragma(engine, "synchronous") == 2  # FULL
+    engine.dispose()
+    with pytest.raises(ValueError):
+        engine_options("sqlite://", profile="fast")
+
+
+def test_server_profiles_size_pool_and_set_statement_timeout():
+    options = engine_options("postgresql://app@db/career", profile="tuned")
+    assert options["connect_args"] == {"options": "-c statement_timeout=30000"}
+    assert (options["pool_size"], options["max_overflow"], options["pool_pre_ping"], options["pool_recycle"]) == (
+        5, 10, True, 1800)
+    async_options = engine_options("postgresql+asyncpg://app@db/career", profile="tuned", is_async=True)
+    assert async_options["connect_args"] == {"server_settings": {"statement_timeout": "30000"}}
+    assert engine_options("mysql+pymysql://app@db/career")["connect_args"] == {
+        "init_command": "SET SESSION max_execution_time=30000"}
+    assert "pool_size" not in engine_options("sqlite://", profile="tuned")
+    assert engine_options("postgresql://app@db/career", profile="default") == {"connect_args": {}}
+
+
+def test_pool_stats_reports_app_engines():
+    stats = db.pool_stats()
+    assert stats["profile"] == "tuned"
+    assert {"connects", "checkouts", "invalidations", "checkedout"} <= set(stats["sync"])
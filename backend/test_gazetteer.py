@@ -0,0 +1,53 @@
+from gazetteer import COLLEGE, COURSE, DISTRICT, EntitySpan, Gazetteer
+
+
+def make_gazetteer():
+    gazetteer = Gazetteer()
+    gazetteer.add_all(["Jammu", "Srinagar", "Anantnag"], DISTRICT)
+    gazetteer.add_all(["University of Jammu", "NIT Srinagar"], COLLEGE)
+    gazetteer.add_all(["B.Tech", "B.Tech CSE", "BA"], COURSE)
+    return gazetteer
+
+
+def test_typed_leftmost_longest_spans():
+    text = "Does the University of Jammu offer B.Tech CSE, or BA in Srinagar?"
+    spans = make_gazetteer().extract(text)
+    assert spans == [
+        EntitySpan(9, 28, COLLEGE, "University of Jammu"),
+        EntitySpan(35, 45, COURSE, "B.Tech CSE"),
+        EntitySpan(50, 52, COURSE, "BA"),
+        EntitySpan(56, 64, DISTRICT, "Srinagar"),
+    ]
+    assert [text[span.start:span.end] for span in spans] == ["University of Jammu", "B.Tech CSE", "BA", "Srinagar"]
+
+
+def test_whole_words_only():
+    gazetteer = make_gazetteer()
+    assert gazetteer.extract("bandipora, jammutawi, b.technology") == []
+    # Falls back to the longest name that does end on a boundary
+    assert gazetteer.extract("university of jammu's b.tech") == [
+        EntitySpan(0, 19, COLLEGE, "University of Jammu"), EntitySpan(22, 28, COURSE, "B.Tech")]
+
+
+def test_incremental_adds_and_several_kinds():
+    gazetteer = make_gazetteer()
+    terms = len(gazetteer)
+    gazetteer.add("Anantnag", COLLEGE, "Anantnag")
+    gazetteer.add("  Government  Degree College  ", COLLEGE)
+    assert len(gazetteer) == terms + 1
+    assert gazetteer.extract("government degree college in ANANTNAG") == [
+        EntitySpan(0, 25, COLLEGE, "  Government  Degree College  "),
+        EntitySpan(29, 37, DISTRICT, "Anantnag"),
+        EntitySpan(29, 37, COLLEGE, "Anantnag"),
+    ]
+
+
+def test_whitespace_runs_match_a_single_space():
+    gazetteer = make_gazetteer()
+    gazetteer.add("Government College of Engineering", COLLEGE)
+    assert gazetteer.extract("government  college of\nengineering") == [
+        EntitySpan(0, 34, COLLEGE, "Government College of Engineering")]
+    assert gazetteer.extract("nit \t srinagar, jammu") == [
+        EntitySpan(0, 14, COLLEGE, "NIT Srinagar"), EntitySpan(16, 21, DISTRICT, "Jammu")]
+    # A name still ends before trailing whitespace
+    assert gazetteer.extract("in  jammu  ") == [EntitySpan(4, 9, DISTRICT, "Jammu")]
@@ -0,0 +1,64 @@
+import re
+import pytest
+from advanced_chatbot import AdvancedChatbot
+from intent_engine import IntentEngine, KeywordAutomaton
+
+chatbot = AdvancedChatbot()
+
+MESSAGES = [
+    "Hello, how are you?",
+    "I want to know about engineering colleges in Srinagar",
+    "What scholarships are available? The fee is too EXPENSIVE",
+    "I'm stressed and confused, please help me decide my career",
+    "help",
+    "helpful hints",
+    "I don't know what should i do",
+    "need-based grants vs merit",
+    "hı there, what does the coſt look like?",
+    "likely disliked unhappy",
+    "",
+    "tell me more",
+]
+
+
+def reference_confidence(text, intent):
+    """The per-pattern regex implementation the intent engine replaced"""
+    patterns = chatbot.intent_patterns[intent]['patterns']
+    matches = sum(1 for pattern in patterns if re.search(pattern, text.lower(), re.IGNORECASE))
+    base_confidence = matches / len(patterns)
+    if matches > 1:
+        base_confidence *= 1.2
+    return min(base_confidence * chatbot.intent_patterns[intent]['weight'], 1.0)
+
+
+def reference_emotion(text):
+    scores = {emotion: sum(1 for keyword in keywords if keyword in text.lower())
+              for emotion, keywords in chatbot.emotion_keywords.items()}
+    if max(scores.values()) == 0:
+        return 'neutral'
+    return max(scores, key=scores.get)
+
+
+@pytest.mark.parametrize("message", MESSAGES)
+def test_intent_engine_matches_regex_reference(message):
+    for intent in chatbot.intent_patterns:
+        assert chatbot.calculate_intent_confidence(message, intent) == reference_confidence(message, intent)
+    assert chatbot.detect_emotion(message) == reference_emotion(message)
+
+
+def test_non_literal_patterns_fall_back_to_regex():
+    engine = IntentEngine(
+        {'numbers': {'patterns': [r'\b\d+ marks\b', r'\b(score|grade)\b'], 'weight': 1.0}},
+        {'neutral': ['okay']},
+    )
+    scan = engine.scan("I got 95 marks, is that a good grade?")
+    assert scan.intent_matches == {'numbers': 2}
+    assert scan.emotion_scores == {'neutral': 0}
+
+
+def test_keyword_automaton_reports_overlapping_matches():
+    automaton = KeywordAutomaton()
+    for keyword in ["he", "she", "hers", "his"]:
+        automaton.add(keyword, keyword)
+    matches = sorted(automaton.iter_matches("ushers"))
+    assert matches == [(1, 4, "she"), (2, 4, "he"), (2, 6, "hers")]
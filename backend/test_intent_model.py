@@ -0,0 +1,88 @@
+import logging
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from advanced_chatbot import AdvancedChatbot, load_intent_model
+from intent_model import IntentModel, hashed_features, read_examples, train
+from user_state import InMemoryUserStateStore
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_examples.jsonl")
+
+
+@pytest.fixture(scope="module")
+def model():
+    messages, intents = zip(*read_examples(EXAMPLES))
+    return train(messages, intents, n_bits=16)
+
+
+def test_features_are_stable_across_processes():
+    # crc32, not the per-process salted hash()
+    assert hashed_features("Hi", 18) == {211338: 1, 94489: 1, 611: 1}  # "hi", "<hi", "hi>"
+    assert hashed_features("!!!", 18) == {}
+
+
+def test_save_and_memory_map(model, tmp_path):
+    path = tmp_path / "intent.bin"
+    model.save(str(path))
+    loaded = IntentModel.load(str(path))
+    assert isinstance(loaded.weights, np.memmap) and loaded.weights.dtype == np.float16
+    assert loaded.classes == ["career_guidance", "colleges", "emotional_support", "greeting", "scholarships"]
+    messages = ["i need help choosing a university", "good morning", "", "my exams make me so anxious"]
+    np.testing.assert_allclose(loaded.predict_proba(messages), model.predict_proba(messages), atol=1e-3)
+    # Small enough to ship: only trained features are stored
+    assert os.path.getsize(path) < 100_000
+
+    path.write_bytes(b"not a model")
+    with pytest.raises(ValueError):
+        IntentModel.load(str(path))
+
+
+def test_batch_scores_match_single_messages(model):
+    messages = ["which colleges offer mba", "scholarship for girls", "hey", "what career suits me", "zzz"]
+    batch = model.predict(messages)
+    assert batch == [model.predict([message])[0] for message in messages]
+    assert [intent for intent, _ in batch[:4]] == ["colleges", "scholarships", "greeting", "career_guidance"]
+    assert model.predict([]) == []
+
+
+def test_confident_model_overrides_patterns_and_falls_back_otherwise(model):
+    patterns_only = AdvancedChatbot(user_states=InMemoryUserStateStore())
+    hybrid = AdvancedChatbot(user_states=InMemoryUserStateStore(), intent_model=model, intent_model_threshold=0.6)
+    # "help" alone makes the patterns pick emotional support
+    assert patterns_only.detect_intent_advanced("i need help choosing a university")[0] == "emotional_support"
+    intent, confidence = hybrid.detect_intent_advanced("i need help choosing a university")
+    assert intent == "colleges" and confidence >= 0.6
+    # Gibberish is below the threshold, so the patterns answer
+    assert hybrid.detect_intent_advanced("xyz") == patterns_only.detect_intent_advanced("xyz")
+    stats = hybrid.stats()["intent_model"]
+    assert (stats["decisions"], stats["fallbacks"]) == (1, 1)
+
+
+def test_batch_responses_score_each_chunk_once(model, monkeypatch):
+    chatbot = AdvancedChatbot(user_states=InMemoryUserStateStore(), intent_model=model)
+    calls = []
+    predict = model.predict
+    monkeypatch.setattr(model, "predict", lambda texts: calls.append(len(texts)) or predict(texts))
+    results = chatbot.get_personalized_responses([("a", "hello"), ("b", "scholarships for girls"), ("a", "thanks")])
+    assert calls == [3]
+    assert [result["intent"] for result in results[:2]] == ["greeting", "scholarships"]
+    assert results[2]["context_aware"] is True
+
+
+def test_model_with_unknown_intents_is_rejected(model, tmp_path, caplog):
+    unknown = train(["hello", "bye"], ["greeting", "farewell"], n_bits=8, epochs=5)
+    with pytest.raises(ValueError, match="farewell"):
+        AdvancedChatbot(user_states=InMemoryUserStateStore(), intent_model=unknown)
+    # A deployed file like that falls back to the patterns instead of failing every chat
+    known_intents = AdvancedChatbot(user_states=InMemoryUserStateStore()).intent_patterns
+    path = tmp_path / "intent.bin"
+    unknown.save(str(path))
+    settings = SimpleNamespace(CHATBOT_INTENT_MODEL_PATH=str(path))
+    with caplog.at_level(logging.ERROR, logger="advanced_chatbot"):
+        assert load_intent_model(settings, known_intents) is None
+    assert "farewell" in caplog.text
+    model.save(str(path))
+    assert load_intent_model(settings, known_intents).classes == model.classes
@@ -1,8 +1,12 @@
+import json
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+import auth
 import database as db
+import main
 from main import app
 from config import settings
 
@@ -10,6 +14,8 @@ from config import settings
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+db.Base.metadata.drop_all(bind=engine)
+db.Base.metadata.create_all(bind=engine)
 
 def override_get_db():
     try:
@@ -18,10 +24,26 @@ def override_get_db():
     finally:
         database.close()
 
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db")
+AsyncTestingSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+async def override_get_async_db():
+    async with AsyncTestingSessionLocal() as session:
+        yield session
+
 app.dependency_overrides[db.get_db] = override_get_db
+app.dependency_overrides[db.get_async_db] = override_get_async_db
 
 client = TestClient(app)
 
+@pytest.fixture(autouse=True)
+def answer_sessions():
+    """Point the chatbot's database answers at the test database, then restore them"""
+    previous = main.chatbot_answers.session_factory
+    main.chatbot_answers.session_factory = TestingSessionLocal
+    yield
+    main.chatbot_answers.session_factory = previous
+
 def test_read_root():
     response = client.get("/")
     assert response.status_code == 200
@@ -57,5 +79,53 @@ def test_register_user():
     assert data["username"] == "testuser"
     assert data["email"] == "test@example.com"
 
+def test_chatbot_batch_preserves_order_and_context():
+    batch = {
+        "messages": [
+            {"user_id": "batch-a", "message": "Tell me about college admission"},
+            {"user_id": "batch-b", "message": ""},
+            {"user_id": "batch-a", "message": "engineering college in Jammu"},
+        ]
+    }
+    response = client.post("/api/chatbot/batch", json=batch)
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert len(results) == 3
+    assert results[0]["intent"] == "colleges"
+    assert results[0]["context_aware"] is False
+    assert results[1]["intent"] == "general_info"
+    assert results[2]["context_aware"] is True
+
+def test_chatbot_batch_streams_ndjson():
+    batch = {"messages": [{"user_id": "stream", "message": "hello"}, {"user_id": "stream", "message": "scholarship"}]}
+    response = client.post("/api/chatbot/batch?stream=true", json=batch)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["intent"] for line in lines] == ["greeting", "scholarships"]
+
+def test_chatbot_insights_single_and_bulk():
+    for message in ["hello", "college admission", "engineering college"]:
+        client.post("/api/chatbot", json={"user_id": "insights-a", "message": message})
+    response = client.get("/api/chatbot/insights/insights-a")
+    assert response.status_code == 200
+    assert response.json()["top_interests"][0] == ["colleges", 2]
+
+    response = client.get("/api/chatbot/insights?user_ids=insights-a,unknown-user")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["insights-a"]["total_interactions"] == 3
+    assert data["unknown-user"] == {"message": "No data available yet"}
+
+def test_chatbot_state_stats_requires_admin():
+    assert client.get("/api/admin/chatbot/state").status_code == 401
+    app.dependency_overrides[auth.get_current_admin] = lambda: db.User(username="admin", role="admin")
+    try:
+        response = client.get("/api/admin/chatbot/state")
+    finally:
+        del app.dependency_overrides[auth.get_current_admin]
+    assert response.status_code == 200
+    assert {"users", "resident_bytes", "hits", "evictions"} <= set(response.json()["user_state"])
+
 if __name__ == "__main__":
     pytest.main([__file__])
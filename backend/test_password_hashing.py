@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import auth
+import database as db
+from main import app
+from password_hashing import HasherBusy, PasswordHasher, crypt_context
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def hasher(monkeypatch):
+    """A cheap in-threadpool hasher standing in for auth.password_hasher"""
+    hasher = PasswordHasher(rounds=5, workers=0, max_queue=2)
+    monkeypatch.setattr(auth, "password_hasher", hasher)
+    return hasher
+
+
+def test_process_pool_hashes_and_verifies():
+    hasher = PasswordHasher(rounds=4, workers=1)
+    try:
+        hashed = asyncio.run(hasher.hash("s3cret"))
+        assert hashed.startswith("$2b$04$")
+        assert asyncio.run(hasher.verify_and_update("s3cret", hashed)) == (True, None)
+        assert asyncio.run(hasher.verify_and_update("wrong", hashed)) == (False, None)
+    finally:
+        hasher.close()
+    assert hasher.stats()["completed"] == 3
+
+
+def test_hash_many_waits_for_capacity_and_keeps_order():
+    hasher = PasswordHasher(rounds=4, workers=0, max_queue=0)
+    passwords = [f"pw{n}" for n in range(20)]
+    hashes = asyncio.run(hasher.hash_many(passwords, per_task=3))
+    assert [hasher.context.verify(password, hashed) for password, hashed in zip(passwords, hashes)] == [True] * 20
+    assert hasher.stats()["completed"] == 20 and hasher.stats()["rejected"] == 0
+
+
+def test_rehash_when_parameters_change():
+    old_hash = crypt_context(4).hash("s3cret")
+    verified, new_hash = asyncio.run(PasswordHasher(rounds=5, workers=0).verify_and_update("s3cret", old_hash))
+    assert verified and new_hash.startswith("$2b$05$")
+
+
+def test_full_backlog_is_rejected():
+    hasher = PasswordHasher(rounds=6, workers=0, max_queue=1)
+
+    async def burst():
+        return await asyncio.gather(*(hasher.hash("s3cret") for _ in range(4)), return_exceptions=True)
+
+    results = asyncio.run(burst())
+    rejected = [result for result in results if isinstance(result, HasherBusy)]
+    assert len(rejected) == 2 and rejected[0].retry_after >= 1
+    assert hasher.stats()["rejected"] == 2 and hasher.stats()["pending"] == 0
+
+
+def test_login_rehashes_outdated_password(test_db, hasher):
+    session = test_db()
+    session.add(db.User(username="asha", email="asha@example.com", full_name="Asha",
+                        hashed_password=crypt_context(4).hash("s3cret")))
+    session.commit()
+    session.close()
+
+    assert client.post("/api/token", data={"username": "asha", "password": "wrong"}).status_code == 401
+    response = client.post("/api/token", data={"username": "asha", "password": "s3cret"})
+    assert response.status_code == 200 and response.json()["token_type"] == "bearer"
+    session = test_db()
+    assert session.query(db.User).filter(db.User.username == "asha").one().hashed_password.startswith("$2b$05$")
+    session.close()
+    assert hasher.stats()["rehashed"] == 1
+
+
+def test_busy_hasher_returns_503(test_db, hasher, monkeypatch):
+    user = {"username": "asha", "email": "asha@example.com", "password": "s3cret", "full_name": "Asha"}
+    assert client.post("/api/users/", json=user).status_code == 201
+
+    monkeypatch.setattr(hasher, "_pending", hasher.capacity)
+    other = dict(user, username="ravi", email="ravi@example.com")
+    for response in (client.post("/api/users/", json=other),
+                     client.post("/api/token", data={"username": "asha", "password": "s3cret"})):
+        assert response.status_code == 503
+        assert int(response.headers["Retry-After"]) >= 1
+
+    monkeypatch.setattr(hasher, "_pending", 0)
+    assert client.post("/api/token", data={"username": "asha", "password": "s3cret"}).status_code == 200
+
+
+def test_closed_hasher_rejects_until_restarted():
+    hasher = PasswordHasher(rounds=4, workers=1)
+    hasher.close()
+    with pytest.raises(HasherBusy):
+        asyncio.run(hasher.hash("s3cret"))
+    assert hasher.stats()["rejected"] == 1 and hasher.stats()["pending"] == 0
+    hasher.start()
+    try:
+        assert asyncio.run(hasher.hash("s3cret")).startswith("$2b$04$")
+    finally:
+        hasher.close()
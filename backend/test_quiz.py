@@ -0,0 +1,115 @@
+import numpy as np
+from fastapi.testclient import TestClient
+
+import auth
+import database as db
+from aptitude_quiz import CAREER_PROFILES, CareerProfile, QuizEngine, RecommendationStore, aptitude_areas
+from cache import TTLCache
+from main import app
+
+client = TestClient(app)
+
+MATHS = {"q1": "a", "q4": "a", "q7": "a", "q10": "a"}
+CREATIVE = {"q2": "b", "q4": "d", "q5": "c", "q8": "c", "q10": "c"}
+LEADER = {"q2": "a", "q5": "d", "q6": "d", "q8": "d", "q10": "d"}
+
+
+def test_traits_map_onto_aptitude_areas():
+    engine = QuizEngine()
+    result = engine.score(MATHS)
+    assert list(result["traits"]) == list(aptitude_areas())
+    assert result["top_areas"][0] == "Mathematical and Analytical Ability"
+    assert all(0 <= score <= 1 for score in result["traits"].values())
+    assert engine.score({})["traits"] == dict.fromkeys(aptitude_areas(), 0.0)
+
+
+def test_recommendations_match_profile():
+    engine = QuizEngine()
+    assert engine.score(CREATIVE)["recommendations"][0]["category"] == "Design"
+    leader = engine.score(LEADER, top_k=3)["recommendations"]
+    assert len(leader) == 3 and leader[0]["career"] in ("Defence Services", "Business Administration (MBA)")
+    assert [item["score"] for item in leader] == sorted((item["score"] for item in leader), reverse=True)
+
+
+def test_batch_matches_individual_scoring():
+    engine = QuizEngine()
+    cohort = [MATHS, CREATIVE, LEADER, {}]
+    assert engine.score_batch(cohort) == [engine.score(answers) for answers in cohort]
+    assert engine.score_batch([]) == []
+
+
+def test_loop_reference_agrees_with_matrix_product():
+    engine = QuizEngine()
+    traits = engine.traits(engine.encode_answers(LEADER))
+    expected = [
+        np.dot(traits, career.weights) / (np.linalg.norm(traits) * np.linalg.norm(career.weights))
+        for career in CAREER_PROFILES
+    ]
+    best = max(range(len(expected)), key=expected.__getitem__)
+    ids, scores = engine.recommend(traits[None, :], 1)
+    assert ids[0, 0] == best and np.isclose(scores[0, 0], expected[best])
+
+
+def test_set_careers_replaces_catalog():
+    engine = QuizEngine()
+    version = engine.catalog_version
+    engine.set_careers([CareerProfile("Poet", "Arts", "Writes poems", (0, 5, 0, 1, 0))])
+    assert engine.catalog_version == version + 1
+    assert [item["career"] for item in engine.score(MATHS)["recommendations"]] == ["Poet"]
+
+
+def test_quiz_endpoints():
+    questions = client.get("/api/quiz/questions").json()
+    assert questions[0]["id"] == "q1" and {"id", "text"} == set(questions[0]["options"][0])
+
+    result = client.post("/api/quiz/results", json={"user_id": "u1", "answers": MATHS}).json()
+    assert result["top_areas"][0] == "Mathematical and Analytical Ability"
+    assert len(result["recommendations"]) == 5
+
+    batch = client.post("/api/quiz/results/batch?top_k=2",
+                        json={"students": [{"answers": CREATIVE}, {"answers": LEADER}]}).json()
+    assert [len(item["recommendations"]) for item in batch["results"]] == [2, 2]
+    assert batch["results"][0]["recommendations"][0]["category"] == "Design"
+
+    assert client.post("/api/quiz/results", json={"answers": {"q99": "a"}}).status_code == 400
+    assert client.post("/api/quiz/results", json={"answers": {"q1": "z"}}).status_code == 400
+
+
+class RecordingStore(RecommendationStore):
+    name = "recording"
+
+    def __init__(self):
+        self.entries = []
+
+    def save_many(self, entries):
+        self.entries.extend(entries)
+
+
+def test_recommendation_cache_by_quantized_profile():
+    store = RecordingStore()
+    engine = QuizEngine(cache=TTLCache(maxsize=2), store=store)
+    cohort = [MATHS, MATHS, CREATIVE, dict(MATHS)]
+    results = engine.score_batch(cohort)
+    assert results[0]["recommendations"] == results[3]["recommendations"]
+    assert engine.cache.stats()["misses"] == 2 and len(store.entries) == 2
+    assert store.entries[0]["catalog_version"] == engine.catalog_version
+
+    engine.score(MATHS)
+    engine.score(LEADER)
+    stats = engine.stats()
+    assert stats["cache"]["hits"] == 1 and stats["cache"]["evictions"] == 1
+    assert stats["store"] == {"backend": "recording", "writes": 3, "failures": 0}
+
+    engine.set_careers([CareerProfile("Poet", "Arts", "Writes poems", (0, 5, 0, 1, 0))])
+    assert engine.cache.stats()["size"] == 0
+    assert [item["career"] for item in engine.score(MATHS)["recommendations"]] == ["Poet"]
+
+
+def test_quiz_cache_stats_requires_admin():
+    assert client.get("/api/admin/quiz/cache").status_code == 401
+    app.dependency_overrides[auth.get_current_admin] = lambda: db.User(username="admin", role="admin")
+    try:
+        stats = client.get("/api/admin/quiz/cache").json()
+    finally:
+        del app.dependency_overrides[auth.get_current_admin]
+    assert {"hits", "misses", "evictions"} <= set(stats["cache"])
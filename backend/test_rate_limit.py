@@ -0,0 +1,145 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import auth
+import main
+import rate_limit
+from rate_limit import IP, USER_ID, USERNAME_IP, InMemoryBucketStore, RateLimitRule, SQLiteBucketStore
+
+client = TestClient(main.app)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock)
+    monkeypatch.setattr(rate_limit.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def rules(monkeypatch, test_db):
+    """Swap the app's rules for tight ones, with empty buckets and counters"""
+    def use(*rules):
+        monkeypatch.setattr(main.rate_limiter, "rules", list(rules))
+        main.rate_limiter.reset()
+    yield use
+    main.rate_limiter.reset()
+
+
+def test_bucket_allows_burst_then_refills(clock):
+    store = InMemoryBucketStore()
+    assert [store.take("k", capacity=3, rate=1) for _ in range(3)] == [0, 0, 0]
+    assert store.take("k", capacity=3, rate=1) == pytest.approx(1.0)
+    clock.now += 0.5
+    assert store.take("k", capacity=3, rate=1) == pytest.approx(0.5)
+    clock.now += 0.5
+    assert store.take("k", capacity=3, rate=1) == 0
+    # Another key has its own bucket
+    assert store.take("other", capacity=3, rate=1) == 0
+
+
+def test_refilled_buckets_expire_lazily_and_keys_are_capped(clock):
+    store = InMemoryBucketStore(max_keys=3)
+    store.take("idle", capacity=2, rate=1)
+    clock.now += 1  # "idle" is full again
+    store.take("busy", capacity=2, rate=1)
+    assert "idle" not in store._buckets
+    assert store.stats()["expirations"] == 1
+    for n in range(5):
+        store.take(f"flood-{n}", capacity=2, rate=1)
+    assert len(store) == 3
+    assert store.stats()["evictions"] == 3
+
+
+def test_sqlite_buckets_are_shared_between_workers(tmp_path, clock):
+    path = str(tmp_path / "buckets.db")
+    first, second = SQLiteBucketStore(path), SQLiteBucketStore(path)
+    assert first.take("k", capacity=2, rate=1) == 0
+    assert second.take("k", capacity=2, rate=1) == 0
+    assert first.take("k", capacity=2, rate=1) == pytest.approx(1.0)
+    clock.now += 10
+    assert second.purge_expired() == 1
+    assert first.stats()["keys"] == 0
+
+
+def test_chatbot_limited_per_user_id_with_retry_after(rules):
+    rules(RateLimitRule("chatbot_user", USER_ID, 60, 2, ("/api/chatbot",), ("POST",)))
+    for _ in range(2):
+        response = client.post("/api/chatbot", json={"user_id": "spammer", "message": "hello"})
+        assert response.status_code == 200 and response.json()["intent"] == "greeting"
+    response = client.post("/api/chatbot", json={"user_id": "spammer", "message": "hello"})
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "1"
+    assert client.post("/api/chatbot", json={"user_id": "someone-else", "message": "hello"}).status_code == 200
+    stats = main.rate_limiter.stats()["rules"]["chatbot_user"]
+    assert (stats["allowed"], stats["limited"]) == (3, 1)
+
+
+@pytest.fixture
+def login_attempts(rules, monkeypatch):
+    """Tight login rules; yields the usernames that reached password checking"""
+    rules(RateLimitRule("login_ip", IP, 60, 100, ("/api/token",), ("POST",)),
+          RateLimitRule("login_username", USERNAME_IP, 1, 1, ("/api/token",), ("POST",)))
+    monkeypatch.setattr(main.rate_limiter, "trust_forwarded_for", True)
+    calls = []
+
+    async def authenticate(db_session, username, password):
+        calls.append(username)
+        return None
+
+    monkeypatch.setattr(auth, "authenticate_user", authenticate)
+    return calls
+
+
+def test_login_limited_per_username_and_ip_before_hashing(login_attempts):
+    assert client.post("/api/token", data={"username": "Asha", "password": "x"}).status_code == 401
+    response = client.post("/api/token", data={"username": "asha", "password": "y"})
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) == 60
+    # Multipart bodies are keyed the same way
+    multipart = {"username": (None, "asha"), "password": (None, "z")}
+    assert client.post("/api/token", files=multipart).status_code == 429
+    assert login_attempts == ["Asha"]
+    # The same username from another address isn't locked out
+    other_ip = {"x-forwarded-for": "10.0.0.2"}
+    assert client.post("/api/token", data={"username": "asha", "password": "x"}, headers=other_ip).status_code == 401
+    assert client.post("/api/token", data={"username": "ravi", "password": "x"}).status_code == 401
+
+
+def test_unreadable_bodies_are_rejected_not_passed(login_attempts):
+    padded = {"username": "asha", "password": "x", "padding": "x" * rate_limit.MAX_KEY_BODY_BYTES}
+    assert client.post("/api/token", data=padded).status_code == 413
+    no_boundary = {"content-type": "multipart/form-data"}
+    assert client.post("/api/token", content=b"username=asha", headers=no_boundary).status_code == 400
+    assert login_attempts == []
+
+
+def test_batches_have_their_own_smaller_budget(rules):
+    rules(*main.rate_limiter.rules)  # the configured rules, emptied before and after
+    batch = {"messages": [{"user_id": f"user-{n}", "message": "hello"} for n in range(50)]}
+    for _ in range(main.settings.RATE_LIMIT_CHATBOT_BATCH_IP_BURST):
+        assert client.post("/api/chatbot/batch", json=batch).status_code == 200
+    response = client.post("/api/chatbot/batch", json=batch)
+    assert response.status_code == 429 and response.headers["x-ratelimit-rule"] == "chatbot_batch_ip"
+    assert client.post("/api/chatbot", json={"message": "hello"}).status_code == 200
+
+
+def test_unmatched_routes_and_store_failures_pass_through(rules, monkeypatch):
+    rules(RateLimitRule("chatbot_ip", IP, 60, 1, ("/api/chatbot",), ("POST",)))
+    assert all(client.get("/").status_code == 200 for _ in range(3))
+
+    def broken(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(main.rate_limiter.store, "take", broken)
+    assert client.post("/api/chatbot", json={"message": "hello"}).status_code == 200
+    assert main.rate_limiter.stats()["store_errors"] == 1
@@ -0,0 +1,106 @@
+import datetime
+
+from fastapi.testclient import TestClient
+
+import auth
+import database as db
+from main import app
+from scholarship_matching import EligibilityCriteria, ScholarshipIndex, parse_eligibility
+
+client = TestClient(app)
+
+NOW = datetime.datetime(2026, 1, 1)
+SOON = NOW + datetime.timedelta(days=30)
+LATER = NOW + datetime.timedelta(days=90)
+
+
+def bearer(username):
+    return {"Authorization": f"Bearer {auth.create_access_token({'sub': username})}"}
+
+
+def test_parse_eligibility():
+    assert parse_eligibility("Post-matric students of Jammu and Kashmir, family income below Rs. 2.5 lakh") == \
+        EligibilityCriteria(frozenset({"12th", "Undergraduate", "Graduate", "Postgraduate"}), frozenset(),
+                            frozenset(), 250000)
+    assert parse_eligibility("Girls from Srinagar or Budgam pursuing B.Tech") == \
+        EligibilityCriteria(frozenset({"Undergraduate"}), frozenset({"Srinagar", "Budgam"}), frozenset({"science"}))
+    assert parse_eligibility("Class 12 commerce students, annual income less than 8,00,000").max_income == 800000
+    assert parse_eligibility("Postgraduate students of social sciences").streams == frozenset({"arts"})
+    assert parse_eligibility("Open to all J&K residents") == EligibilityCriteria()
+    assert parse_eligibility(None) == EligibilityCriteria()
+
+
+def build_index():
+    index = ScholarshipIndex()
+    rows = [
+        (1, "Open Merit", "Open to all students", 10000, LATER),
+        (2, "Srinagar Engineering", "Undergraduate engineering students from Srinagar", 50000, LATER),
+        (3, "Low Income", "Family income below 2 lakh", 30000, SOON),
+        (4, "Expired", "Open to all", 90000, NOW - datetime.timedelta(days=1)),
+        (5, "Jammu Commerce", "12th commerce students of Jammu", 30000, LATER),
+        (6, "Rolling", "Undergraduate students", 30000, None),
+    ]
+    for row_id, name, eligibility, amount, deadline in rows:
+        index.index_row({"id": row_id, "name": name, "eligibility": eligibility, "amount": amount, "deadline": deadline})
+    return index
+
+
+def names(results):
+    return [row["name"] for row in results]
+
+
+def test_match_ranks_by_amount_then_deadline():
+    index = build_index()
+    assert names(index.match("Undergraduate", "Srinagar", "science", 150000, now=NOW)) == \
+        ["Srinagar Engineering", "Low Income", "Rolling", "Open Merit"]
+    assert names(index.match("Undergraduate", "Jammu", "science", 300000, now=NOW)) == ["Rolling", "Open Merit"]
+    assert names(index.match("12th", "Jammu", "commerce", now=NOW)) == ["Low Income", "Jammu Commerce", "Open Merit"]
+    assert names(index.match("12th", "Leh", now=NOW)) == ["Low Income", "Open Merit"]
+    assert names(index.match(now=NOW, limit=2)) == ["Srinagar Engineering", "Low Income"]
+
+
+def test_match_follows_updates():
+    index = build_index()
+    assert "Rolling" in names(index.match("Undergraduate", now=NOW))
+    index.index_row({"id": 6, "eligibility": "Postgraduate students"})
+    assert "Rolling" not in names(index.match("Undergraduate", now=NOW))
+    index.index_row({"id": 2, "amount": 5000})
+    assert names(index.match("Undergraduate", "Srinagar", "science", now=NOW))[-1] == "Srinagar Engineering"
+    index.remove_row(1)
+    assert "Open Merit" not in names(index.match(now=NOW))
+
+
+def test_scholarship_endpoints(test_db):
+    session = test_db()
+    session.add(db.User(username="asha", email="asha@example.com", hashed_password="x",
+                        district="Srinagar", education_level="Undergraduate"))
+    session.add(db.User(username="admin", email="admin@example.com", hashed_password="x", role="admin"))
+    future = datetime.datetime.utcnow() + datetime.timedelta(days=60)
+    session.add_all([
+        db.Scholarship(name="Srinagar Engineering", eligibility="Undergraduate engineering students from Srinagar",
+                       amount=50000, deadline=future),
+        db.Scholarship(name="Kathua Arts", eligibility="Arts students of Kathua", amount=80000, deadline=future),
+        db.Scholarship(name="Open Merit", eligibility="All students", amount=10000, deadline=future),
+    ])
+    session.commit()
+    session.close()
+
+    listing = client.get("/api/scholarships/?limit=2")
+    assert [row["id"] for row in listing.json()] == [1, 2]
+    assert listing.headers["X-Next-Cursor"] == "2"
+    assert client.get("/api/scholarships/2").json()["name"] == "Kathua Arts"
+    assert client.get("/api/scholarships/99").status_code == 404
+
+    asha = bearer("asha")
+    assert client.get("/api/scholarships/match").status_code == 401
+    matched = client.get("/api/scholarships/match", headers=asha).json()
+    assert matched["criteria"]["district"] == "Srinagar"
+    assert names(matched["results"]) == ["Srinagar Engineering", "Open Merit"]
+    assert names(client.get("/api/scholarships/match", params={"district": "Kathua", "stream": "arts"},
+                            headers=asha).json()["results"]) == ["Kathua Arts", "Open Merit"]
+    # Another user's profile is for admins only
+    assert client.get("/api/scholarships/match", params={"user": "ravi"}, headers=asha).status_code == 403
+    admin = bearer("admin")
+    assert client.get("/api/scholarships/match", params={"user": "asha"},
+                      headers=admin).json()["criteria"]["district"] == "Srinagar"
+    assert client.get("/api/scholarships/match", params={"user": "nobody"}, headers=admin).status_code == 404
@@ -0,0 +1,89 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import database as db
+from main import app
+from search_index import FTS5Index, InvertedIndex, SearchService, fts5_available, tokenize
+
+client = TestClient(app)
+
+BACKENDS = [InvertedIndex] + ([FTS5Index] if fts5_available() else [])
+
+
+@pytest.fixture(params=BACKENDS, ids=lambda backend: backend.name)
+def service(request):
+    service = SearchService(request.param())
+    service.index_row("college", {"id": 1, "name": "NIT Srinagar", "district": "Srinagar",
+                                  "description": "Engineering institute", "facilities": "Hostel, Library"})
+    service.index_row("college", {"id": 2, "name": "Government College Jammu", "district": "Jammu",
+                                  "description": "Arts and science", "facilities": "Library"})
+    service.index_row("course", {"id": 1, "name": "B.Tech Computer Science",
+                                 "description": "Engineering degree", "eligibility": "12th with PCM"})
+    service.index_row("scholarship", {"id": 1, "name": "PM Scholarship", "provider": "Government of India",
+                                      "description": "For engineering students", "eligibility": "Class 12 pass"})
+    return service
+
+
+def test_tokenize():
+    assert tokenize("Colleges with hostels in Srinagar") == ["college", "hostel", "srinagar"]
+    assert tokenize("the of and") == []
+
+
+def test_ranking_and_type_filter(service):
+    hits, has_more = service.search("engineering hostel srinagar")
+    assert hits[0].kind == "college" and hits[0].title == "NIT Srinagar"
+    assert {(hit.kind, hit.id) for hit in hits} == {("college", 1), ("course", 1), ("scholarship", 1)}
+    assert not has_more
+
+    hits, _ = service.search("engineering", kinds=["scholarship"])
+    assert [(hit.kind, hit.id) for hit in hits] == [("scholarship", 1)]
+
+
+def test_pagination(service):
+    first, has_more = service.search("engineering", limit=2)
+    assert len(first) == 2 and has_more
+    rest, has_more = service.search("engineering", limit=2, offset=2)
+    assert len(rest) == 1 and not has_more
+    assert {(hit.kind, hit.id) for hit in first + rest} == {("college", 1), ("course", 1), ("scholarship", 1)}
+
+
+def test_partial_update_and_remove(service):
+    service.index_row("college", {"id": 2, "facilities": "Hostel"})
+    hits, _ = service.search("jammu hostel")
+    assert hits[0].id == 2 and hits[0].title == "Government College Jammu"
+
+    service.remove_row("college", 1)
+    hits, _ = service.search("srinagar")
+    assert hits == []
+
+
+def test_search_endpoint_follows_commits(test_db):
+    session = test_db()
+    college = db.College(name="Kashmir University", district="Srinagar", description="Research university",
+                         facilities="Hostel, Library")
+    session.add(college)
+    session.add(db.Scholarship(name="Merit Scholarship", provider="J&K Govt", eligibility="Srinagar residents"))
+    session.commit()
+
+    response = client.get("/api/search", params={"q": "srinagar hostel"})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [(hit["kind"], hit["title"]) for hit in results] == [
+        ("college", "Kashmir University"), ("scholarship", "Merit Scholarship")]
+
+    college.name = "University of Kashmir"
+    session.commit()
+    results = client.get("/api/search", params={"q": "srinagar", "type": "college"}).json()["results"]
+    assert [hit["title"] for hit in results] == ["University of Kashmir"]
+
+    session.delete(college)
+    session.commit()
+    session.close()
+    results = client.get("/api/search", params={"q": "hostel"}).json()["results"]
+    assert results == []
+
+
+def test_search_endpoint_validation(test_db):
+    assert client.get("/api/search", params={"q": "x", "type": "teacher"}).status_code == 400
+    assert client.get("/api/search", params={"q": ""}).status_code == 422
+    assert client.get("/api/search", params={"q": "x", "offset": 5000}).status_code == 400
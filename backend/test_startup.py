@@ -0,0 +1,170 @@
+import os
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy import inspect as sa_inspect
+
+import advanced_chatbot
+import aptitude_quiz
+import database as db
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_python(code):
+    """Run `code` in a fresh interpreter from the backend directory, returning its stdout"""
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True,
+                            timeout=120)
+    assert result.returncode == 0, result.stderr
+    return result.stdout.strip()
+
+
+def test_import_is_lazy():
+    """Cold `import main` must not load motor, build a Mongo client, the chatbot or its knowledge"""
+    output = run_python(
+        "import sys\n"
+        "import main\n"
+        "import advanced_chatbot, aptitude_quiz, database\n"
+        "print('motor' in sys.modules, 'chatbot_knowledge' in sys.modules, database._mongo_db is None,\n"
+        "      advanced_chatbot.advanced_chatbot is None, aptitude_quiz.quiz_engine is None)"
+    )
+    assert output.split() == ["False", "False", "True", "True", "True"]
+
+
+def test_import_without_motor():
+    output = run_python(
+        "import sys\n"
+        "sys.modules['motor'] = None\n"
+        "import main, database\n"
+        "print(database.mongo_db, database.mongo_client)\n"
+        "try:\n"
+        "    database.chatbot_conversations_collection\n"
+        "except RuntimeError as e:\n"
+        "    print(e)\n"
+    )
+    assert output.splitlines() == [
+        "None None", "chatbot_conversations_collection needs MongoDB support; install motor"]
+
+
+def test_schema_version_check_skips_create_all(tmp_path, count_queries):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    assert not db.schema_is_current(engine)
+    assert db.migrate(engine)
+
+    with count_queries() as queries:
+        assert not db.migrate(engine)
+    assert len(queries) == 1 and queries.statements[0].lstrip().upper().startswith("SELECT")
+    engine.dispose()
+
+
+def test_schema_change_is_detected(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    db.migrate(engine)
+    monkeypatch.setattr(db, "schema_fingerprint", lambda bind=None: "changed")
+    assert not db.schema_is_current(engine)
+    assert db.migrate(engine) and db.schema_is_current(engine)
+    engine.dispose()
+
+
+def test_altered_tables_are_reported_not_recorded(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    with engine.begin() as connection:
+        # An old users table, without columns the models have since gained
+        connection.exec_driver_sql("CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR, legacy VARCHAR)")
+    with pytest.raises(db.SchemaMismatch) as raised:
+        db.migrate(engine)
+    assert "users.email is missing" in raised.value.differences
+    assert "users.legacy is not in the models" in raised.value.differences
+    assert not db.schema_is_current(engine)
+    engine.dispose()
+
+
+def test_new_index_on_existing_table_is_created(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    db.migrate(engine)
+    index = next(iter(db.College.__table__.indexes))
+    with engine.begin() as connection:
+        connection.exec_driver_sql(f"DROP INDEX {index.name}")
+        connection.exec_driver_sql("DELETE FROM schema_version")
+    assert db.migrate(engine)
+    assert index.name in {row["name"] for row in sa_inspect(engine).get_indexes("colleges")}
+    engine.dispose()
+
+
+def test_concurrent_first_chats_build_one_chatbot(monkeypatch):
+    built = []
+
+    class SlowChatbot:
+        def __init__(self, **kwargs):
+            time.sleep(0.05)
+            self.intent_patterns = {}
+            built.append(self)
+
+    monkeypatch.setattr(advanced_chatbot, "advanced_chatbot", None)
+    monkeypatch.setattr(advanced_chatbot, "AdvancedChatbot", SlowChatbot)
+    monkeypatch.setattr(advanced_chatbot, "create_conversation_store", lambda settings: None)
+    with ThreadPoolExecutor(8) as pool:
+        chatbots = list(pool.map(lambda _: advanced_chatbot.get_advanced_chatbot(), range(8)))
+    assert len(built) == 1 and all(chatbot is built[0] for chatbot in chatbots)
+
+
+def test_concurrent_first_quizzes_build_one_engine(monkeypatch):
+    built = []
+
+    def slow_engine(settings):
+        time.sleep(0.05)
+        built.append(object())
+        return built[-1]
+
+    monkeypatch.setattr(aptitude_quiz, "quiz_engine", None)
+    monkeypatch.setattr(aptitude_quiz, "create_quiz_engine", slow_engine)
+    with ThreadPoolExecutor(8) as pool:
+        engines = list(pool.map(lambda _: aptitude_quiz.get_quiz_engine(), range(8)))
+    assert len(built) == 1 and all(engine is built[0] for engine in engines)
+
+
+@pytest.mark.parametrize("auto_migrate", [True, False])
+def test_startup_respects_auto_migrate(tmp_path, auto_migrate):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'app.db'}", SCHEMA_AUTO_MIGRATE=str(auto_migrate))
+    code = "import main, database\nmain.startup_db_client()\nprint(database.schema_is_current())"
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True,
+                            env=env, timeout=120)
+    if auto_migrate:
+        assert result.stdout.strip() == "True", result.stderr
+    else:
+        # Without the migration step the tables don't exist, so startup fails loudly
+        assert "out of date" in result.stderr
+
+
+def test_missing_columns_existing_rows_can_take_are_added(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    with engine.begin() as connection:
+        # The users table as first released, before education_level and role
+        connection.exec_driver_sql(
+            "CREATE TABLE users (id INTEGER NOT NULL PRIMARY KEY, username VARCHAR, email VARCHAR, "
+            "hashed_password VARCHAR, full_name VARCHAR, district VARCHAR, is_active BOOLEAN, created_at DATETIME)")
+        connection.exec_driver_sql("INSERT INTO users (id, username) VALUES (1, 'asha')")
+    assert db.schema_differences(engine) == []
+    assert db.migrate(engine)
+    assert db.schema_is_current(engine)
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("SELECT education_level, role FROM users").all() == [(None, "student")]
+    engine.dispose()
+
+
+def test_startup_on_the_bundled_database(tmp_path):
+    path = tmp_path / "career_advisor.db"
+    shutil.copy(os.path.join(BACKEND_DIR, "career_advisor.db"), path)
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{path}")
+    code = ("from fastapi.testclient import TestClient\nimport main\n"
+            "with TestClient(main.app) as client:\n"
+            "    print(client.get('/api/colleges/').status_code,\n"
+            "          client.post('/api/token', data={'username': 'nobody', 'password': 'x'}).status_code)")
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True,
+                            env=env, timeout=120)
+    assert result.stdout.split() == ["200", "401"], result.stderr
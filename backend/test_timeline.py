@@ -0,0 +1,118 @@
+import datetime
+
+from fastapi.testclient import TestClient
+
+import auth
+import database as db
+from main import app
+from timeline_index import TimelineIndex, iter_ics
+
+client = TestClient(app)
+
+NOW = datetime.datetime(2026, 3, 1)
+
+
+def day(offset):
+    return NOW + datetime.timedelta(days=offset)
+
+
+def build_index():
+    index = TimelineIndex()
+    for event_id, title, event_type, start, end in [
+        (1, "JEE registration", "exam", day(-10), day(5)),
+        (2, "University admissions", "admission", day(2), day(40)),
+        (3, "Past exam", "exam", day(-30), day(-1)),
+        (4, "Rolling admission", "admission", day(-100), None),
+        (5, "Merit scholarship", "scholarship", None, day(10)),
+        (6, "Late exam", "exam", day(50), day(60)),
+    ]:
+        index.index_row({"id": event_id, "title": title, "event_type": event_type,
+                         "start_date": start, "end_date": end})
+    return index
+
+
+def ids(events):
+    return [event.id for event in events]
+
+
+def test_overlapping_sorted_by_closing_date():
+    index = build_index()
+    assert ids(index.overlapping(day(0), day(7))) == [1, 5, 2, 4]
+    assert ids(index.overlapping(day(0), day(7), event_type="exam")) == [1]
+    assert ids(index.overlapping(day(45), day(55))) == [6, 4]
+    assert ids(index.overlapping(day(0), limit=2)) == [1, 5]
+    assert ids(index.overlapping(day(0), event_type="webinar")) == []
+
+
+def test_closing_within():
+    index = build_index()
+    assert ids(index.closing_within(10, now=NOW)) == [1, 5]
+    assert ids(index.closing_within(60, now=NOW, event_type="exam")) == [1, 6]
+    assert ids(index.closing_within(0, now=NOW)) == []
+
+
+def test_incremental_updates():
+    index = build_index()
+    index.index_row({"id": 6, "end_date": day(3)})
+    assert ids(index.closing_within(5, now=NOW)) == [6, 1]
+    index.index_row({"id": 1, "event_type": "admission"})
+    assert ids(index.overlapping(day(0), day(7), event_type="exam")) == []
+    assert index.event_types() == ["admission", "exam", "scholarship"]
+    index.remove_row(5)
+    assert ids(index.closing_within(10, now=NOW)) == [6, 1]
+
+
+def test_untyped_events_are_listed_once():
+    index = build_index()
+    index.index_row({"id": 7, "title": "Untyped", "event_type": None, "start_date": day(1), "end_date": day(4)})
+    assert ids(index.overlapping(day(0), day(7))) == [7, 1, 5, 2, 4]
+    assert ids(index.closing_within(10, now=NOW)) == [7, 1, 5]
+    assert index.event_types() == ["admission", "exam", "scholarship"]
+    index.index_row({"id": 7, "event_type": "exam"})
+    assert ids(index.closing_within(10, now=NOW, event_type="exam")) == [7, 1]
+    index.remove_row(7)
+    assert ids(index.closing_within(10, now=NOW)) == [1, 5]
+
+
+def test_ics_escapes_and_folds_lines():
+    index = build_index()
+    index.index_row({"id": 1, "description": "Register online; fees, documents\nand photo. " * 5})
+    calendar = "".join(iter_ics(index.overlapping(day(0), day(7), event_type="exam"), "Exams"))
+    assert calendar.startswith("BEGIN:VCALENDAR\r\n") and calendar.endswith("END:VCALENDAR\r\n")
+    assert "DTSTART:20260219T000000Z\r\nDTEND:20260306T000000Z\r\nSUMMARY:JEE registration\r\n" in calendar
+    assert "Register online\\; fees\\, documents\\nand photo." in calendar.replace("\r\n ", "")
+    assert all(len(line.encode()) <= 75 for line in calendar.split("\r\n"))
+
+
+def test_timeline_endpoints(test_db):
+    now = datetime.datetime.utcnow()
+    session = test_db()
+    session.add(db.User(username="asha", email="asha@example.com", hashed_password="x",
+                        district="Srinagar", education_level="Undergraduate"))
+    session.add_all([
+        db.Timeline(title="Entrance exam", event_type="exam", start_date=now - datetime.timedelta(days=1),
+                    end_date=now + datetime.timedelta(days=3)),
+        db.Timeline(title="Admissions", event_type="admission", start_date=now,
+                    end_date=now + datetime.timedelta(days=20)),
+        db.Scholarship(name="Srinagar Merit", eligibility="Students from Srinagar", amount=1000,
+                       deadline=now + datetime.timedelta(days=10)),
+        db.Scholarship(name="Jammu Merit", eligibility="Students from Jammu", amount=1000,
+                       deadline=now + datetime.timedelta(days=5)),
+    ])
+    session.commit()
+    session.close()
+
+    events = client.get("/api/timeline/events").json()
+    assert [event["title"] for event in events] == ["Entrance exam", "Admissions"]
+    assert [event["title"] for event in client.get("/api/timeline/events?event_type=admission").json()] == ["Admissions"]
+    assert [event["title"] for event in client.get("/api/timeline/closing?days=7").json()] == ["Entrance exam"]
+
+    token = auth.create_access_token({"sub": "asha"})
+    feed = client.get("/api/timeline/me", headers={"Authorization": f"Bearer {token}"}).json()
+    assert [(item["source"], item["title"]) for item in feed] == [
+        ("timeline", "Entrance exam"), ("scholarship", "Srinagar Merit"), ("timeline", "Admissions")]
+    assert client.get("/api/timeline/me").status_code == 401
+
+    calendar = client.get("/api/timeline/events.ics?event_type=exam")
+    assert calendar.headers["content-type"].startswith("text/calendar")
+    assert calendar.text.count("BEGIN:VEVENT") == 1 and "SUMMARY:Entrance exam" in calendar.text
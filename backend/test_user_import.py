@@ -0,0 +1,96 @@
+import io
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import auth
+import database as db
+import user_import
+from config import settings
+from main import app
+from password_hashing import PasswordHasher
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def admin(test_db, monkeypatch):
+    monkeypatch.setattr(auth, "password_hasher", PasswordHasher(rounds=4, workers=0))
+    app.dependency_overrides[auth.get_current_admin] = lambda: db.User(username="admin", role="admin")
+    try:
+        yield test_db
+    finally:
+        del app.dependency_overrides[auth.get_current_admin]
+
+
+def upload(name, content, **params):
+    return client.post("/api/users/import", params=params, files={"file": (name, content.encode())})
+
+
+def test_iter_records_streams_csv_and_ndjson():
+    csv_text = "username,email,password,full_name\r\nasha,asha@example.com,pw,\"Bhat, Asha\"\r\n\r\nravi,ravi@example.com,pw,Ravi\r\n"
+    records = list(user_import.iter_records(io.BytesIO(("﻿" + csv_text).encode()), "csv", 10_000))
+    assert records == [
+        (1, {"username": "asha", "email": "asha@example.com", "password": "pw", "full_name": "Bhat, Asha"}),
+        (2, {"username": "ravi", "email": "ravi@example.com", "password": "pw", "full_name": "Ravi"}),
+    ]
+    # Lines split across read blocks
+    ndjson = '{"username": "asha"}\n\nnot json\n[1]\n{"username": "ravi"}'
+    reader = user_import._lines(io.BytesIO(ndjson.encode()), 10_000, block_size=7)
+    assert "".join(reader) == ndjson
+    records = list(user_import.iter_records(io.BytesIO(ndjson.encode()), "ndjson", 10_000))
+    assert [number for number, _ in records] == [1, 2, 3, 4]
+    assert records[1][1].startswith("invalid JSON") and records[2][1] == "each line must be a JSON object"
+    with pytest.raises(user_import.FileTooLarge):
+        list(user_import.iter_records(io.BytesIO(ndjson.encode()), "ndjson", 10))
+
+
+def test_import_reports_every_row(admin, count_queries):
+    session = admin()
+    session.add(db.User(username="taken", email="taken@example.com", hashed_password="x", full_name="Taken"))
+    session.commit()
+    session.close()
+    rows = [
+        {"username": "asha", "email": "asha@example.com", "password": "pw1", "full_name": "Asha",
+         "district": "Srinagar"},
+        {"username": "taken", "email": "new@example.com", "password": "pw", "full_name": "Dup"},
+        {"username": "ravi", "email": "not-an-email", "password": "pw", "full_name": "Ravi"},
+        {"username": "asha", "email": "asha2@example.com", "password": "pw", "full_name": "Asha again"},
+        {"username": "meera", "email": "taken@example.com", "password": "pw", "full_name": "Meera"},
+        {"username": "zoya", "email": "zoya@example.com", "password": "pw2", "full_name": "Zoya"},
+    ]
+    with count_queries() as queries:
+        response = upload("school.ndjson", "\n".join(json.dumps(row) for row in rows))
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["created"], report["duplicates"], report["invalid"]) == (2, 3, 1)
+    assert [(row["row"], row["status"]) for row in report["rows"]] == [
+        (1, "created"), (2, "duplicate"), (3, "invalid"), (4, "duplicate"), (5, "duplicate"), (6, "created")]
+    assert "email" in report["rows"][2]["detail"]
+    # One duplicate check and one executemany insert for the single chunk
+    assert sum(statement.lstrip().upper().startswith(("SELECT", "INSERT")) for statement in queries.statements) == 2
+
+    session = admin()
+    asha = session.query(db.User).filter(db.User.username == "asha").one()
+    assert asha.district == "Srinagar" and asha.is_active and asha.role == "student"
+    assert auth.pwd_context.verify("pw1", asha.hashed_password)
+    session.close()
+
+
+def test_import_in_chunks(admin, monkeypatch):
+    monkeypatch.setattr(settings, "USER_IMPORT_CHUNK_SIZE", 2)
+    lines = ["username,email,password,full_name"] + [
+        f"student{n},student{n}@example.com,pw,Student {n}" for n in range(5)] + ["student1,x@example.com,pw,Again"]
+    report = upload("school.csv", "\n".join(lines)).json()
+    assert (report["created"], report["duplicates"]) == (5, 1)
+    session = admin()
+    assert session.query(db.User).count() == 5
+    session.close()
+
+
+def test_rejects_unknown_format_and_oversized_files(admin, monkeypatch):
+    assert upload("school.xlsx", "anything").status_code == 400
+    assert upload("school.txt", '{"username": "a"}', format="ndjson").status_code == 200
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE", 10)
+    assert upload("school.csv", "username,email,password,full_name\n").status_code == 413
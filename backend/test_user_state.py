@@ -0,0 +1,137 @@
+import sqlite3
+
+from advanced_chatbot import AdvancedChatbot
+from user_state import InMemoryUserStateStore, SQLiteUserStateStore
+
+
+def test_lookups_do_not_allocate():
+    store = InMemoryUserStateStore()
+    chatbot = AdvancedChatbot(user_states=store)
+    assert chatbot.get_user_insights("nobody") == {"message": "No data available yet"}
+    chatbot.detect_intent_advanced("tell me more", "nobody")
+    assert len(store) == 0
+    assert store.stats()["misses"] == 2
+
+
+def test_lru_eviction_caps_users():
+    store = InMemoryUserStateStore(max_users=2)
+    chatbot = AdvancedChatbot(user_states=store)
+    for user_id in ["a", "b", "c"]:
+        chatbot.get_personalized_response(user_id, "hello")
+    assert "a" not in store
+    assert "b" in store and "c" in store
+    assert store.stats()["evictions"] == 1
+
+
+def test_byte_cap_and_resident_size():
+    store = InMemoryUserStateStore(max_bytes=20000)
+    chatbot = AdvancedChatbot(user_states=store)
+    for turn in range(200):
+        chatbot.get_personalized_response(f"user-{turn % 20}", "Tell me about engineering college admission")
+    stats = store.stats()
+    assert 0 < stats["resident_bytes"] <= 20000
+    assert stats["evictions"] > 0
+
+
+def test_idle_users_expire():
+    store = InMemoryUserStateStore(ttl_seconds=60)
+    state = store.get_or_create("idle")
+    state.last_access -= 120
+    assert store.get("idle") is None
+    assert store.stats()["expirations"] == 1
+
+
+def test_interactions_share_interned_strings():
+    chatbot = AdvancedChatbot(user_states=InMemoryUserStateStore())
+    for user_id in ["x", "y"]:
+        chatbot.learn_from_interaction(user_id, "hello", "Hi " + "there!", "greet" + "ing", 0.3)
+    first = chatbot.user_states.get("x").interactions[0]
+    second = chatbot.user_states.get("y").interactions[0]
+    assert first.intent is second.intent
+    assert isinstance(first.timestamp, float)
+
+
+def test_responses_count_towards_resident_size():
+    chatbot = AdvancedChatbot(user_states=InMemoryUserStateStore())
+    short = chatbot.learn_from_interaction("short", "colleges", "ok", "colleges", 0.5).size_bytes
+    # Database answers list rows, so each one is stored and counted per turn
+    answer = "Colleges in Jammu:\n" + "\n".join(f"• College {n}" for n in range(100))
+    long = chatbot.learn_from_interaction("long", "colleges", answer, "colleges", 0.5).size_bytes
+    assert long - short >= len(answer)
+
+
+def test_user_insights_from_interaction_records():
+    chatbot = AdvancedChatbot(user_states=InMemoryUserStateStore())
+    for message in ["hello", "college admission", "engineering college", "scholarship"]:
+        chatbot.get_personalized_response("insights", message)
+    insights = chatbot.get_user_insights("insights")
+    assert insights["total_interactions"] == 4
+    assert insights["top_interests"][0] == ("colleges", 2)
+    assert insights["recent_emotions"] == ["neutral"] * 4
+    assert insights["conversation_length"] == 4
+
+
+def test_intent_counts_follow_the_history_window():
+    chatbot = AdvancedChatbot(user_states=InMemoryUserStateStore())
+    chatbot.learn_from_interaction("window", "hello", "Hi!", "greeting", 0.3)
+    for turn in range(60):
+        intent = "colleges" if turn % 2 else "scholarships"
+        chatbot.learn_from_interaction("window", "msg", "ok", intent, 0.3)
+    state = chatbot.user_states.get("window")
+    assert state.intent_counts == {"scholarships": 25, "colleges": 25}
+    # Tied counts keep the order in which intents first appear in the window
+    assert state.top_intents() == [("scholarships", 25), ("colleges", 25)]
+
+
+def test_sqlite_store_shares_context_between_workers(tmp_path):
+    path = str(tmp_path / "state.db")
+    worker_a = AdvancedChatbot(user_states=SQLiteUserStateStore(path))
+    worker_b = AdvancedChatbot(user_states=SQLiteUserStateStore(path))
+
+    worker_a.get_personalized_response("shared", "college admission")
+    follow_up = worker_b.get_personalized_response("shared", "tell me more")
+    assert follow_up["intent"] == "colleges"
+    assert follow_up["context_aware"] is True
+
+    # worker_a's cached copy is stale and is reloaded from the database
+    assert worker_a.get_user_insights("shared")["total_interactions"] == 2
+    assert worker_a.user_states.stats()["reloads"] >= 1
+
+
+def test_sqlite_store_lock_serializes_a_user(tmp_path):
+    path = str(tmp_path / "state.db")
+    store = SQLiteUserStateStore(path, lock_timeout=0.05)
+    other_worker = SQLiteUserStateStore(path, lock_timeout=0.05)
+    with store.lock("busy"):
+        with other_worker.lock("busy"):
+            pass
+    assert other_worker.stats()["lock_timeouts"] == 1
+    with other_worker.lock("busy"):
+        pass
+    assert other_worker.stats()["lock_timeouts"] == 1
+
+
+def test_membership_is_a_peek():
+    store = InMemoryUserStateStore(max_users=2)
+    store.get_or_create("a")
+    store.get_or_create("b")
+    before = store.stats()
+    assert "a" in store and "z" not in store
+    after = store.stats()
+    assert (after["hits"], after["misses"]) == (before["hits"], before["misses"])
+    # "a" was not refreshed, so it is still the one evicted next
+    store.get_or_create("c")
+    assert "a" not in store and "b" in store
+
+
+def test_sqlite_store_forgets_expired_history(tmp_path):
+    path = str(tmp_path / "state.db")
+    store = SQLiteUserStateStore(path, ttl_seconds=60)
+    chatbot = AdvancedChatbot(user_states=store)
+    chatbot.learn_from_interaction("idle", "old secret", "ok", "general_info", 0.5)
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE chatbot_users SET last_access = last_access - 120")
+    assert store.get("idle") is None
+    chatbot.learn_from_interaction("idle", "new", "ok", "general_info", 0.5)
+    assert [interaction.user_message for interaction in store.get("idle").interactions] == ["new"]
+    assert store.stats()["conflicts"] == 0
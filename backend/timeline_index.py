@@ -0,0 +1,202 @@
+import bisect
+import datetime
+import threading
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+
+import database as db
+
+# Missing dates make an event open-ended on that side
+EARLIEST = datetime.datetime.min
+LATEST = datetime.datetime.max
+
+
+class TimelineEvent(NamedTuple):
+    id: int
+    title: Optional[str]
+    event_type: Optional[str]
+    start_date: Optional[datetime.datetime]
+    end_date: Optional[datetime.datetime]
+    description: Optional[str]
+    url: Optional[str]
+
+    @property
+    def starts(self) -> datetime.datetime:
+        return self.start_date or EARLIEST
+
+    @property
+    def ends(self) -> datetime.datetime:
+        return self.end_date or LATEST
+
+
+class _SortedEvents:
+    """Events kept sorted by (end, id) in parallel arrays; inserts and removals bisect"""
+
+    __slots__ = ("keys", "events")
+
+    def __init__(self):
+        self.keys: List[Tuple[datetime.datetime, int]] = []
+        self.events: List[TimelineEvent] = []
+
+    def add(self, event: TimelineEvent) -> None:
+        key = (event.ends, event.id)
+        position = bisect.bisect_left(self.keys, key)
+        self.keys.insert(position, key)
+        self.events.insert(position, event)
+
+    def remove(self, event: TimelineEvent) -> None:
+        position = bisect.bisect_left(self.keys, (event.ends, event.id))
+        del self.keys[position]
+        del self.events[position]
+
+    def ending_from(self, moment: datetime.datetime) -> Iterator[TimelineEvent]:
+        """Events ending at or after `moment`, soonest first"""
+        events = self.events
+        for position in range(bisect.bisect_left(self.keys, (moment, -1)), len(events)):
+            yield events[position]
+
+
+class TimelineIndex:
+    """In-memory index of `database.Timeline` events ordered by closing date.
+
+    One sorted array per event type plus one for all events, updated per
+    committed change (see `database.watch_changes`). Queries bisect to the
+    first event still open at the start of the range and walk forward, so
+    results come out sorted by closing date without a table scan.
+    """
+
+    def __init__(self):
+        self._events: Dict[int, TimelineEvent] = {}
+        self._all = _SortedEvents()
+        # Typed events only; event_type is nullable, and None means "all" in queries
+        self._by_type: Dict[str, _SortedEvents] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def rebuild(self, session) -> int:
+        with self._lock:
+            self._events.clear()
+            self._all = _SortedEvents()
+            self._by_type = {}
+            for row in session.execute(select(*db.Timeline.__table__.columns)):
+                self.index_row(dict(row._mapping))
+            return len(self._events)
+
+    def index_row(self, values: Dict) -> TimelineEvent:
+        """Add or update an event; fields missing from `values` keep their indexed value"""
+        with self._lock:
+            previous = self._events.get(values["id"])
+            fields = previous._asdict() if previous else dict.fromkeys(TimelineEvent._fields)
+            fields.update((key, value) for key, value in values.items() if key in fields)
+            event = TimelineEvent(**fields)
+            if previous is not None:
+                self._unindex(previous)
+            self._events[event.id] = event
+            self._all.add(event)
+            if event.event_type is not None:
+                self._by_type.setdefault(event.event_type, _SortedEvents()).add(event)
+            return event
+
+    def _unindex(self, event: TimelineEvent) -> None:
+        self._all.remove(event)
+        if event.event_type is not None:
+            self._by_type[event.event_type].remove(event)
+            if not self._by_type[event.event_type].keys:
+                del self._by_type[event.event_type]
+
+    def remove_row(self, event_id: int) -> None:
+        with self._lock:
+            event = self._events.pop(event_id, None)
+            if event is not None:
+                self._unindex(event)
+
+    def apply_changes(self, changes: List[db.ChangeEvent]) -> None:
+        for change in changes:
+            if change.values.get("id") is None:
+                continue
+            if change.op == "delete":
+                self.remove_row(change.values["id"])
+            else:
+                self.index_row(change.values)
+
+    def overlapping(self, start: Optional[datetime.datetime] = None, end: Optional[datetime.datetime] = None,
+                    event_type: Optional[str] = None, limit: Optional[int] = None) -> List[TimelineEvent]:
+        """Events open at any point in [start, end], soonest closing first"""
+        start, end = start or EARLIEST, end or LATEST
+        results = []
+        with self._lock:
+            events = self._all if event_type is None else self._by_type.get(event_type)
+            if events is None:
+                return results
+            for event in events.ending_from(start):
+                if event.starts <= end:
+                    results.append(event)
+                    if len(results) == limit:
+                        break
+        return results
+
+    def closing_within(self, days: float, now: Optional[datetime.datetime] = None,
+                       event_type: Optional[str] = None, limit: Optional[int] = None) -> List[TimelineEvent]:
+        """Events whose end date falls in the next `days` days, soonest first"""
+        now = now or datetime.datetime.utcnow()
+        until = now + datetime.timedelta(days=days)
+        results = []
+        with self._lock:
+            events = self._all if event_type is None else self._by_type.get(event_type)
+            if events is None:
+                return results
+            for event in events.ending_from(now):
+                if event.ends > until or len(results) == limit:
+                    break
+                results.append(event)
+        return results
+
+    def event_types(self) -> List[str]:
+        with self._lock:
+            return sorted(self._by_type)
+
+
+def _ics_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def _ics_fold(line: str) -> str:
+    """Split a content line into 75-octet pieces (RFC 5545 section 3.1)"""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    pieces, position, width = [], 0, 75
+    while position < len(encoded):
+        cut = min(position + width, len(encoded))
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1  # don't split a multi-byte character
+        pieces.append(encoded[position:cut].decode("utf-8"))
+        position, width = cut, 74  # continuation lines start with a space
+    return "\r\n ".join(pieces) + "\r\n"
+
+
+def iter_ics(events: Iterable[TimelineEvent], calendar_name: str, domain: str = "career-advisor") -> Iterator[str]:
+    """An iCalendar document for `events`, one chunk per event"""
+    stamp = datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    yield ("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//%s//Timeline//EN\r\nCALSCALE:GREGORIAN\r\n" % domain
+           + _ics_fold("X-WR-CALNAME:" + _ics_escape(calendar_name)))
+    for event in events:
+        lines = ["BEGIN:VEVENT", f"UID:timeline-{event.id}@{domain}", f"DTSTAMP:{stamp}"]
+        start = event.start_date or event.end_date
+        end = event.end_date or event.start_date
+        if start is not None:
+            lines.append("DTSTART:" + start.strftime("%Y%m%dT%H%M%SZ"))
+            lines.append("DTEND:" + max(start, end).strftime("%Y%m%dT%H%M%SZ"))
+        lines.append("SUMMARY:" + _ics_escape(event.title or ""))
+        if event.description:
+            lines.append("DESCRIPTION:" + _ics_escape(event.description))
+        if event.event_type:
+            lines.append("CATEGORIES:" + _ics_escape(event.event_type))
+        if event.url:
+            lines.append("URL:" + event.url)
+        lines.append("END:VEVENT")
+        yield "".join(_ics_fold(line) for line in lines)
+    yield "END:VCALENDAR\r\n"
@@ -0,0 +1,92 @@
+"""Train the chatbot's intent model offline.
+
+Combines the curated examples in intent_examples.jsonl with turns logged by
+the SQLite conversation store (CHATBOT_CONVERSATION_BACKEND=sqlite) or
+user-state store (CHATBOT_STATE_BACKEND=sqlite), then writes the model file
+the chatbot memory-maps when CHATBOT_INTENT_MODEL_PATH points at it:
+    python train_intent_model.py --log chatbot_conversations.db --out intent_model.bin
+
+Logged intents are whatever the chatbot decided: the pattern engine's, or,
+once a model is deployed, the model's own confident predictions. Training
+on turns logged while a model was active therefore feeds its predictions,
+mistakes included, back into the next model; for pattern-labelled data,
+pass only logs recorded while CHATBOT_INTENT_MODEL_PATH was unset. Only
+turns logged with at least --min-log-confidence are used, and a curated
+example overrides a logged turn with the same message, which is how a
+repeated mistake gets corrected.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from typing import Dict, Iterable, Tuple
+
+from intent_model import IntentModel, read_examples, train
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+# The tables the chatbot's SQLite stores log turns to
+LOG_TABLES = ("chatbot_conversations", "chatbot_interactions")
+
+
+def read_logged_turns(path: str, min_confidence: float) -> Iterable[Tuple[str, str]]:
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        for table in LOG_TABLES:
+            if table in tables:
+                yield from conn.execute(
+                    f"SELECT user_message, intent FROM {table} "
+                    "WHERE user_message IS NOT NULL AND intent IS NOT NULL AND confidence >= ?",
+                    (min_confidence,),
+                )
+    finally:
+        conn.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--examples", default=os.path.join(BACKEND_DIR, "intent_examples.jsonl"),
+                        help="JSON lines of {\"message\", \"intent\"}")
+    parser.add_argument("--log", action="append", default=[], help="SQLite file with logged chatbot turns; repeatable")
+    parser.add_argument("--min-log-confidence", type=float, default=0.5)
+    parser.add_argument("--out", default="intent_model.bin")
+    parser.add_argument("--bits", type=int, default=18, help="log2 of the hashed feature space")
+    parser.add_argument("--epochs", type=int, default=300)
+    parser.add_argument("--holdout", type=float, default=0.0, help="fraction held out to report accuracy")
+    args = parser.parse_args()
+
+    # Keyed by normalized message, so curated labels replace logged ones
+    labeled: Dict[str, Tuple[str, str]] = {}
+    for path in args.log:
+        for message, intent in read_logged_turns(path, args.min_log_confidence):
+            labeled[" ".join(message.lower().split())] = (message, intent)
+    logged = len(labeled)
+    for message, intent in read_examples(args.examples):
+        labeled[" ".join(message.lower().split())] = (message, intent)
+    examples = list(labeled.values())
+    if not examples:
+        print("no training examples", file=sys.stderr)
+        return 1
+
+    random.Random(0).shuffle(examples)
+    held_out = examples[:int(len(examples) * args.holdout)]
+    training = examples[len(held_out):]
+    started = time.perf_counter()
+    model = train([message for message, _ in training], [intent for _, intent in training],
+                  n_bits=args.bits, epochs=args.epochs)
+    print(f"trained on {len(training)} messages ({logged} distinct logged) in {time.perf_counter() - started:.1f}s")
+    if held_out:
+        predictions = model.predict([message for message, _ in held_out])
+        correct = sum(predicted == intent for (predicted, _), (_, intent) in zip(predictions, held_out))
+        print(f"held-out accuracy: {correct / len(held_out):.1%} of {len(held_out)}")
+    model.save(args.out)
+    model = IntentModel.load(args.out)
+    print(f"wrote {args.out}: {len(model.classes)} intents, {len(model.feature_ids)} features, "
+          f"{os.path.getsize(args.out) / 1024:.0f} KB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
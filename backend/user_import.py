@@ -0,0 +1,182 @@
+import codecs
+import csv
+import json
+from typing import IO, Dict, Iterator, List, NamedTuple, Optional, Tuple, Type
+
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import database as db
+from password_hashing import PasswordHasher
+
+FORMATS = ("csv", "ndjson")
+
+
+class FileTooLarge(Exception):
+    pass
+
+
+class ImportRow(NamedTuple):
+    row: int  # 1-based position among the data rows of the file
+    username: Optional[str]
+    status: str  # created, duplicate or invalid
+    detail: Optional[str] = None
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    name = (filename or "").lower()
+    content_type = (content_type or "").lower()
+    if name.endswith(".csv") or "csv" in content_type:
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in content_type or "jsonl" in content_type:
+        return "ndjson"
+    return None
+
+
+def _lines(file: IO[bytes], max_bytes: int, block_size: int = 65536) -> Iterator[str]:
+    """Decoded lines of `file`, read a block at a time; raises FileTooLarge past `max_bytes`"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    total = 0
+    while True:
+        block = file.read(block_size)
+        total += len(block)
+        if total > max_bytes:
+            raise FileTooLarge(f"upload exceeds {max_bytes} bytes")
+        lines = (pending + decoder.decode(block, final=not block)).split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line + "\n"
+        if not block:
+            if pending:
+                yield pending
+            return
+
+
+def iter_records(file: IO[bytes], fmt: str, max_bytes: int) -> Iterator[Tuple[int, Dict]]:
+    """(row number, fields) per record, parsed as the file is read.
+
+    A line that isn't a JSON object yields its error message in place of
+    the fields, so one bad row doesn't end the import.
+    """
+    lines = _lines(file, max_bytes)
+    if fmt == "csv":
+        for number, record in enumerate(csv.DictReader(lines), 1):
+            yield number, {key.strip(): value.strip() for key, value in record.items()
+                           if key is not None and value not in (None, "")}
+        return
+    number = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield number, f"invalid JSON: {e.msg}"
+            continue
+        yield number, record if isinstance(record, dict) else "each line must be a JSON object"
+
+
+def iter_chunks(records: Iterator, size: int) -> Iterator[List]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _existing(session: Session, usernames: List[str], emails: List[str]) -> Tuple[set, set]:
+    """Usernames and emails among these already taken, in one query"""
+    rows = session.execute(
+        select(db.User.username, db.User.email).where(
+            or_(db.User.username.in_(usernames), db.User.email.in_(emails)))
+    ).all()
+    return {row.username for row in rows}, {row.email for row in rows}
+
+
+def _insert(session: Session, users: List[Dict]) -> List[Optional[str]]:
+    """Insert the chunk as one executemany; on a unique-constraint race fall
+    back to row-at-a-time savepoints. Returns an error (or None) per user."""
+    try:
+        session.execute(db.User.__table__.insert(), users)
+        session.commit()
+        return [None] * len(users)
+    except IntegrityError:
+        session.rollback()
+    errors = []
+    for user in users:
+        try:
+            with session.begin_nested():
+                session.execute(db.User.__table__.insert(), [user])
+            errors.append(None)
+        except IntegrityError:
+            errors.append("username or email already registered")
+    session.commit()
+    return errors
+
+
+async def import_users(session: Session, chunks: Iterator[List[Tuple[int, Dict]]], schema: Type[BaseModel],
+                       hasher: PasswordHasher) -> List[ImportRow]:
+    """Validate, de-duplicate, hash and insert each chunk of records.
+
+    Per chunk: one query for usernames and emails already taken, one
+    parallel hashing batch, one executemany insert and one commit. Records
+    repeating a username or email seen earlier in the file are reported as
+    duplicates, like ones already in the database.
+    """
+    report: List[ImportRow] = []
+    seen_usernames, seen_emails = set(), set()
+    while True:
+        chunk = await run_in_threadpool(next, chunks, None)
+        if chunk is None:
+            report.sort()
+            return report
+        valid = []
+        for number, record in chunk:
+            if isinstance(record, str):
+                report.append(ImportRow(number, None, "invalid", record))
+                continue
+            try:
+                user = schema(**record)
+            except ValidationError as e:
+                problems = "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors())
+                report.append(ImportRow(number, record.get("username"), "invalid", problems))
+                continue
+            valid.append((number, user))
+
+        taken_usernames, taken_emails = (await run_in_threadpool(
+            _existing, session, [user.username for _, user in valid], [user.email for _, user in valid])
+            if valid else (set(), set()))
+        # Release the connection while the passwords hash
+        await run_in_threadpool(session.close)
+        accepted = []
+        for number, user in valid:
+            if user.username in taken_usernames or user.username in seen_usernames:
+                report.append(ImportRow(number, user.username, "duplicate", "username already registered"))
+            elif user.email in taken_emails or user.email in seen_emails:
+                report.append(ImportRow(number, user.username, "duplicate", "email already registered"))
+            else:
+                accepted.append((number, user))
+            seen_usernames.add(user.username)
+            seen_emails.add(user.email)
+        if not accepted:
+            continue
+
+        hashes = await hasher.hash_many([user.password for _, user in accepted])
+        rows = [
+            {"username": user.username, "email": user.email, "hashed_password": hashed,
+             "full_name": user.full_name, "district": user.district,
+             "education_level": user.education_level, "role": "student"}
+            for (_, user), hashed in zip(accepted, hashes)
+        ]
+        errors = await run_in_threadpool(_insert, session, rows)
+        for (number, user), error in zip(accepted, errors):
+            report.append(ImportRow(number, user.username, "duplicate", error) if error
+                          else ImportRow(number, user.username, "created"))
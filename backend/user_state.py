@@ -0,0 +1,526 @@
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from contextlib import contextmanager, nullcontext
+from itertools import islice
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONVERSATION_MEMORY_SIZE = 10  # turns used for context awareness
+LEARNING_HISTORY_SIZE = 50  # interactions kept for insights
+LOCK_STRIPES = 64
+PURGE_EVERY_COMMITS = 1000
+
+
+class Interaction(NamedTuple):
+    """One chatbot turn.
+
+    Intent and emotion come from small fixed vocabularies, so they are
+    interned and shared by every record that uses them. The user's message
+    and the bot's response, which may be rendered from database rows, are
+    stored per turn.
+    """
+    timestamp: float  # epoch seconds
+    user_message: str
+    bot_response: str
+    intent: str
+    emotion: str
+    confidence: float
+
+    @classmethod
+    def create(cls, user_message: str, bot_response: str, intent: str, emotion: str,
+               confidence: float, timestamp: Optional[float] = None) -> "Interaction":
+        return cls(
+            time.time() if timestamp is None else timestamp,
+            user_message,
+            bot_response,
+            sys.intern(intent),
+            sys.intern(emotion),
+            confidence,
+        )
+
+
+_FLOAT_SIZE = sys.getsizeof(0.0)
+
+
+def _interaction_size(interaction: Interaction) -> int:
+    """Approximate bytes owned by a record (interned strings are shared, not counted)"""
+    return (sys.getsizeof(interaction) + sys.getsizeof(interaction.user_message)
+            + sys.getsizeof(interaction.bot_response) + 2 * _FLOAT_SIZE)
+
+
+class UserState:
+    """Per-user chatbot state: a ring buffer of recent interactions plus preferences.
+
+    The last CONVERSATION_MEMORY_SIZE interactions double as the
+    conversation memory used for context awareness.
+    """
+
+    __slots__ = ('interactions', 'intent_counts', 'preferences', 'last_access', 'size_bytes',
+                 'version', 'persisted_version')
+
+    BASE_SIZE = sys.getsizeof(deque(maxlen=LEARNING_HISTORY_SIZE)) + 2 * sys.getsizeof({})
+
+    def __init__(self):
+        self.interactions = deque(maxlen=LEARNING_HISTORY_SIZE)
+        self.intent_counts: Dict[str, int] = {}  # running counts over `interactions`
+        self.preferences: Dict = {}
+        self.last_access = time.monotonic()
+        self.size_bytes = self.BASE_SIZE
+        self.version = 0  # interactions ever added
+        self.persisted_version = 0  # interactions already written to a shared backend
+
+    @property
+    def conversation_length(self) -> int:
+        return min(len(self.interactions), CONVERSATION_MEMORY_SIZE)
+
+    def recent_interactions(self, count: int = CONVERSATION_MEMORY_SIZE) -> List[Interaction]:
+        """The last `count` interactions, oldest first"""
+        return list(islice(self.interactions, max(len(self.interactions) - count, 0), None))
+
+    def recent_emotions(self, count: int = 5) -> List[str]:
+        return [interaction.emotion for interaction in self.recent_interactions(count)]
+
+    def top_intents(self, count: int = 3) -> List[Tuple[str, int]]:
+        """Most frequent intents, ties broken by earliest occurrence in the history.
+
+        Counts are maintained as interactions are added, so this only orders
+        the handful of distinct intents; the history is consulted solely to
+        break ties and stops as soon as every tied intent has been seen.
+        """
+        ranked = sorted(self.intent_counts.items(), key=lambda item: item[1], reverse=True)
+        if len(ranked) <= 1 or len(set(self.intent_counts.values())) == len(ranked):
+            return ranked[:count]
+
+        first_seen: Dict[str, int] = {}
+        for index, interaction in enumerate(self.interactions):
+            first_seen.setdefault(interaction.intent, index)
+            if len(first_seen) == len(self.intent_counts):
+                break
+        ranked.sort(key=lambda item: (-item[1], first_seen[item[0]]))
+        return ranked[:count]
+
+    def add_interaction(self, interaction: Interaction) -> None:
+        if len(self.interactions) == self.interactions.maxlen:
+            dropped = self.interactions[0]
+            self.size_bytes -= _interaction_size(dropped)
+            remaining = self.intent_counts[dropped.intent] - 1
+            if remaining:
+                self.intent_counts[dropped.intent] = remaining
+            else:
+                del self.intent_counts[dropped.intent]
+        self.interactions.append(interaction)
+        self.intent_counts[interaction.intent] = self.intent_counts.get(interaction.intent, 0) + 1
+        self.size_bytes += _interaction_size(interaction)
+        self.version += 1
+
+
+class UserStateStore(ABC):
+    """Interface for chatbot user-state backends.
+
+    `get` must never create state for an unknown user; only
+    `get_or_create` may allocate. After mutating a state, callers hand it
+    back through `commit` so the store can account for its size.
+    """
+
+    blocking = False  # whether operations may wait on I/O
+
+    @abstractmethod
+    def get(self, user_id: str) -> Optional[UserState]:
+        ...
+
+    @abstractmethod
+    def get_or_create(self, user_id: str) -> UserState:
+        ...
+
+    @abstractmethod
+    def commit(self, user_id: str, state: UserState) -> None:
+        ...
+
+    @abstractmethod
+    def remove(self, user_id: str) -> bool:
+        ...
+
+    def lock(self, user_id: str):
+        """Context manager held for a whole chatbot turn of `user_id`"""
+        return nullcontext()
+
+    @abstractmethod
+    def stats(self) -> Dict:
+        ...
+
+
+class InMemoryUserStateStore(UserStateStore):
+    """Process-local store with LRU eviction, idle TTL and caps on users and bytes"""
+
+    def __init__(self, max_users: int = 10000, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 86400):
+        self.max_users = max_users
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._states: "OrderedDict[str, UserState]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._resident_bytes = 0
+        self._lock = threading.RLock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._user_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+    def __contains__(self, user_id: str) -> bool:
+        # A peek: unlike `get`, it neither counts a hit or miss nor refreshes the LRU position
+        with self._lock:
+            state = self._states.get(user_id)
+            return state is not None and not (
+                self.ttl_seconds and time.monotonic() - state.last_access > self.ttl_seconds)
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def get(self, user_id: str) -> Optional[UserState]:
+        with self._lock:
+            state = self._states.get(user_id)
+            if state is None:
+                self._misses += 1
+                return None
+            now = time.monotonic()
+            if self.ttl_seconds and now - state.last_access > self.ttl_seconds:
+                self._drop(user_id)
+                self._expirations += 1
+                self._misses += 1
+                return None
+            state.last_access = now
+            self._states.move_to_end(user_id)
+            self._hits += 1
+            return state
+
+    def get_or_create(self, user_id: str) -> UserState:
+        with self._lock:
+            state = self.get(user_id)
+            if state is None:
+                state = UserState()
+                self._states[user_id] = state
+                self._sizes[user_id] = state.size_bytes
+                self._resident_bytes += state.size_bytes
+                self._evict()
+            return state
+
+    def commit(self, user_id: str, state: UserState) -> None:
+        with self._lock:
+            if self._states.get(user_id) is not state:
+                return  # evicted while in use; the caller's copy is simply dropped
+            self._resident_bytes += state.size_bytes - self._sizes[user_id]
+            self._sizes[user_id] = state.size_bytes
+            self._evict()
+
+    def remove(self, user_id: str) -> bool:
+        with self._lock:
+            if user_id not in self._states:
+                return False
+            self._drop(user_id)
+            return True
+
+    def lock(self, user_id: str):
+        return self._user_locks[hash(user_id) % LOCK_STRIPES]
+
+    def _drop(self, user_id: str) -> None:
+        del self._states[user_id]
+        self._resident_bytes -= self._sizes.pop(user_id)
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        while self._states:
+            user_id, state = next(iter(self._states.items()))
+            if self.ttl_seconds and now - state.last_access > self.ttl_seconds:
+                self._expirations += 1
+            elif len(self._states) > self.max_users or self._resident_bytes > self.max_bytes:
+                self._evictions += 1
+            else:
+                break
+            self._drop(user_id)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'backend': 'memory',
+                'users': len(self._states),
+                'resident_bytes': self._resident_bytes,
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'max_users': self.max_users,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+            }
+
+
+class SQLiteUserStateStore(UserStateStore):
+    """User state shared by every worker process through a SQLite WAL database.
+
+    Each worker keeps a read-through LRU cache of states tagged with the
+    user's version in the database; a `get` costs one primary-key lookup
+    and reloads the history only when another worker has written since.
+    `lock` holds a per-user lease row in the database for the whole turn, so
+    follow-up messages for a user are applied in order across workers.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str, max_users: int = 10000, max_bytes: int = 64 * 1024 * 1024,
+                 ttl_seconds: float = 86400, lock_timeout: float = 5.0, lease_seconds: float = 10.0):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.lock_timeout = lock_timeout
+        self.lease_seconds = lease_seconds
+        self._cache = InMemoryUserStateStore(max_users=max_users, max_bytes=max_bytes, ttl_seconds=0)
+        self._local = threading.local()
+        self._user_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._stats_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._reloads = 0
+        self._conflicts = 0
+        self._lock_waits = 0
+        self._lock_timeouts = 0
+        self._commits = 0
+
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS chatbot_users ("
+            "user_id TEXT PRIMARY KEY, version INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS chatbot_interactions ("
+            "user_id TEXT NOT NULL, seq INTEGER NOT NULL, timestamp REAL NOT NULL, user_message TEXT, "
+            "bot_response TEXT, intent TEXT, emotion TEXT, confidence REAL, PRIMARY KEY (user_id, seq))"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS chatbot_locks ("
+            "user_id TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_chatbot_users_last_access ON chatbot_users (last_access)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.lock_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, counter: str) -> None:
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, user_id: str) -> Optional[UserState]:
+        conn = self._conn()
+        row = conn.execute("SELECT version, last_access FROM chatbot_users WHERE user_id = ?", (user_id,)).fetchone()
+        expired = row is not None and self.ttl_seconds and time.time() - row[1] > self.ttl_seconds
+        if row is None or expired:
+            self._cache.remove(user_id)
+            if expired:
+                # Delete the expired history now, or the next commit would
+                # see its version as a conflicting write and reload it
+                self._delete_expired(conn, user_id)
+            self._count('_misses')
+            return None
+
+        version = row[0]
+        state = self._cache.get(user_id)
+        if state is not None and state.persisted_version == version:
+            self._count('_hits')
+            return state
+
+        rows = conn.execute(
+            "SELECT timestamp, user_message, bot_response, intent, emotion, confidence "
+            "FROM chatbot_interactions WHERE user_id = ? ORDER BY seq DESC LIMIT ?",
+            (user_id, LEARNING_HISTORY_SIZE),
+        ).fetchall()
+        self._cache.remove(user_id)
+        state = self._cache.get_or_create(user_id)
+        for timestamp, message, response, intent, emotion, confidence in reversed(rows):
+            state.add_interaction(Interaction.create(message, response, intent, emotion, confidence, timestamp))
+        state.version = state.persisted_version = version
+        self._cache.commit(user_id, state)
+        self._count('_reloads')
+        return state
+
+    def get_or_create(self, user_id: str) -> UserState:
+        state = self.get(user_id)
+        if state is None:
+            state = self._cache.get_or_create(user_id)
+        return state
+
+    def commit(self, user_id: str, state: UserState) -> None:
+        self._cache.commit(user_id, state)
+        new = state.version - state.persisted_version
+        if new <= 0:
+            return
+        pending = list(islice(state.interactions, max(len(state.interactions) - new, 0), None))
+
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT version FROM chatbot_users WHERE user_id = ?", (user_id,)).fetchone()
+            current = row[0] if row is not None else 0
+            conn.executemany(
+                "INSERT INTO chatbot_interactions "
+                "(user_id, seq, timestamp, user_message, bot_response, intent, emotion, confidence) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(user_id, current + offset + 1) + tuple(interaction)
+                 for offset, interaction in enumerate(pending)],
+            )
+            version = current + len(pending)
+            conn.execute(
+                "DELETE FROM chatbot_interactions WHERE user_id = ? AND seq <= ?",
+                (user_id, version - LEARNING_HISTORY_SIZE),
+            )
+            conn.execute(
+                "INSERT INTO chatbot_users (user_id, version, last_access) VALUES (?, ?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET version = excluded.version, last_access = excluded.last_access",
+                (user_id, version, time.time()),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        self._count('_commits')
+        if self._commits % PURGE_EVERY_COMMITS == 0:
+            self.purge_expired()
+        if current == state.persisted_version:
+            state.version = state.persisted_version = version
+        else:
+            # Another worker wrote in between; reload on next access
+            state.persisted_version = -1
+            self._count('_conflicts')
+
+    def remove(self, user_id: str) -> bool:
+        self._cache.remove(user_id)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.execute("DELETE FROM chatbot_users WHERE user_id = ?", (user_id,))
+            conn.execute("DELETE FROM chatbot_interactions WHERE user_id = ?", (user_id,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return cursor.rowcount > 0
+
+    def _delete_expired(self, conn: sqlite3.Connection, user_id: str) -> None:
+        """Delete `user_id` if still idle past the TTL; another worker may have just touched them"""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.execute("DELETE FROM chatbot_users WHERE user_id = ? AND last_access < ?",
+                                  (user_id, time.time() - self.ttl_seconds))
+            if cursor.rowcount:
+                conn.execute("DELETE FROM chatbot_interactions WHERE user_id = ?", (user_id,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def purge_expired(self) -> int:
+        """Delete users idle for longer than the TTL; returns how many were removed"""
+        if not self.ttl_seconds:
+            return 0
+        cutoff = time.time() - self.ttl_seconds
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "DELETE FROM chatbot_interactions WHERE user_id IN "
+                "(SELECT user_id FROM chatbot_users WHERE last_access < ?)", (cutoff,)
+            )
+            cursor = conn.execute("DELETE FROM chatbot_users WHERE last_access < ?", (cutoff,))
+            conn.execute("DELETE FROM chatbot_locks WHERE expires_at < ?", (time.time(),))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return cursor.rowcount
+
+    @contextmanager
+    def lock(self, user_id: str):
+        with self._user_locks[hash(user_id) % LOCK_STRIPES]:
+            owner = f"{os.getpid()}:{threading.get_ident()}"
+            acquired = self._acquire_lease(user_id, owner)
+            try:
+                yield
+            finally:
+                if acquired:
+                    self._conn().execute(
+                        "DELETE FROM chatbot_locks WHERE user_id = ? AND owner = ?", (user_id, owner)
+                    )
+
+    def _acquire_lease(self, user_id: str, owner: str) -> bool:
+        conn = self._conn()
+        deadline = time.monotonic() + self.lock_timeout
+        delay = 0.001
+        while True:
+            now = time.time()
+            cursor = conn.execute(
+                "INSERT INTO chatbot_locks (user_id, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE chatbot_locks.expires_at < ?",
+                (user_id, owner, now + self.lease_seconds, now),
+            )
+            if cursor.rowcount == 1:
+                return True
+            if time.monotonic() >= deadline:
+                # Answer without the lease rather than failing the request
+                self._count('_lock_timeouts')
+                logger.warning(f"Timed out waiting for chatbot state lock of user {user_id}")
+                return False
+            self._count('_lock_waits')
+            time.sleep(delay)
+            delay = min(delay * 2, 0.05)
+
+    def stats(self) -> Dict:
+        conn = self._conn()
+        users = conn.execute("SELECT COUNT(*) FROM chatbot_users").fetchone()[0]
+        cache = self._cache.stats()
+        with self._stats_lock:
+            return {
+                'backend': 'sqlite',
+                'path': self.path,
+                'users': users,
+                'cached_users': cache['users'],
+                'resident_bytes': cache['resident_bytes'],
+                'hits': self._hits,
+                'misses': self._misses,
+                'reloads': self._reloads,
+                'evictions': cache['evictions'],
+                'commits': self._commits,
+                'conflicts': self._conflicts,
+                'lock_waits': self._lock_waits,
+                'lock_timeouts': self._lock_timeouts,
+                'ttl_seconds': self.ttl_seconds,
+            }
+
+
+def create_user_state_store(settings) -> UserStateStore:
+    """Build the store selected by CHATBOT_STATE_BACKEND ("memory" or "sqlite")"""
+    if settings.CHATBOT_STATE_BACKEND == "memory":
+        return InMemoryUserStateStore(
+            max_users=settings.CHATBOT_MAX_USERS,
+            max_bytes=settings.CHATBOT_MAX_STATE_BYTES,
+            ttl_seconds=settings.CHATBOT_USER_TTL_SECONDS,
+        )
+    if settings.CHATBOT_STATE_BACKEND == "sqlite":
+        return SQLiteUserStateStore(
+            settings.CHATBOT_STATE_SQLITE_PATH,
+            max_users=settings.CHATBOT_MAX_USERS,
+            max_bytes=settings.CHATBOT_MAX_STATE_BYTES,
+            ttl_seconds=settings.CHATBOT_USER_TTL_SECONDS,
+        )
+    raise ValueError(f"Unknown chatbot state backend: {settings.CHATBOT_STATE_BACKEND}")